@@ -0,0 +1,80 @@
+"""Benchmarks for the coordinate conversions of :class:`pytilemap.MapGraphicsScene`.
+
+The scalar conversions run for every item added to the scene, for every call of
+``center()`` and for the scale bar on every change of the scene rect. The
+benchmarks compare them with the former implementation based on the NumPy ufuncs.
+
+Run them with asv, or directly::
+
+    python -m benchmarks.bench_mapscene
+"""
+from __future__ import print_function, division
+
+import os
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from qtpy.QtWidgets import QApplication
+
+from pytilemap import MapGraphicsScene, MapTileSource
+from pytilemap.tileutils import Deg2Rad
+
+from .bench_tileutils import run as runBenchmarks
+
+
+class NullTileSource(MapTileSource):
+    """Tile source without tiles."""
+
+    def requestTile(self, x, y, zoom):
+        return None
+
+
+def numpyPosFromLonLat(lon, lat, zoom, tileSize):
+    # Former scalar implementation, based on the numpy ufuncs
+    tx = lon + 180.0
+    tx /= 360.0
+    ty = (1.0 - np.log(np.tan(lat * Deg2Rad) + 1.0 / np.cos(lat * Deg2Rad)) / np.pi) / 2.0
+    zn = (1 << zoom) * float(tileSize)
+    tx *= zn
+    ty *= zn
+    return tx, ty
+
+
+class ScenePosFromLonLat(object):
+    """Conversions of single coordinates by the scene."""
+
+    params = [[1000]]
+    param_names = ['size']
+
+    def setup(self, size):
+        self.app = QApplication.instance() or QApplication([])
+        self.scene = MapGraphicsScene(NullTileSource())
+        rng = np.random.RandomState(0)
+        self.lon = rng.uniform(-180.0, 180.0, size).tolist()
+        self.lat = rng.uniform(-85.0, 85.0, size).tolist()
+
+    def time_numpyPosFromLonLat(self, size):
+        zoom = self.scene.zoom()
+        for lon, lat in zip(self.lon, self.lat):
+            numpyPosFromLonLat(lon, lat, zoom, 256)
+
+    def time_posFromLonLat(self, size):
+        scene = self.scene
+        for lon, lat in zip(self.lon, self.lat):
+            scene.posFromLonLat(lon, lat)
+
+    def time_pointFromLonLat(self, size):
+        scene = self.scene
+        for lon, lat in zip(self.lon, self.lat):
+            scene.pointFromLonLat(lon, lat)
+
+    def time_center(self, size):
+        scene = self.scene
+        for _ in range(size):
+            scene.center()
+
+
+if __name__ == '__main__':
+    runBenchmarks([ScenePosFromLonLat])
@@ -0,0 +1,206 @@
+"""Benchmarks for the projection kernels of :mod:`pytilemap.tileutils`.
+
+The classes follow the conventions of airspeed velocity (asv): ``time_*`` methods
+are timed and ``peakmem_*`` methods are measured for their peak memory, for each
+combination of ``params``.
+
+The module can also be run directly, without asv::
+
+    python -m benchmarks.bench_tileutils [--max-size N] [--repeat R]
+
+It prints the throughput (millions of points per second) and the peak memory
+allocated by NumPy for every benchmark. The peak memory is measured with
+:mod:`tracemalloc`, and it is skipped on Python 2.
+"""
+from __future__ import print_function, division
+
+import argparse
+import itertools
+import timeit
+
+import numpy as np
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+from pytilemap.tileutils import posFromLonLat, lonLatFromPos, posFromLonLatChunked, lonLatFromPosChunked
+
+
+ZOOM = 15
+TILE_SIZE = 256
+
+SIZES = [1, 100, 10 * 1000, 1000 * 1000, 10 * 1000 * 1000]
+DTYPES = ['float32', 'float64']
+
+
+def makeLonLat(size, dtype):
+    rng = np.random.RandomState(0)
+    lon = rng.uniform(-180.0, 180.0, size).astype(dtype)
+    lat = rng.uniform(-85.0, 85.0, size).astype(dtype)
+    return lon, lat
+
+
+class ScalarProjection(object):
+    """Scalar path, called once per point."""
+
+    params = [SIZES[:3]]
+    param_names = ['size']
+
+    def setup(self, size):
+        lon, lat = makeLonLat(size, 'float64')
+        self.lon = lon.tolist()
+        self.lat = lat.tolist()
+        self.x, self.y = (v.tolist() for v in posFromLonLat(lon, lat, ZOOM, TILE_SIZE))
+
+    def time_posFromLonLat(self, size):
+        for lon, lat in zip(self.lon, self.lat):
+            posFromLonLat(lon, lat, ZOOM, TILE_SIZE)
+
+    def time_lonLatFromPos(self, size):
+        for x, y in zip(self.x, self.y):
+            lonLatFromPos(x, y, ZOOM, TILE_SIZE)
+
+
+class ArrayProjection(object):
+    """Array path, allocating the results."""
+
+    params = [SIZES, DTYPES]
+    param_names = ['size', 'dtype']
+
+    def setup(self, size, dtype):
+        self.lon, self.lat = makeLonLat(size, dtype)
+        self.x, self.y = posFromLonLat(self.lon, self.lat, ZOOM, TILE_SIZE)
+
+    def time_posFromLonLat(self, size, dtype):
+        posFromLonLat(self.lon, self.lat, ZOOM, TILE_SIZE)
+
+    def time_lonLatFromPos(self, size, dtype):
+        lonLatFromPos(self.x, self.y, ZOOM, TILE_SIZE)
+
+    def peakmem_posFromLonLat(self, size, dtype):
+        posFromLonLat(self.lon, self.lat, ZOOM, TILE_SIZE)
+
+    def peakmem_lonLatFromPos(self, size, dtype):
+        lonLatFromPos(self.x, self.y, ZOOM, TILE_SIZE)
+
+
+class ArrayProjectionInPlace(object):
+    """Array path, storing the results in preallocated ``out`` arrays."""
+
+    params = [SIZES, DTYPES]
+    param_names = ['size', 'dtype']
+
+    def setup(self, size, dtype):
+        self.lon, self.lat = makeLonLat(size, dtype)
+        self.x, self.y = posFromLonLat(self.lon, self.lat, ZOOM, TILE_SIZE)
+        self.out = (np.empty_like(self.lon), np.empty_like(self.lat))
+
+    def time_posFromLonLat(self, size, dtype):
+        posFromLonLat(self.lon, self.lat, ZOOM, TILE_SIZE, out=self.out)
+
+    def time_lonLatFromPos(self, size, dtype):
+        lonLatFromPos(self.x, self.y, ZOOM, TILE_SIZE, out=self.out)
+
+    def peakmem_posFromLonLat(self, size, dtype):
+        posFromLonLat(self.lon, self.lat, ZOOM, TILE_SIZE, out=self.out)
+
+    def peakmem_lonLatFromPos(self, size, dtype):
+        lonLatFromPos(self.x, self.y, ZOOM, TILE_SIZE, out=self.out)
+
+
+class ChunkedProjection(object):
+    """Chunked array path, storing the results in preallocated ``out`` arrays."""
+
+    params = [SIZES[2:], DTYPES, [1, 4]]
+    param_names = ['size', 'dtype', 'threads']
+
+    def setup(self, size, dtype, threads):
+        self.lon, self.lat = makeLonLat(size, dtype)
+        self.x, self.y = posFromLonLat(self.lon, self.lat, ZOOM, TILE_SIZE)
+        self.out = (np.empty_like(self.lon), np.empty_like(self.lat))
+
+    def time_posFromLonLat(self, size, dtype, threads):
+        posFromLonLatChunked(self.lon, self.lat, ZOOM, TILE_SIZE, out=self.out, numThreads=threads)
+
+    def time_lonLatFromPos(self, size, dtype, threads):
+        lonLatFromPosChunked(self.x, self.y, ZOOM, TILE_SIZE, out=self.out, numThreads=threads)
+
+    def peakmem_posFromLonLat(self, size, dtype, threads):
+        posFromLonLatChunked(self.lon, self.lat, ZOOM, TILE_SIZE, out=self.out, numThreads=threads)
+
+    def peakmem_lonLatFromPos(self, size, dtype, threads):
+        lonLatFromPosChunked(self.x, self.y, ZOOM, TILE_SIZE, out=self.out, numThreads=threads)
+
+
+BENCHMARKS = [ScalarProjection, ArrayProjection, ArrayProjectionInPlace, ChunkedProjection]
+
+
+def _measureTime(function, args, size, repeat):
+    # Best time of `repeat` runs, each one lasting at least 0.1 seconds
+    timer = timeit.Timer(lambda: function(*args))
+    number, elapsed = _autorange(timer)
+    best = min([elapsed] + timer.repeat(repeat=repeat - 1, number=number)) / number
+    return size / best / 1e6
+
+
+def _autorange(timer):
+    # Timer.autorange() of Python 3.6, for the older versions
+    if hasattr(timer, 'autorange'):
+        return timer.autorange()
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= 0.2:
+            return number, elapsed
+        number *= 10
+
+
+def _measurePeakMemory(function, args):
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1] / 2.0 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def run(benchmarks=BENCHMARKS, maxSize=None, repeat=3):
+    """Run the benchmarks and print their results.
+
+    Args:
+        benchmarks(list): Benchmark classes to run.
+        maxSize(int): Skip the benchmarks with more points, default `None` for all.
+        repeat(int): Number of repetitions of each timing.
+    """
+    print('%-56s %14s %12s' % ('benchmark', 'Mpoints/s', 'peak MiB'))
+    for cls in benchmarks:
+        names = sorted(n[len('time_'):] for n in dir(cls) if n.startswith('time_'))
+        for params in itertools.product(*cls.params):
+            size = params[0]
+            if maxSize is not None and size > maxSize:
+                continue
+            bench = cls()
+            bench.setup(*params)
+            for name in names:
+                throughput = _measureTime(getattr(bench, 'time_' + name), params, size, repeat)
+                peakName = 'peakmem_' + name
+                if tracemalloc is not None and hasattr(bench, peakName):
+                    peak = '%12.2f' % _measurePeakMemory(getattr(bench, peakName), params)
+                else:
+                    peak = '%12s' % '-'
+                label = '%s.%s%s' % (cls.__name__, name, list(params))
+                print('%-56s %14.3f %s' % (label, throughput, peak))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-size', type=int, default=None, help='maximum number of points')
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions of each timing')
+    args = parser.parse_args()
+    run(maxSize=args.max_size, repeat=args.repeat)
+
+
+if __name__ == '__main__':
+    main()
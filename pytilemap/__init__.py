@@ -4,7 +4,9 @@ from .mapscene import MapGraphicsScene
 from .mapview import MapGraphicsView
 from .mapitems import MapGraphicsCircleItem, MapGraphicsLineItem, \
     MapGraphicsPolylineItem, MapGraphicsPixmapItem, MapGraphicsTextItem, \
-    MapGraphicsRectItem
+    MapGraphicsRectItem, MapGraphicsScatterItem, MapGraphicsClusterItem, \
+    MapGraphicsTrackItem, MapGraphicsHeatmapItem, MapGraphicsItemGroup, MapGraphicsMarkerItem, \
+    MapGraphicsPlaybackItem
 from .maplegenditem import MapLegendItem
 from .mapescaleitem import MapScaleItem
 from .maptilesources import MapTileSource, MapTileSourceHere, MapTileSourceHereDemo, \
@@ -20,6 +22,13 @@ __all__ = [
     'MapGraphicsPixmapItem',
     'MapGraphicsTextItem',
     'MapGraphicsRectItem',
+    'MapGraphicsScatterItem',
+    'MapGraphicsClusterItem',
+    'MapGraphicsTrackItem',
+    'MapGraphicsHeatmapItem',
+    'MapGraphicsItemGroup',
+    'MapGraphicsMarkerItem',
+    'MapGraphicsPlaybackItem',
     'MapLegendItem',
     'MapTileSource',
     'MapTileSourceHere',
@@ -0,0 +1,54 @@
+from __future__ import division
+
+import numpy as np
+
+
+def packShelves(widths, heights, maxWidth=2048, padding=1):
+    """Pack rectangles in an atlas, with the shelf algorithm.
+
+    The rectangles are sorted by decreasing height and placed from left to right
+    in rows (the *shelves*); a new shelf is started when a rectangle does not fit
+    in the width of the atlas. Rectangles of similar height, like the icons of a
+    map, waste little space.
+
+    Args:
+        widths(iterable): Widths of the rectangles.
+        heights(iterable): Heights of the rectangles.
+        maxWidth(int): Maximum width of the atlas. The atlas is wider if a rectangle
+            is wider. Default 2048.
+        padding(int): Empty space between the rectangles. Default 1.
+
+    Returns:
+        tuple: (x, y, width, height) where ``x`` and ``y`` are the arrays with the
+        position of the top left corner of each rectangle, in the input order, and
+        ``width`` and ``height`` are the size of the atlas.
+    """
+    widths = np.asarray(widths, dtype=np.int64)
+    heights = np.asarray(heights, dtype=np.int64)
+    assert len(widths) == len(heights)
+
+    count = len(widths)
+    x = np.zeros(count, dtype=np.int64)
+    y = np.zeros(count, dtype=np.int64)
+    if count == 0:
+        return x, y, 0, 0
+
+    maxWidth = max(maxWidth, int(widths.max()))
+    shelfX = 0
+    shelfY = 0
+    shelfHeight = 0
+    width = 0
+    for i in np.argsort(-heights, kind='mergesort').tolist():
+        w = int(widths[i])
+        if shelfX > 0 and shelfX + w > maxWidth:
+            # Start a new shelf
+            shelfY += shelfHeight + padding
+            shelfX = 0
+            shelfHeight = 0
+        x[i] = shelfX
+        y[i] = shelfY
+        shelfX += w + padding
+        shelfHeight = max(shelfHeight, int(heights[i]))
+        width = max(width, shelfX - padding)
+
+    return x, y, width, shelfY + shelfHeight
@@ -0,0 +1,174 @@
+from __future__ import division
+
+import numpy as np
+
+from .tileutils import mortonCode
+
+
+class PointClusters(object):
+    """Hierarchical grid clustering of points in normalized Mercator space.
+
+    At the zoom level ``z`` the map is divided in square cells of
+    ``tileSize / 2 ** cellBits`` pixels, and all the points in the same cell form
+    a cluster placed in their centroid.
+
+    The points are sorted once by the Morton code of their cell at the maximum
+    zoom level. With this order the points of every cluster, at every zoom level,
+    are contiguous, and the clusters of a zoom level are split in contiguous
+    clusters of the next zoom level. The clusters of a zoom level are evaluated
+    with vectorized operations the first time they are requested and then cached.
+    """
+
+    def __init__(self, x, y, minZoom=0, maxZoom=18, cellBits=2):
+        """Constructor.
+
+        Args:
+            x(numpy.ndarray): Normalized Mercator X coordinates of the points.
+            y(numpy.ndarray): Normalized Mercator Y coordinates of the points.
+            minZoom(int): Minimum zoom level of the clusters.
+            maxZoom(int): Maximum zoom level of the clusters. Above this zoom level
+                the clusters of the maximum zoom level are used.
+            cellBits(int): There are ``2 ** cellBits`` cells for each side of a tile.
+        """
+        if maxZoom + cellBits > 31:
+            raise ValueError('maxZoom + cellBits must not be greater than 31')
+        if minZoom > maxZoom:
+            raise ValueError('minZoom must not be greater than maxZoom')
+
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        assert len(x) == len(y)
+
+        self._minZoom = minZoom
+        self._maxZoom = maxZoom
+        self._cellBits = cellBits
+
+        bits = maxZoom + cellBits
+        last = (1 << bits) - 1
+        cx = np.clip(np.floor(x * (1 << bits)), 0, last).astype(np.int64)
+        cy = np.clip(np.floor(y * (1 << bits)), 0, last).astype(np.int64)
+        codes = mortonCode(cx, cy)
+
+        order = np.argsort(codes, kind='mergesort')
+        self._order = order
+        self._codes = codes[order]
+        self._x = x[order]
+        self._y = y[order]
+        self._levels = dict()
+
+    def __len__(self):
+        return len(self._order)
+
+    def minZoom(self):
+        return self._minZoom
+
+    def maxZoom(self):
+        return self._maxZoom
+
+    def _zoomLevel(self, zoom):
+        return min(max(int(zoom), self._minZoom), self._maxZoom)
+
+    def _level(self, zoom):
+        # Clusters of a zoom level: (keys, starts, x, y), where starts has one more
+        # element with the number of points.
+        level = self._levels.get(zoom)
+        if level is not None:
+            return level
+
+        count = len(self._codes)
+        shift = np.uint64(2 * (self._maxZoom - zoom))
+        codes = self._codes >> shift
+        if count > 0:
+            starts = np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1])
+        else:
+            starts = np.empty(0, dtype=np.int64)
+        counts = np.diff(np.concatenate([starts, [count]]))
+        if count > 0:
+            cx = np.add.reduceat(self._x, starts) / counts
+            cy = np.add.reduceat(self._y, starts) / counts
+        else:
+            cx = cy = np.empty(0)
+
+        level = (codes[starts], np.concatenate([starts, [count]]), cx, cy)
+        self._levels[zoom] = level
+        return level
+
+    def clusters(self, zoom, rect=None):
+        """Clusters of a zoom level.
+
+        Args:
+            zoom(int): The zoom level.
+            rect(tuple): Optional (left, top, right, bottom) area in normalized
+                Mercator coordinates. Only the clusters with the centroid inside the
+                area are returned. The cost of the query depends on the number of
+                clusters near the area, not on the total number of clusters.
+
+        Returns:
+            tuple: (ids, x, y, counts) arrays with the identifiers, the normalized
+            Mercator coordinates of the centroids and the number of points of the
+            clusters. The identifiers are valid for the same zoom level.
+        """
+        zoom = self._zoomLevel(zoom)
+        keys, starts, cx, cy = self._level(zoom)
+
+        if rect is None:
+            ids = np.arange(len(keys))
+        else:
+            ids = self._clustersInRect(zoom, keys, rect)
+            inside = (cx[ids] >= rect[0]) & (cx[ids] <= rect[2]) & \
+                (cy[ids] >= rect[1]) & (cy[ids] <= rect[3])
+            ids = ids[inside]
+
+        return ids, cx[ids], cy[ids], starts[ids + 1] - starts[ids]
+
+    def _clustersInRect(self, zoom, keys, rect):
+        # Clusters in the (at most 4) cells of a coarser level covering the area
+        bits = zoom + self._cellBits
+        last = (1 << bits) - 1
+        x0, y0, x1, y1 = [int(min(max(np.floor(v * (1 << bits)), 0), last)) for v in rect]
+
+        span = max(x1 - x0, y1 - y0, 1)
+        up = min(int(np.ceil(np.log2(span))), bits)
+        ranges = list()
+        for qx in range(x0 >> up, (x1 >> up) + 1):
+            for qy in range(y0 >> up, (y1 >> up) + 1):
+                first = int(mortonCode(qx, qy)) << (2 * up)
+                end = first + (1 << (2 * up))
+                a, b = np.searchsorted(keys, np.array([first, end], dtype=np.uint64))
+                ranges.append(np.arange(a, b))
+
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+
+    def children(self, zoom, clusterId):
+        """Clusters of the next zoom level forming a cluster.
+
+        Args:
+            zoom(int): The zoom level of the cluster.
+            clusterId(int): The identifier of the cluster.
+
+        Returns:
+            numpy.ndarray: The identifiers of the clusters at ``zoom + 1``.
+        """
+        zoom = self._zoomLevel(zoom)
+        starts = self._level(zoom)[1]
+        first = starts[clusterId]
+        last = starts[clusterId + 1]
+        if zoom == self._maxZoom:
+            return np.array([clusterId])
+
+        childStarts = self._level(zoom + 1)[1]
+        a, b = np.searchsorted(childStarts, [first, last])
+        return np.arange(a, b)
+
+    def leaves(self, zoom, clusterId):
+        """Points of a cluster.
+
+        Args:
+            zoom(int): The zoom level of the cluster.
+            clusterId(int): The identifier of the cluster.
+
+        Returns:
+            numpy.ndarray: The indices of the points in the input arrays.
+        """
+        starts = self._level(self._zoomLevel(zoom))[1]
+        return self._order[starts[clusterId]:starts[clusterId + 1]]
@@ -2,8 +2,8 @@ import sys
 import sip
 import numpy as np
 
-from qtpy.QtCore import Qt
-from qtpy.QtGui import QColor, QBrush, QPen
+from qtpy.QtCore import Qt, QPointF, QRectF
+from qtpy.QtGui import QColor, QBrush, QPen, QPolygonF, QImage, QPainter
 
 SolidLine = Qt.SolidLine
 SolidPattern = Qt.SolidPattern
@@ -19,9 +19,13 @@ __all__ = [
     'makeColorFromNdArray',
     'makeColorFromList',
     'makeColor',
+    'makeRgbaArray',
     'makeBrush',
     'makePen',
     'clip',
+    'makePolygonF',
+    'makeImage',
+    'makePixmapFragments',
 ]
 
 PYTHON_VERSION = sys.version_info[0]
@@ -153,6 +157,39 @@ def makeColor(args):
     return makeFunction(args)
 
 
+def makeRgbaArray(colors, count):
+    """Create an array of 32 bit ARGB values, as returned by `QColor.rgba()`.
+
+    Args:
+        colors: A single color, with any argument accepted by :func:`makeColor`, or
+            one color for each element, as (Nx3) or (Nx4) numpy array or as list.
+        count (int): Number of elements.
+
+    Returns:
+        numpy.ndarray: Array of `count` ARGB values.
+
+    Raises:
+        ValueError: If the number of colors is not equal to the number of elements.
+    """
+    if isinstance(colors, np.ndarray) and colors.ndim == 2:
+        if colors.dtype in [np.float32, np.float64]:
+            colors = colors * 255.0
+        colors = np.asarray(colors, dtype=np.uint32)
+        alpha = colors[:, 3] if colors.shape[1] == 4 else np.uint32(255)
+        rgba = (alpha << 24) | (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+    elif isinstance(colors, list) and len(colors) > 0 and \
+            not isinstance(colors[0], (int, float, np.number)):
+        rgba = [c if isinstance(c, QColor) else makeColor(c) for c in colors]
+        rgba = np.array([c.rgba() for c in rgba], dtype=np.uint32)
+    else:
+        color = colors if isinstance(colors, QColor) else makeColor(colors)
+        rgba = np.full(count, color.rgba(), dtype=np.uint32)
+
+    if len(rgba) != count:
+        raise ValueError('The number of colors must be equal to the number of elements')
+    return rgba
+
+
 def makeBrush(color, style=SolidPattern):
     if color is None:
         return QBrush(Qt.NoBrush)
@@ -179,3 +216,105 @@ def makePen(color, width=1.0, style=SolidLine, cap=SquareCap, join=BevelJoin):
 
 def clip(value, minValue, maxValue):
     return min(maxValue, max(minValue, value))
+
+
+def makePolygonF(x, y):
+    """Create a QPolygonF from arrays of coordinates.
+
+    The points are copied with NumPy directly in the memory of the polygon,
+    without creating a QPointF for each point.
+
+    Args:
+        x (numpy.ndarray): X coordinates of the points.
+        y (numpy.ndarray): Y coordinates of the points.
+
+    Returns:
+        QPolygonF: Polygon with the points.
+    """
+    count = len(x)
+    polygon = QPolygonF(count)
+    if count == 0:
+        return polygon
+
+    ptr = polygon.data()
+    if not hasattr(ptr, 'setsize'):
+        # The binding does not expose the memory of the polygon
+        return QPolygonF([QPointF(px, py) for px, py in izip(x, y)])
+
+    ptr.setsize(count * 2 * np.dtype(np.float64).itemsize)
+    points = np.frombuffer(ptr, dtype=np.float64).reshape(count, 2)
+    points[:, 0] = x
+    points[:, 1] = y
+    return polygon
+
+
+def makeImage(argb):
+    """Create a QImage from an array of 32 bit ARGB values.
+
+    Args:
+        argb (numpy.ndarray): (rows x columns) array of ARGB values, as returned
+            by `QColor.rgba()`.
+
+    Returns:
+        QImage: ARGB32 image with the values of the array, a null image if the
+        array is empty.
+    """
+    rows, cols = argb.shape
+    image = QImage(cols, rows, QImage.Format_ARGB32)
+    if rows == 0 or cols == 0:
+        return image
+
+    ptr = image.bits()
+    if not hasattr(ptr, 'setsize'):
+        # The binding does not expose the memory of the image
+        for row in iterRange(rows):
+            for col in iterRange(cols):
+                image.setPixel(col, row, int(argb[row, col]))
+        return image
+
+    ptr.setsize(image.byteCount())
+    pixels = np.frombuffer(ptr, dtype=np.uint32).reshape(rows, image.bytesPerLine() // 4)
+    pixels[:, :cols] = argb
+    return image
+
+
+def makePixmapFragments(x, y, sourceRects, rotations=None):
+    """Create the fragments for `QPainter.drawPixmapFragments()` from arrays.
+
+    The values are copied with NumPy directly in the memory of an array of
+    fragments, without creating a QPainter.PixmapFragment for each fragment.
+
+    Args:
+        x (numpy.ndarray): X coordinates of the centers of the fragments.
+        y (numpy.ndarray): Y coordinates of the centers of the fragments.
+        sourceRects (numpy.ndarray): (N x 4) array with the left, top, width and
+            height of the source rectangle of each fragment in the pixmap.
+        rotations (numpy.ndarray): Rotation of each fragment in degrees, clockwise
+            around its center. Default `None` for no rotation.
+
+    Returns:
+        The fragments, as a `sip.array` or as a list of QPainter.PixmapFragment.
+    """
+    count = len(x)
+    if rotations is None:
+        rotations = np.zeros(count)
+
+    if not hasattr(sip, 'array'):
+        # The binding does not support arrays of fragments
+        return [QPainter.PixmapFragment.create(QPointF(px, py), QRectF(*rect), 1.0, 1.0, rotation, 1.0)
+                for px, py, rect, rotation in izip(x, y, np.asarray(sourceRects).tolist(), rotations)]
+
+    fragments = sip.array(QPainter.PixmapFragment, count)
+    if count == 0:
+        return fragments
+
+    # Fields of the fragments: x, y, sourceLeft, sourceTop, width, height,
+    # scaleX, scaleY, rotation, opacity
+    values = np.frombuffer(fragments, dtype=np.float64).reshape(count, 10)
+    values[:, 0] = x
+    values[:, 1] = y
+    values[:, 2:6] = sourceRects
+    values[:, 6:8] = 1.0
+    values[:, 8] = rotations
+    values[:, 9] = 1.0
+    return fragments
@@ -0,0 +1,290 @@
+from __future__ import print_function, absolute_import, division
+
+import io
+import re
+import json
+import codecs
+from array import array
+
+import numpy as np
+
+from .functions import PYTHON_VERSION
+
+
+_WHITESPACE_RE = re.compile(r'\s*')
+
+
+class _TextStream(object):
+    # Text read incrementally from a stream of str or bytes
+
+    def __init__(self, stream, chunkSize):
+        self._stream = stream
+        self._chunkSize = chunkSize
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = u''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        # Read more text, at least as much as the text not yet consumed, so that a
+        # long value is decoded in O(log) attempts. Returns False at the end of the stream.
+        if self.eof:
+            return False
+        if self.pos > 0:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        chunk = self._stream.read(max(self._chunkSize, len(self.text)))
+        if not chunk:
+            self.eof = True
+            self.text += self._decoder.decode(b'', final=True)
+            return False
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        self.text += chunk
+        return True
+
+    def skipWhitespace(self):
+        while True:
+            self.pos = _WHITESPACE_RE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self.fill():
+                return
+
+    def nextChar(self):
+        # Next character after the whitespace, None at the end of the stream
+        self.skipWhitespace()
+        return self.text[self.pos] if self.pos < len(self.text) else None
+
+    def decode(self, decoder):
+        # Decode the value at the current position, reading more text while it is
+        # incomplete. A value at the end of the text, as a number, may continue in
+        # the next chunk.
+        while True:
+            self.skipWhitespace()
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            if end < len(self.text) or self.eof:
+                self.pos = end
+                return value
+            self.fill()
+
+
+def iterGeoJsonFeatures(stream, chunkSize=1 << 20):
+    """Features of a GeoJSON document, decoded one at a time.
+
+    The features of a FeatureCollection are decoded while the document is read,
+    so only a chunk of the document and a single feature are kept in memory.
+    Other documents (a single Feature or a geometry) are decoded at once.
+
+    Args:
+        stream: File object with the GeoJSON document, opened in text or binary mode.
+        chunkSize(int): Number of characters or bytes read at once. Default 1 MiB.
+
+    Yields:
+        dict: The decoded features.
+
+    Raises:
+        ValueError: If the document is not valid.
+    """
+    decoder = json.JSONDecoder()
+    reader = _TextStream(stream, chunkSize)
+
+    # Decode the members of the top-level object up to the array of the features,
+    # a "features" key nested in another member is decoded with that member
+    if reader.nextChar() != '{':
+        raise ValueError('The GeoJSON document is not an object')
+    reader.pos += 1
+    members = dict()
+    while True:
+        char = reader.nextChar()
+        if char == '}':
+            # Not a FeatureCollection, or a collection without features
+            if members.get('type') == 'Feature':
+                yield members
+            elif members.get('type') != 'FeatureCollection':
+                yield {'type': 'Feature', 'geometry': members, 'properties': None}
+            return
+        if char == ',':
+            reader.pos += 1
+            continue
+        if char != '"':
+            raise ValueError('Invalid GeoJSON object')
+
+        key = reader.decode(decoder)
+        if reader.nextChar() != ':':
+            raise ValueError('Invalid GeoJSON object')
+        reader.pos += 1
+        if key == 'features' and reader.nextChar() == '[':
+            reader.pos += 1
+            break
+        members[key] = reader.decode(decoder)
+
+    while True:
+        char = reader.nextChar()
+        if char is None:
+            raise ValueError('Unterminated array of features')
+        if char == ']':
+            return
+        if char == ',':
+            reader.pos += 1
+            continue
+
+        feature = reader.decode(decoder)
+        if not isinstance(feature, dict) or feature.get('type') != 'Feature':
+            raise ValueError('Invalid GeoJSON feature')
+        yield feature
+
+
+if PYTHON_VERSION == 2:
+    def _extendArray(values, column):
+        values.fromstring(np.ascontiguousarray(column, dtype=np.float64).tobytes())
+else:
+    def _extendArray(values, column):
+        values.frombytes(np.ascontiguousarray(column, dtype=np.float64).tobytes())
+
+
+class _PartsBuffer(object):
+    # Coordinates of a sequence of parts (lines or rings), stored compactly
+
+    def __init__(self):
+        self.longitudes = array('d')
+        self.latitudes = array('d')
+        self.parts = array('l')  # Index of the first point of each part
+
+    def addPoints(self, coordinates):
+        _extendArray(self.longitudes, coordinates[:, 0])
+        _extendArray(self.latitudes, coordinates[:, 1])
+
+    def addPart(self, coordinates):
+        # A part with less than 2 points draws no line
+        if len(coordinates) < 2:
+            return
+        self.parts.append(len(self.longitudes))
+        self.addPoints(coordinates)
+
+    def arrays(self):
+        return (np.frombuffer(self.longitudes, dtype=np.float64).copy(),
+                np.frombuffer(self.latitudes, dtype=np.float64).copy(),
+                np.array(self.parts, dtype=np.intp))
+
+
+def _asCoordinates(coordinates):
+    # (N x 2) array with the longitudes and the latitudes of a list of positions
+    try:
+        array2d = np.asarray(coordinates, dtype=np.float64)
+    except ValueError:
+        # Positions with and without altitude
+        array2d = np.asarray([position[:2] for position in coordinates], dtype=np.float64)
+    if array2d.ndim != 2 or array2d.shape[1] < 2:
+        if array2d.size == 0:
+            return np.empty((0, 2))
+        raise ValueError('Invalid GeoJSON coordinates')
+    return array2d
+
+
+class GeoJsonLayers(object):
+    """Coordinates of the geometries of a GeoJSON document, grouped by kind.
+
+    The coordinates of each kind of geometry are concatenated in arrays, suitable
+    for creating a single item for each kind:
+
+    * ``points``: (longitudes, latitudes) of Point and MultiPoint geometries.
+    * ``lines``: (longitudes, latitudes, parts) of LineString and MultiLineString
+      geometries, where ``parts`` are the indices of the first point of each line.
+    * ``polygons``: (longitudes, latitudes, parts) of the rings of Polygon and
+      MultiPolygon geometries.
+    """
+
+    def __init__(self):
+        self.featureCount = 0
+        self._points = _PartsBuffer()
+        self._lines = _PartsBuffer()
+        self._polygons = _PartsBuffer()
+        self.points = None
+        self.lines = None
+        self.polygons = None
+
+    def addFeature(self, feature):
+        """Add the geometry of a feature.
+
+        Args:
+            feature(dict): The decoded GeoJSON feature.
+        """
+        self.featureCount += 1
+        geometry = feature.get('geometry')
+        if geometry is not None:
+            self.addGeometry(geometry)
+
+    def addGeometry(self, geometry):
+        """Add a geometry.
+
+        Args:
+            geometry(dict): The decoded GeoJSON geometry.
+
+        Raises:
+            ValueError: If the type of the geometry is not valid.
+        """
+        kind = geometry.get('type')
+        coordinates = geometry.get('coordinates')
+        if kind == 'Point':
+            if coordinates:
+                self._points.addPoints(_asCoordinates([coordinates]))
+        elif kind == 'MultiPoint':
+            self._points.addPoints(_asCoordinates(coordinates))
+        elif kind == 'LineString':
+            self._lines.addPart(_asCoordinates(coordinates))
+        elif kind == 'MultiLineString':
+            for line in coordinates:
+                self._lines.addPart(_asCoordinates(line))
+        elif kind == 'Polygon':
+            for ring in coordinates:
+                self._polygons.addPart(_asCoordinates(ring))
+        elif kind == 'MultiPolygon':
+            for polygon in coordinates:
+                for ring in polygon:
+                    self._polygons.addPart(_asCoordinates(ring))
+        elif kind == 'GeometryCollection':
+            for child in geometry.get('geometries', []):
+                self.addGeometry(child)
+        else:
+            raise ValueError('Invalid GeoJSON geometry type: %s' % kind)
+
+    def finish(self):
+        """Build the arrays of the layers after adding all the geometries.
+
+        Returns:
+            GeoJsonLayers: This object.
+        """
+        self.points = self._points.arrays()[:2]
+        self.lines = self._lines.arrays()
+        self.polygons = self._polygons.arrays()
+        self._points = self._lines = self._polygons = None
+        return self
+
+
+def readGeoJson(source, chunkSize=1 << 20):
+    """Read the geometries of a GeoJSON document.
+
+    The features are decoded while the document is read and their coordinates
+    are stored compactly, so the peak memory is bounded by the size of the
+    coordinates and not by the size of the document.
+
+    Args:
+        source(str or file): Path of the document, or file object opened in text or
+            binary mode.
+        chunkSize(int): Number of characters or bytes read at once. Default 1 MiB.
+
+    Returns:
+        GeoJsonLayers: The coordinates of the geometries.
+    """
+    if not hasattr(source, 'read'):
+        with io.open(source, 'rb') as stream:
+            return readGeoJson(stream, chunkSize)
+
+    layers = GeoJsonLayers()
+    for feature in iterGeoJsonFeatures(source, chunkSize):
+        layers.addFeature(feature)
+    return layers.finish()
@@ -0,0 +1,169 @@
+from __future__ import division
+
+import numpy as np
+
+
+def gaussianKernel(radius):
+    """Gaussian kernel truncated at a radius, with peak 1.
+
+    Args:
+        radius(int): Radius of the kernel in pixels.
+
+    Returns:
+        numpy.ndarray: The ``2 * radius + 1`` values of the kernel.
+    """
+    radius = int(radius)
+    if radius <= 0:
+        return np.ones(1)
+    sigma = radius / 2.0
+    offsets = np.arange(-radius, radius + 1, dtype=np.float64)
+    return np.exp(-0.5 * (offsets / sigma) ** 2)
+
+
+def smoothGrid(grid, kernel):
+    """Convolution of a 2D grid with a separable kernel.
+
+    The grid is convolved along the rows and then along the columns with the
+    same 1D kernel, so the cost grows linearly with the size of the kernel. The
+    values outside the grid are considered 0.
+
+    Args:
+        grid(numpy.ndarray): The 2D grid.
+        kernel(numpy.ndarray): The 1D kernel, with odd length.
+
+    Returns:
+        numpy.ndarray: The smoothed grid, with the shape of the input grid.
+    """
+    radius = len(kernel) // 2
+    rows, cols = grid.shape
+
+    padded = np.zeros((rows, cols + 2 * radius), dtype=np.float64)
+    padded[:, radius:radius + cols] = grid
+    smoothed = np.zeros((rows + 2 * radius, cols), dtype=np.float64)
+    target = smoothed[radius:radius + rows]
+    for k, weight in enumerate(kernel.tolist()):
+        target += weight * padded[:, k:k + cols]
+
+    result = np.zeros((rows, cols), dtype=np.float64)
+    for k, weight in enumerate(kernel.tolist()):
+        result += weight * smoothed[k:k + rows]
+    return result
+
+
+def colormapLut(rgba, size=256):
+    """Lookup table of a colormap interpolating evenly spaced colors.
+
+    Args:
+        rgba(numpy.ndarray): (Nx4) array with the RGBA components, in [0, 255], of
+            the colors of the colormap, from the lowest to the highest value.
+        size(int): Number of entries of the table. Default 256.
+
+    Returns:
+        numpy.ndarray: Array of `size` 32 bit ARGB values.
+    """
+    rgba = np.asarray(rgba, dtype=np.float64)
+    stops = np.linspace(0.0, 1.0, len(rgba))
+    values = np.linspace(0.0, 1.0, size)
+    channels = [np.rint(np.interp(values, stops, rgba[:, c])).astype(np.uint32) for c in range(4)]
+    r, g, b, a = channels
+    return (a << 24) | (r << 16) | (g << 8) | b
+
+
+class PointDensity(object):
+    """Density of weighted points in normalized Mercator space, evaluated by tiles.
+
+    The points are sorted by their X coordinate, so that the points contributing
+    to a tile are found with a binary search. The weights of the points are
+    binned in the pixels of the tile, enlarged by the radius of the kernel, with a
+    single call of `numpy.bincount()` and the grid is then smoothed with a
+    separable kernel.
+    """
+
+    def __init__(self, x, y, weights=None):
+        """Constructor.
+
+        Args:
+            x(numpy.ndarray): Normalized Mercator X coordinates of the points.
+            y(numpy.ndarray): Normalized Mercator Y coordinates of the points.
+            weights(numpy.ndarray): Weight of each point, default 1 for each point.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        assert len(x) == len(y)
+        if weights is None:
+            weights = np.ones(len(x))
+        else:
+            weights = np.asarray(weights, dtype=np.float64)
+            if len(weights) != len(x):
+                raise ValueError('The number of weights must be equal to the number of points')
+
+        order = np.argsort(x, kind='mergesort')
+        self._x = x[order]
+        self._y = y[order]
+        self._weights = weights[order]
+        self._maxDensity = dict()
+
+    def __len__(self):
+        return len(self._x)
+
+    def tile(self, tx, ty, zoom, tileSize, kernel):
+        """Density in the pixels of a tile.
+
+        Args:
+            tx(int): X index of the tile.
+            ty(int): Y index of the tile.
+            zoom(int): Zoom level of the tile.
+            tileSize(int): Size of the tile in pixels.
+            kernel(numpy.ndarray): The 1D kernel, see :func:`gaussianKernel`.
+
+        Returns:
+            numpy.ndarray: (tileSize x tileSize) array with the density, indexed by
+            row and column.
+        """
+        radius = len(kernel) // 2
+        scale = (1 << zoom) * float(tileSize)
+        left = tx * tileSize - radius
+        top = ty * tileSize - radius
+        size = tileSize + 2 * radius
+
+        first, last = np.searchsorted(self._x, [left / scale, (left + size) / scale])
+        px = np.floor(self._x[first:last] * scale - left).astype(np.int64)
+        py = np.floor(self._y[first:last] * scale - top).astype(np.int64)
+        valid = (px >= 0) & (px < size) & (py >= 0) & (py < size)
+        bins = py[valid] * size + px[valid]
+        grid = np.bincount(bins, self._weights[first:last][valid], minlength=size * size)
+
+        grid = smoothGrid(grid.reshape(size, size), kernel)
+        return grid[radius:radius + tileSize, radius:radius + tileSize]
+
+    def maxDensity(self, zoom, tileSize, radius):
+        """Estimate of the maximum density at a zoom level.
+
+        The estimate is the largest sum of the weights in the square cells with
+        the side of the radius of the kernel. It does not depend on the visible
+        tiles, so that the tiles of the same zoom level use the same scale.
+
+        Args:
+            zoom(int): The zoom level.
+            tileSize(int): Size of the tile in pixels.
+            radius(int): Radius of the kernel in pixels.
+
+        Returns:
+            float: The estimate of the maximum density.
+        """
+        key = (zoom, tileSize, radius)
+        value = self._maxDensity.get(key)
+        if value is None:
+            value = 0.0
+            if len(self._x) > 0:
+                # Sum of the weights of each cell, sorting the points by cell
+                scale = (1 << zoom) * float(tileSize) / max(radius, 1)
+                cx = np.floor(self._x * scale).astype(np.int64)
+                cy = np.floor(self._y * scale).astype(np.int64)
+                order = np.lexsort((cy, cx))
+                cx = cx[order]
+                cy = cy[order]
+                starts = np.flatnonzero(np.concatenate([[True], (cx[1:] != cx[:-1]) | (cy[1:] != cy[:-1])]))
+                value = float(np.add.reduceat(self._weights[order], starts).max())
+            self._maxDensity[key] = value
+        return value
@@ -0,0 +1,201 @@
+from __future__ import division
+
+import math
+
+
+LABEL_OFFSETS = ((0.0, 0.0), (-1.0, 0.0), (0.0, -1.0), (-1.0, -1.0))
+"""tuple: Candidate positions of a label, as offsets of its top left corner from
+its anchor in multiples of the width and of the height of the label."""
+
+
+class LabelGrid(object):
+    """Uniform grid of the rectangles of the placed labels.
+
+    Each rectangle is stored in all the cells it covers, so the labels that can
+    overlap a rectangle are found by visiting the few cells covered by it.
+    """
+
+    def __init__(self, cellSize=64.0):
+        self._cellSize = float(cellSize)
+        self._cells = dict()
+        self._rects = dict()
+
+    def _cellRange(self, rect):
+        cellSize = self._cellSize
+        left, top, right, bottom = rect
+        return (int(math.floor(left / cellSize)), int(math.floor(top / cellSize)),
+                int(math.floor(right / cellSize)), int(math.floor(bottom / cellSize)))
+
+    def insert(self, label, rect):
+        """Insert the rectangle of a label.
+
+        Args:
+            label: Identifier of the label.
+            rect(tuple): (left, top, right, bottom) rectangle of the label.
+        """
+        self._rects[label] = rect
+        x0, y0, x1, y1 = self._cellRange(rect)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self._cells.setdefault((cx, cy), list()).append(label)
+
+    def overlapping(self, rect):
+        """Labels overlapping a rectangle.
+
+        Args:
+            rect(tuple): (left, top, right, bottom) rectangle.
+
+        Returns:
+            set: The identifiers of the labels.
+        """
+        left, top, right, bottom = rect
+        found = set()
+        x0, y0, x1, y1 = self._cellRange(rect)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for label in self._cells.get((cx, cy), ()):
+                    if label in found:
+                        continue
+                    l, t, r, b = self._rects[label]
+                    if l < right and r > left and t < bottom and b > top:
+                        found.add(label)
+        return found
+
+
+class LabelPlacement(object):
+    """Placement of labels without overlaps, evaluated and cached per zoom level.
+
+    The labels are placed greedily by decreasing priority, in order of insertion
+    for the same priority. Each label is placed in the first of the candidate
+    positions of :data:`LABEL_OFFSETS` not overlapping the labels already placed,
+    or it is dropped. The labels outside their range of zoom levels are dropped
+    and they do not take space.
+
+    The placement of a zoom level is kept when labels are added or removed, if
+    the greedy placement would not change for the other labels:
+
+    * an added label is placed against the labels with the same or higher
+      priority; the placement is evaluated again only if the label overlaps a
+      label with lower priority;
+    * the placement is evaluated again when a placed label is removed, while the
+      removal of a dropped label does not change the other labels.
+    """
+
+    def __init__(self, cellSize=64.0):
+        """Constructor.
+
+        Args:
+            cellSize(float): Size in pixels of the cells of the grid.
+        """
+        self._cellSize = cellSize
+        self._labels = dict()  # (x, y, width, height, priority, order, minZoom, maxZoom) of each label
+        self._order = 0
+        self._cache = dict()  # (grid, offsets) of each zoom level
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __contains__(self, label):
+        return label in self._labels
+
+    def add(self, label, x, y, width, height, priority=0, minZoom=None, maxZoom=None):
+        """Add a label, or update it.
+
+        Args:
+            label: Hashable identifier of the label.
+            x(float): Normalized Mercator X coordinate of the anchor.
+            y(float): Normalized Mercator Y coordinate of the anchor.
+            width(float): Width of the label in pixels.
+            height(float): Height of the label in pixels.
+            priority(float): Priority of the label, labels with higher priority are
+                placed first. Default 0.
+            minZoom(int): Minimum zoom level of the label, default `None` for no limit.
+            maxZoom(int): Maximum zoom level of the label, default `None` for no limit.
+        """
+        if label in self._labels:
+            self.remove(label)
+
+        self._labels[label] = (x, y, width, height, priority, self._order, minZoom, maxZoom)
+        self._order += 1
+        for key, (grid, offsets) in list(self._cache.items()):
+            zoom, tileSize = key
+            if not self._inZoomRange(label, zoom):
+                offsets[label] = None
+                continue
+            zn = (1 << zoom) * float(tileSize)
+            offset = self._placeAdded(grid, label, zn)
+            if offset is False:
+                del self._cache[key]
+            else:
+                offsets[label] = offset
+
+    def remove(self, label):
+        """Remove a label.
+
+        Args:
+            label: Identifier of the label.
+        """
+        if self._labels.pop(label, None) is None:
+            return
+        for key, (grid, offsets) in list(self._cache.items()):
+            if offsets.pop(label, None) is not None:
+                del self._cache[key]
+
+    def placement(self, zoom, tileSize):
+        """Placement of the labels at a zoom level.
+
+        Args:
+            zoom(int): The zoom level.
+            tileSize(int): Size of the tiles in pixels.
+
+        Returns:
+            dict: Offset in pixels (dx, dy) of the top left corner of each label from
+            its anchor, `None` for the dropped labels.
+        """
+        key = (zoom, tileSize)
+        cached = self._cache.get(key)
+        if cached is None:
+            zn = (1 << zoom) * float(tileSize)
+            grid = LabelGrid(self._cellSize)
+            offsets = dict()
+            labels = sorted(self._labels, key=lambda label: (-self._labels[label][4], self._labels[label][5]))
+            for label in labels:
+                offsets[label] = self._place(grid, label, zn) if self._inZoomRange(label, zoom) else None
+            cached = (grid, offsets)
+            self._cache[key] = cached
+        return cached[1]
+
+    def _inZoomRange(self, label, zoom):
+        minZoom, maxZoom = self._labels[label][6:]
+        return (minZoom is None or zoom >= minZoom) and (maxZoom is None or zoom <= maxZoom)
+
+    def _place(self, grid, label, zn):
+        # Place a label in the grid, returns its offset or None for a dropped label
+        x, y, width, height = self._labels[label][:4]
+        for rect, offset in self._candidates(x * zn, y * zn, width, height):
+            if not grid.overlapping(rect):
+                grid.insert(label, rect)
+                return offset
+        return None
+
+    def _placeAdded(self, grid, label, zn):
+        # Place a label added after the placement of the grid, as the last label of
+        # its priority. Returns False if the placement must be evaluated again.
+        x, y, width, height, priority = self._labels[label][:5]
+        for rect, offset in self._candidates(x * zn, y * zn, width, height):
+            overlapping = grid.overlapping(rect)
+            if any(self._labels[other][4] >= priority for other in overlapping):
+                # Position not available in the greedy placement
+                continue
+            if overlapping:
+                # Position taken by labels placed after this one in the greedy placement
+                return False
+            grid.insert(label, rect)
+            return offset
+        return None
+
+    def _candidates(self, px, py, width, height):
+        for ox, oy in LABEL_OFFSETS:
+            dx = ox * width
+            dy = oy * height
+            yield (px + dx, py + dy, px + dx + width, py + dy + height), (dx, dy)
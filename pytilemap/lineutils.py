@@ -0,0 +1,311 @@
+from __future__ import division
+
+import numpy as np
+
+
+def _segmentDistance(px, py, ax, ay, bx, by):
+    # Distance of the points p from the segments a-b
+    dx = bx - ax
+    dy = by - ay
+    len2 = dx * dx + dy * dy
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = ((px - ax) * dx + (py - ay) * dy) / len2
+    t[len2 == 0.0] = 0.0
+    np.clip(t, 0.0, 1.0, out=t)
+    return np.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def simplificationTolerances(x, y):
+    """Douglas-Peucker tolerance of each point of a polyline.
+
+    The value of a point is the largest tolerance for which the point is kept by
+    the Douglas-Peucker simplification. The polyline simplified with tolerance
+    ``tol`` is then given by the points with value greater than ``tol``, without
+    running the simplification again. The first and the last points are always kept.
+
+    All the ranges of the same level of the recursion are processed with a single
+    vectorized step.
+
+    Args:
+        x (numpy.ndarray): X coordinates of the points.
+        y (numpy.ndarray): Y coordinates of the points.
+
+    Returns:
+        numpy.ndarray: The tolerance of each point.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    count = len(x)
+    tolerances = np.zeros(count, dtype=np.float64)
+    if count == 0:
+        return tolerances
+    tolerances[0] = tolerances[-1] = np.inf
+
+    starts = np.array([0], dtype=np.int64)
+    ends = np.array([count - 1], dtype=np.int64)
+    limits = np.array([np.inf])
+    while len(starts) > 0:
+        # Discard the ranges without internal points
+        lengths = ends - starts - 1
+        valid = lengths > 0
+        starts = starts[valid]
+        ends = ends[valid]
+        limits = limits[valid]
+        lengths = lengths[valid]
+        if len(starts) == 0:
+            break
+
+        # Internal points of all the ranges
+        offsets = np.cumsum(lengths) - lengths
+        total = int(lengths.sum())
+        rng = np.repeat(np.arange(len(starts)), lengths)
+        index = np.arange(total) - offsets[rng] + starts[rng] + 1
+
+        a = starts[rng]
+        b = ends[rng]
+        dist = _segmentDistance(x[index], y[index], x[a], y[a], x[b], y[b])
+
+        # Farthest point of each range, the first one in case of ties
+        maxDist = np.maximum.reduceat(dist, offsets)
+        candidates = np.where(dist == maxDist[rng], np.arange(total), total)
+        split = index[np.minimum.reduceat(candidates, offsets)]
+
+        # A point can not be more important than the point splitting its range,
+        # so that the points kept by a tolerance always form a sub-polyline
+        limits = np.minimum(maxDist, limits)
+        tolerances[split] = limits
+
+        starts, ends = np.concatenate([starts, split]), np.concatenate([split, ends])
+        limits = np.concatenate([limits, limits])
+
+    return tolerances
+
+
+def visibleRuns(x, y, left, top, right, bottom):
+    """Runs of consecutive segments of a polyline intersecting a rectangle.
+
+    A segment is considered visible if its bounding box intersects the rectangle,
+    so some segments near the corners can be kept even if they are outside.
+
+    Args:
+        x (numpy.ndarray): X coordinates of the points.
+        y (numpy.ndarray): Y coordinates of the points.
+        left (float): Left side of the rectangle.
+        top (float): Top side of the rectangle.
+        right (float): Right side of the rectangle.
+        bottom (float): Bottom side of the rectangle.
+
+    Returns:
+        tuple: (starts, ends) arrays with the indices of the first and of the last
+        point of each run.
+    """
+    x0 = x[:-1]
+    x1 = x[1:]
+    y0 = y[:-1]
+    y1 = y[1:]
+    visible = (np.maximum(x0, x1) >= left) & (np.minimum(x0, x1) <= right) & \
+        (np.maximum(y0, y1) >= top) & (np.minimum(y0, y1) <= bottom)
+
+    edges = np.diff(np.concatenate([[0], visible.view(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends
+
+
+def decimatePolyline(x, y, tolerance):
+    """Indices of the points of a polyline kept at a resolution.
+
+    The points are snapped to a grid of square cells with side ``tolerance`` and
+    only the first point of each run of consecutive points in the same cell is
+    kept, together with the last point. The cost is linear in the number of
+    points and, since the grid does not depend on the points, a part of the
+    polyline keeps the same points as the whole polyline, except at its ends.
+
+    Args:
+        x (numpy.ndarray): X coordinates of the points.
+        y (numpy.ndarray): Y coordinates of the points.
+        tolerance (float): Side of the cells of the grid.
+
+    Returns:
+        numpy.ndarray: The indices of the points kept.
+    """
+    count = len(x)
+    if count <= 2:
+        return np.arange(count)
+    cx = np.floor(np.asarray(x) / tolerance)
+    cy = np.floor(np.asarray(y) / tolerance)
+    kept = np.empty(count, dtype=bool)
+    kept[0] = kept[-1] = True
+    kept[1:-1] = (cx[1:-1] != cx[:-2]) | (cy[1:-1] != cy[:-2])
+    return np.flatnonzero(kept)
+
+
+def interpolatePolyline(times, x, y, time):
+    """Position at a time along a polyline with timestamps.
+
+    The segment containing the time is found with a binary search and the
+    position is linearly interpolated. Times outside the range of the timestamps
+    give the first or the last point.
+
+    Args:
+        times (numpy.ndarray): Sorted timestamps of the points.
+        x (numpy.ndarray): X coordinates of the points.
+        y (numpy.ndarray): Y coordinates of the points.
+        time (float): The time.
+
+    Returns:
+        tuple: (x, y) coordinates of the position.
+    """
+    index = int(np.searchsorted(times, time, side='right'))
+    if index == 0:
+        return float(x[0]), float(y[0])
+    if index == len(times):
+        return float(x[-1]), float(y[-1])
+    t0 = times[index - 1]
+    f = (time - t0) / (times[index] - t0)
+    x0 = x[index - 1]
+    y0 = y[index - 1]
+    return float(x0 + f * (x[index] - x0)), float(y0 + f * (y[index] - y0))
+
+
+class SegmentGrid(object):
+    """Uniform grid of the segments of a polyline, for finding the segment nearest
+    to a point.
+
+    Each segment is stored in the cells covered by its bounding box. The cells of
+    all the segments are built with vectorized operations, as a sorted array of
+    cell keys, so that the segments of a cell are found with a binary search. The
+    segments covering more than :attr:`MaxCells` cells are kept apart and they are
+    tested by every query.
+    """
+
+    MaxCells = 16
+    """int: Maximum number of cells of a segment stored in the grid."""
+
+    def __init__(self, x, y, cellSize=None):
+        """Constructor.
+
+        Args:
+            x (numpy.ndarray): X coordinates of the points.
+            y (numpy.ndarray): Y coordinates of the points.
+            cellSize (float): Side of the cells, default `None` for the median size
+                of the segments.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self._count = len(x)
+        if len(x) == 1:
+            # A single point is a degenerate segment
+            x = np.repeat(x, 2)
+            y = np.repeat(y, 2)
+        self._x = x
+        self._y = y
+
+        left = np.minimum(x[:-1], x[1:])
+        right = np.maximum(x[:-1], x[1:])
+        top = np.minimum(y[:-1], y[1:])
+        bottom = np.maximum(y[:-1], y[1:])
+        count = len(left)
+        if cellSize is None:
+            cellSize = float(np.median(np.maximum(right - left, bottom - top))) if count > 0 else 1.0
+            if not cellSize > 0.0:
+                cellSize = 1.0
+        self._cellSize = cellSize
+
+        cx0 = np.floor(left / cellSize).astype(np.int64)
+        cx1 = np.floor(right / cellSize).astype(np.int64)
+        cy0 = np.floor(top / cellSize).astype(np.int64)
+        cy1 = np.floor(bottom / cellSize).astype(np.int64)
+        widths = cx1 - cx0 + 1
+        cells = widths * (cy1 - cy0 + 1)
+        small = cells <= self.MaxCells
+        self._large = np.flatnonzero(~small)
+
+        segments = np.flatnonzero(small)
+        cells = cells[segments]
+        total = int(cells.sum())
+        rep = np.repeat(np.arange(len(segments)), cells)
+        offsets = np.arange(total) - (np.cumsum(cells) - cells)[rep]
+        cx = cx0[segments][rep] + offsets % widths[segments][rep]
+        cy = cy0[segments][rep] + offsets // widths[segments][rep]
+
+        if total > 0:
+            self._origin = (int(cx.min()), int(cy.min()))
+            self._span = (int(cx.max()) - self._origin[0] + 1, int(cy.max()) - self._origin[1] + 1)
+        else:
+            self._origin = (0, 0)
+            self._span = (0, 0)
+        keys = self._cellKeys(cx, cy)
+        order = np.argsort(keys, kind='mergesort')
+        self._keys = keys[order]
+        self._segments = segments[rep][order]
+
+    def __len__(self):
+        return len(self._x) - 1
+
+    def _cellKeys(self, cx, cy):
+        return (cx - self._origin[0]) * self._span[1] + (cy - self._origin[1])
+
+    def _candidates(self, px, py, tolerance):
+        # Segments stored in the cells near the point, and the large segments
+        cellSize = self._cellSize
+        ox, oy = self._origin
+        x0 = max(int(np.floor((px - tolerance) / cellSize)), ox)
+        x1 = min(int(np.floor((px + tolerance) / cellSize)), ox + self._span[0] - 1)
+        y0 = max(int(np.floor((py - tolerance) / cellSize)), oy)
+        y1 = min(int(np.floor((py + tolerance) / cellSize)), oy + self._span[1] - 1)
+        found = [self._large]
+        if x0 <= x1 and y0 <= y1:
+            cx, cy = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1))
+            keys = self._cellKeys(cx.ravel(), cy.ravel())
+            starts = np.searchsorted(self._keys, keys, side='left')
+            ends = np.searchsorted(self._keys, keys, side='right')
+            found.extend(self._segments[s:e] for s, e in zip(starts.tolist(), ends.tolist()) if e > s)
+        return np.unique(np.concatenate(found))
+
+    def nearestSegment(self, px, py, tolerance):
+        """Segment nearest to a point, within a distance.
+
+        Args:
+            px (float): X coordinate of the point.
+            py (float): Y coordinate of the point.
+            tolerance (float): Maximum distance of the segment from the point.
+
+        Returns:
+            tuple: (index, distance) of the nearest segment, the first one in case of
+            ties, where the segment ``index`` joins the points ``index`` and
+            ``index + 1``; `None` if no segment is within the distance.
+        """
+        candidates = self._candidates(px, py, tolerance)
+        if len(candidates) == 0:
+            return None
+        x = self._x
+        y = self._y
+        dist = _segmentDistance(np.full(len(candidates), float(px)), np.full(len(candidates), float(py)),
+                                x[candidates], y[candidates], x[candidates + 1], y[candidates + 1])
+        best = int(np.argmin(dist))
+        if dist[best] > tolerance:
+            return None
+        return int(candidates[best]), float(dist[best])
+
+    def nearestVertex(self, px, py, tolerance):
+        """Point of the polyline nearest to a point, on the nearest segment.
+
+        Args:
+            px (float): X coordinate of the point.
+            py (float): Y coordinate of the point.
+            tolerance (float): Maximum distance of the polyline from the point.
+
+        Returns:
+            int: Index of the end of the nearest segment closer to the point, or
+            `None` if no segment is within the distance.
+        """
+        nearest = self.nearestSegment(px, py, tolerance)
+        if nearest is None:
+            return None
+        index = nearest[0]
+        x = self._x
+        y = self._y
+        if np.hypot(x[index + 1] - px, y[index + 1] - py) < np.hypot(x[index] - px, y[index] - py):
+            index += 1
+        return min(index, self._count - 1)
@@ -0,0 +1,677 @@
+from __future__ import print_function, absolute_import, division
+
+from collections import OrderedDict
+
+import numpy as np
+
+from .functions import izip
+from .spatialindex import PackedRTree
+
+
+class MapItemRegistry(object):
+    """Registry of the map items of a MapGraphicsScene.
+
+    Items whose geometry is defined by a few points (the *anchors*, see
+    :meth:`MapItem._mercatorAnchors`) store their normalized Mercator coordinates
+    in contiguous arrays. When the zoom level changes, all the anchors are
+    reprojected with a single vectorized operation and the resulting positions are
+    pushed back to the items with :meth:`MapItem._placeAnchors`. The arrays are
+    the only copy of the anchors of the registered items: the items read them with
+    :meth:`anchors` and change them with :meth:`setAnchors`, and the anchors are
+    handed back to an item when it is unregistered (see
+    :meth:`MapItem._anchorsAttached` and :meth:`MapItem._anchorsDetached`).
+
+    The other items (polylines, legend, scale bar, ...) are notified of the new
+    zoom level with :meth:`MapItem.setZoom`.
+
+    The zoom ranges of the items (see :meth:`MapItem.setZoomRange`) are stored in
+    arrays as well. When the zoom level changes, the items hidden at the new zoom
+    level are not reprojected, and the visibility is changed only for the items
+    entering or leaving their zoom range.
+
+    In lazy mode (see :meth:`setLazy`) the items are reprojected only when they
+    are near the visible area: a change of the zoom level reprojects the items
+    whose bounds intersect the visible area, and the items whose position at the
+    zoom level of their last projection falls in the visible area. The other items
+    are reprojected by :meth:`reprojectArea` when the visible area reaches them.
+
+    The registry also answers spatial queries in normalized Mercator space, that
+    do not depend on the zoom level. The bounds of the items are indexed by a
+    :class:`~pytilemap.spatialindex.PackedRTree`, built on the first query after a
+    change of the items. The bounds of the anchored items are evaluated from the
+    anchors arrays; the other items are indexed if they reimplement
+    :meth:`MapItem._mercatorBounds`. The items whose bounds change often, as the
+    tracks, refresh them with :meth:`updateBounds`: their new bounds are checked
+    apart from the index, that is rebuilt only when many items moved.
+
+    Many items can be registered at once between :meth:`beginInsert` and
+    :meth:`endInsert`: their anchors are copied in the arrays and projected with
+    a single vectorized operation.
+    """
+
+    LazyMargin = 0.5
+    """float: Margin around the visible area in lazy mode, relative to its largest side."""
+
+    MaxMovedItems = 16
+    """int: Items refreshed with :meth:`updateBounds` before the spatial index is rebuilt."""
+
+    def __init__(self):
+        self._items = list()  # Anchored item of each slot, None for released slots
+        self._starts = list()  # First row of each slot
+        self._counts = list()  # Number of rows of each slot
+        self._slots = dict()  # Slot index of each anchored item
+        self._others = dict()  # Items without anchors, with their registration order
+
+        self._x = np.empty(64, dtype=np.float64)
+        self._y = np.empty(64, dtype=np.float64)
+        self._size = 0  # Number of used rows
+        self._freeRows = 0  # Number of rows belonging to released slots
+        self._order = 0
+        self._index = None  # Spatial index and indexed items, None if not valid
+        self._moved = dict()  # Bounds of the other items changed after building the index
+
+        self._minZooms = np.empty(16, dtype=np.float64)  # Zoom range of each slot
+        self._maxZooms = np.empty(16, dtype=np.float64)
+        self._shown = np.empty(16, dtype=bool)  # Slots in their zoom range
+        self._projected = np.empty(16, dtype=np.int64)  # Zoom level of the last projection of each slot
+        self._otherShown = dict()  # Other items in their zoom range
+        self._otherProjected = dict()  # Zoom level of the last projection of the other items
+        self._lazy = False
+        self._zoom = None
+        self._zoomScale = None
+        self._pending = None  # Items waiting for endInsert(), None if not inserting
+        self._pendingAnchors = list()  # (items, x, y) anchors given as arrays
+
+    def __len__(self):
+        return len(self._slots) + len(self._others)
+
+    def __contains__(self, item):
+        return item in self._slots or item in self._others
+
+    def items(self):
+        """Registered items.
+
+        Returns:
+            list[MapItem]: Anchored items followed by the other items.
+        """
+        others = sorted(self._others, key=self._others.get)
+        return [item for item in self._items if item is not None] + others
+
+    def add(self, item):
+        """Register an item.
+
+        Args:
+            item(MapItem): The item to register.
+        """
+        if item in self:
+            self.update(item)
+            return
+        if self._pending is not None:
+            self._pending[item] = None
+            return
+
+        self._index = None
+        limits = item._zoomLimits()
+        shown = self._inZoomRange(limits)
+        if not shown:
+            item.setVisible(False)
+
+        anchors = item._mercatorAnchors()
+        if anchors is None:
+            self._others[item] = self._order
+            self._otherShown[item] = shown
+            self._otherProjected[item] = self._projectedZoom()
+            self._order += 1
+            return
+
+        xs, ys = anchors
+        count = len(xs)
+        start = self._allocate(count)
+        self._x[start:start + count] = xs
+        self._y[start:start + count] = ys
+
+        slot = len(self._items)
+        self._reserveSlots(slot + 1)
+        self._minZooms[slot], self._maxZooms[slot] = limits
+        self._shown[slot] = shown
+        self._projected[slot] = self._projectedZoom()
+
+        self._slots[item] = slot
+        self._items.append(item)
+        self._starts.append(start)
+        self._counts.append(count)
+        item._anchorsAttached(self)
+
+    def remove(self, item):
+        """Unregister an item.
+
+        Args:
+            item(MapItem): The item to unregister.
+        """
+        if self._pending is not None:
+            self._pending.pop(item, None)
+        if item not in self:
+            return
+
+        self._index = None
+        if self._others.pop(item, None) is not None:
+            del self._otherShown[item]
+            del self._otherProjected[item]
+            return
+
+        slot = self._slots.pop(item)
+        item._anchorsDetached(*self.anchors(item, slot))
+        self._items[slot] = None
+        self._minZooms[slot] = np.inf
+        self._shown[slot] = False
+        self._projected[slot] = -1
+        self._freeRows += self._counts[slot]
+        if 2 * self._freeRows > self._size:
+            self._compact()
+
+    def update(self, item):
+        """Reload the anchors of an item after a change of its coordinates.
+
+        Args:
+            item(MapItem): The registered item.
+        """
+        if item not in self:
+            return
+
+        self._index = None
+        if item in self._slots:
+            self.setAnchors(item, *item._mercatorAnchors())
+
+    def updateBounds(self, item):
+        """Refresh the bounds of an item without anchors after a change of its geometry.
+
+        Unlike :meth:`update`, the spatial index is kept: the new bounds are checked
+        apart from it, until more than :attr:`MaxMovedItems` items changed.
+
+        Args:
+            item(MapItem): The registered item.
+        """
+        if item not in self._others or self._index is None:
+            self.update(item)
+            return
+
+        self._moved[item] = item._mercatorBounds()
+        if len(self._moved) > self.MaxMovedItems:
+            self._index = None
+
+    def anchors(self, item, slot=None):
+        """Anchors of a registered item.
+
+        Args:
+            item(MapItem): The registered item with anchors.
+            slot(int): The slot of the item, if known.
+
+        Returns:
+            tuple: (xs, ys) lists with the normalized Mercator coordinates of the anchors.
+        """
+        if slot is None:
+            slot = self._slots[item]
+        start = self._starts[slot]
+        end = start + self._counts[slot]
+        return self._x[start:end].tolist(), self._y[start:end].tolist()
+
+    def setAnchors(self, item, xs, ys):
+        """Change the anchors of a registered item.
+
+        Args:
+            item(MapItem): The registered item with anchors.
+            xs(sequence[float]): X normalized Mercator coordinates of the anchors.
+            ys(sequence[float]): Y normalized Mercator coordinates of the anchors.
+        """
+        self._index = None
+        slot = self._slots[item]
+        count = len(xs)
+        if count != self._counts[slot]:
+            # Register the item again with the new anchors, the rows of the slots
+            # must be in the order of the slots
+            self.remove(item)
+            item._anchorsDetached(xs, ys)
+            self.add(item)
+            return
+
+        start = self._starts[slot]
+        self._x[start:start + count] = xs
+        self._y[start:start + count] = ys
+
+    def anchorArrays(self):
+        """Anchors of all the registered items with anchors, in contiguous arrays.
+
+        Returns:
+            tuple: (items, starts, x, y) where ``starts`` is the array of the first
+            row of each item, with one more element with the number of rows, and ``x``
+            and ``y`` are copies of the normalized Mercator coordinates.
+        """
+        if self._freeRows > 0:
+            self._index = None
+            self._compact()
+        size = self._size
+        starts = np.array(self._starts + [size], dtype=np.intp)
+        return list(self._items), starts, self._x[:size].copy(), self._y[:size].copy()
+
+    def beginInsert(self):
+        """Defer the registration of the items added until :meth:`endInsert`."""
+        if self._pending is None:
+            self._pending = OrderedDict()
+
+    def isInserting(self):
+        return self._pending is not None
+
+    def setInsertedAnchors(self, items, x, y):
+        """Set the anchors of items inserted before :meth:`endInsert`, as arrays.
+
+        The anchors are copied in the arrays of the registry at once, instead of
+        being collected from each item. The items must have one anchor each, equal
+        to the anchor stored by the item.
+
+        Args:
+            items (list[MapItem]): The items.
+            x (numpy.ndarray): Normalized Mercator X coordinate of the anchor of each item.
+            y (numpy.ndarray): Normalized Mercator Y coordinate of the anchor of each item.
+        """
+        assert self._pending is not None
+        assert len(items) == len(x) == len(y)
+        self._pendingAnchors.append((items, x, y))
+
+    def endInsert(self):
+        """Register the items added after :meth:`beginInsert`.
+
+        The anchors of all the items are copied in the arrays at once and, after
+        the first reprojection, the items are placed at the current zoom level.
+        """
+        pending = self._pending
+        pendingAnchors = self._pendingAnchors
+        self._pending = None
+        self._pendingAnchors = list()
+        if not pending:
+            return
+
+        for items, x, y in pendingAnchors:
+            if all(item in pending for item in items):
+                for item in items:
+                    del pending[item]
+                self._insertAnchored(items, x, y, np.ones(len(items), dtype=np.int64))
+
+        anchored = list()
+        xs = list()
+        ys = list()
+        counts = list()
+        for item in pending:
+            anchors = item._mercatorAnchors()
+            if anchors is None:
+                self.add(item)
+                if self._zoom is not None:
+                    item.setZoom(self._zoom)
+            else:
+                anchored.append(item)
+                xs.extend(anchors[0])
+                ys.extend(anchors[1])
+                counts.append(len(anchors[0]))
+        if anchored:
+            self._insertAnchored(anchored, xs, ys, np.array(counts, dtype=np.int64))
+
+    def _insertAnchored(self, anchored, xs, ys, counts):
+        # Store the anchors of new items after the used rows and place the items
+        self._index = None
+        total = len(xs)
+        start = self._allocate(total)
+        self._x[start:start + total] = xs
+        self._y[start:start + total] = ys
+        starts = (start + np.cumsum(counts) - counts).tolist()
+
+        first = len(self._items)
+        end = first + len(anchored)
+        self._reserveSlots(end)
+        limits = np.array([item._zoomLimits() for item in anchored], dtype=np.float64)
+        self._minZooms[first:end] = limits[:, 0]
+        self._maxZooms[first:end] = limits[:, 1]
+        zoom = self._zoom
+        if zoom is None:
+            shown = np.ones(len(anchored), dtype=bool)
+        else:
+            shown = (limits[:, 0] <= zoom) & (limits[:, 1] >= zoom)
+        self._shown[first:end] = shown
+        self._projected[first:end] = self._projectedZoom()
+
+        for slot, item in enumerate(anchored, first):
+            self._slots[item] = slot
+            item._anchorsAttached(self)
+        self._items.extend(anchored)
+        self._starts.extend(starts)
+        self._counts.extend(counts.tolist())
+
+        for i in np.flatnonzero(~shown).tolist():
+            anchored[i].setVisible(False)
+        if zoom is not None:
+            zn = self._zoomScale
+            xs = (self._x[start:start + total] * zn).tolist()
+            ys = (self._y[start:start + total] * zn).tolist()
+            for item, itemStart in izip(anchored, starts):
+                item._placeAnchors(xs, ys, itemStart - start)
+
+    def zoom(self):
+        """Zoom level of the last reprojection, `None` before the first one."""
+        return self._zoom
+
+    def isLazy(self):
+        return self._lazy
+
+    def setLazy(self, lazy):
+        """Enable or disable the lazy reprojection of the items.
+
+        Disabling the lazy reprojection does not update the items reprojected
+        lazily: call :meth:`reproject` for updating them.
+
+        Args:
+            lazy(bool): `True` for reprojecting only the items near the visible area.
+        """
+        self._lazy = lazy
+
+    def reproject(self, zoom, tileSize, area=None):
+        """Update the position of the registered items.
+
+        Args:
+            zoom(int): The new zoom level.
+            tileSize(int): The size of the tile.
+            area(tuple): (minX, minY, maxX, maxY) visible area in normalized Mercator
+                coordinates. Used only in lazy mode, where only the items near the area
+                are reprojected.
+        """
+        size = self._size
+        zn = (1 << zoom) * float(tileSize)
+        self._zoom = zoom
+        self._zoomScale = zn
+
+        # Change the visibility of the items entering or leaving their zoom range.
+        # Released slots have an empty zoom range, so they are never changed.
+        items = self._items
+        slots = len(items)
+        shown = (self._minZooms[:slots] <= zoom) & (self._maxZooms[:slots] >= zoom)
+        for slot in np.flatnonzero(shown != self._shown[:slots]).tolist():
+            items[slot].setVisible(bool(shown[slot]))
+        self._shown[:slots] = shown
+
+        lazy = self._lazy and area is not None
+        if not lazy:
+            xs = (self._x[:size] * zn).tolist()
+            ys = (self._y[:size] * zn).tolist()
+            starts = self._starts
+            visibleSlots = np.flatnonzero(shown)
+            for slot in visibleSlots.tolist():
+                items[slot]._placeAnchors(xs, ys, starts[slot])
+            self._projected[visibleSlots] = zoom
+
+        for item in sorted(self._others, key=self._others.get):
+            inRange = self._inZoomRange(item._zoomLimits())
+            if inRange != self._otherShown[item]:
+                item.setVisible(inRange)
+                self._otherShown[item] = inRange
+            # Items without bounds can not be found in the visible area
+            if inRange and (not lazy or item._mercatorBounds() is None):
+                item.setZoom(zoom)
+                self._otherProjected[item] = zoom
+
+        if lazy:
+            self.reprojectArea(area)
+
+    def reprojectArea(self, area):
+        """Reproject the items near an area, if they are not updated.
+
+        Used only in lazy mode.
+
+        Args:
+            area(tuple): (minX, minY, maxX, maxY) visible area in normalized Mercator
+                coordinates.
+        """
+        zoom = self._zoom
+        if not self._lazy or zoom is None:
+            return
+
+        index, items, slots = self._spatialIndex()
+        numSlots = len(self._items)
+        shown = self._shown[:numSlots]
+        projected = self._projected[:numSlots]
+
+        # Zoom levels of the positions of the items not updated
+        staleZooms = set(np.unique(projected[shown & (projected != zoom)]).tolist())
+        staleZooms.update(z for item, z in self._otherProjected.items()
+                          if z != zoom and self._otherShown[item])
+        if not staleZooms:
+            return
+
+        minX, minY, maxX, maxY = area
+        margin = max(maxX - minX, maxY - minY) * self.LazyMargin
+        minX -= margin
+        minY -= margin
+        maxX += margin
+        maxY += margin
+
+        # Items in the area, and items whose old position is in the area
+        boxes = [(minX, minY, maxX, maxY)]
+        for staleZoom in staleZooms:
+            if staleZoom >= 0:
+                scale = 2.0 ** (zoom - staleZoom)
+                boxes.append((minX * scale, minY * scale, maxX * scale, maxY * scale))
+        found = np.unique(np.concatenate([index.search(*box) for box in boxes]))
+
+        numAnchored = len(slots)
+        foundSlots = slots[found[found < numAnchored]]
+        foundSlots = foundSlots[shown[foundSlots] & (projected[foundSlots] != zoom)]
+        for slot in foundSlots.tolist():
+            self._placeSlot(slot)
+        self._projected[foundSlots] = zoom
+
+        others = [items[i] for i in found[found >= numAnchored].tolist()]
+        if self._moved:
+            others = set(item for item in others if item not in self._moved)
+            for box in boxes:
+                others.update(self._movedInBox(*box))
+        for item in others:
+            if self._otherShown[item] and self._otherProjected[item] != zoom:
+                item.setZoom(zoom)
+                self._otherProjected[item] = zoom
+
+    def _placeSlot(self, slot):
+        start = self._starts[slot]
+        end = start + self._counts[slot]
+        self._items[slot]._placeAnchors((self._x[start:end] * self._zoomScale).tolist(),
+                                        (self._y[start:end] * self._zoomScale).tolist(), 0)
+
+    def updateZoomRange(self, item):
+        """Update the visibility of an item after a change of its zoom range.
+
+        Args:
+            item(MapItem): The registered item.
+        """
+        limits = item._zoomLimits()
+        slot = self._slots.get(item)
+        if slot is not None:
+            self._minZooms[slot], self._maxZooms[slot] = limits
+            wasShown = self._shown[slot]
+        elif item in self._others:
+            wasShown = self._otherShown[item]
+        else:
+            return
+
+        shown = self._inZoomRange(limits)
+        if shown == wasShown:
+            return
+        if slot is not None:
+            self._shown[slot] = shown
+        else:
+            self._otherShown[item] = shown
+        item.setVisible(shown)
+
+        # The item was not updated while it was hidden
+        if shown and self._zoom is not None:
+            if slot is not None:
+                self._placeSlot(slot)
+                self._projected[slot] = self._zoom
+            else:
+                item.setZoom(self._zoom)
+                self._otherProjected[item] = self._zoom
+
+    def _projectedZoom(self):
+        # Zoom level of the projection of the items being added, updated by the scene
+        return -1 if self._zoom is None else self._zoom
+
+    def _inZoomRange(self, limits):
+        zoom = self._zoom
+        return zoom is None or limits[0] <= zoom <= limits[1]
+
+    def itemsInBox(self, minX, minY, maxX, maxY):
+        """Items intersecting a rectangle.
+
+        Args:
+            minX(float): Left side of the rectangle in normalized Mercator coordinates.
+            minY(float): Top side of the rectangle in normalized Mercator coordinates.
+            maxX(float): Right side of the rectangle in normalized Mercator coordinates.
+            maxY(float): Bottom side of the rectangle in normalized Mercator coordinates.
+
+        Returns:
+            list[MapItem]: The items, in the order of :meth:`items`.
+        """
+        index, items, slots = self._spatialIndex()
+        found = np.sort(index.search(minX, minY, maxX, maxY))
+        if not self._moved:
+            return [items[i] for i in found.tolist()]
+
+        # The anchored items come first in the index
+        numAnchored = np.searchsorted(found, len(slots))
+        others = [items[i] for i in found[numAnchored:].tolist() if items[i] not in self._moved]
+        others += self._movedInBox(minX, minY, maxX, maxY)
+        return [items[i] for i in found[:numAnchored].tolist()] + sorted(others, key=self._others.get)
+
+    def nearestItems(self, x, y, k=1, maxDistance=np.inf):
+        """Items nearest to a point.
+
+        Args:
+            x(float): X coordinate of the point in normalized Mercator coordinates.
+            y(float): Y coordinate of the point in normalized Mercator coordinates.
+            k(int): Maximum number of items. Default 1.
+            maxDistance(float): Maximum distance of the items from the point.
+
+        Returns:
+            list[MapItem]: The items, sorted by distance.
+        """
+        index, items, _ = self._spatialIndex()
+        moved = self._moved
+        found, distances = index.nearest(x, y, k + len(moved), maxDistance)
+        found = [(distance, items[i]) for i, distance in izip(found.tolist(), distances.tolist())]
+        if moved:
+            found = [(distance, item) for distance, item in found if item not in moved]
+            for item, bounds in moved.items():
+                if bounds is None:
+                    continue
+                minX, minY, maxX, maxY = bounds
+                distance = float(np.hypot(max(minX - x, x - maxX, 0.0), max(minY - y, y - maxY, 0.0)))
+                if distance <= maxDistance:
+                    found.append((distance, item))
+            found.sort(key=lambda entry: entry[0])
+        return [item for _, item in found[:k]]
+
+    def _movedInBox(self, minX, minY, maxX, maxY):
+        # Items refreshed with updateBounds() intersecting a rectangle
+        return [item for item, bounds in self._moved.items()
+                if bounds is not None and bounds[0] <= maxX and bounds[2] >= minX and
+                bounds[1] <= maxY and bounds[3] >= minY]
+
+    def _spatialIndex(self):
+        if self._index is not None:
+            return self._index
+
+        # Bounds of the anchors of all the slots, the slots are contiguous
+        size = self._size
+        items = list()
+        bounds = list()
+        slots = np.flatnonzero([item is not None for item in self._items])
+        if len(slots) > 0:
+            starts = np.array(self._starts, dtype=np.intp)
+            x = self._x[:size]
+            y = self._y[:size]
+            bounds = [np.minimum.reduceat(x, starts)[slots], np.minimum.reduceat(y, starts)[slots],
+                      np.maximum.reduceat(x, starts)[slots], np.maximum.reduceat(y, starts)[slots]]
+            items = [self._items[slot] for slot in slots.tolist()]
+
+        others = list()
+        otherBounds = list()
+        for item in sorted(self._others, key=self._others.get):
+            itemBounds = item._mercatorBounds()
+            if itemBounds is not None:
+                others.append(item)
+                otherBounds.append(itemBounds)
+        if otherBounds:
+            otherBounds = np.array(otherBounds, dtype=np.float64).T
+            if bounds:
+                bounds = [np.concatenate([b, o]) for b, o in izip(bounds, otherBounds)]
+            else:
+                bounds = list(otherBounds)
+            items += others
+
+        if not bounds:
+            bounds = [np.empty(0)] * 4
+        self._index = (PackedRTree(*bounds), items, slots)
+        self._moved = dict()
+        return self._index
+
+    def _allocate(self, count):
+        start = self._size
+        end = start + count
+        capacity = len(self._x)
+        if end > capacity:
+            capacity = max(2 * capacity, end)
+            self._x = self._resized(self._x, capacity, self._size)
+            self._y = self._resized(self._y, capacity, self._size)
+        self._size = end
+        return start
+
+    def _reserveSlots(self, count):
+        # Grow the arrays of the slots for holding at least count slots
+        capacity = len(self._shown)
+        if count > capacity:
+            capacity = max(2 * capacity, count)
+            size = len(self._items)
+            self._minZooms = self._resized(self._minZooms, capacity, size)
+            self._maxZooms = self._resized(self._maxZooms, capacity, size)
+            self._shown = self._resized(self._shown, capacity, size)
+            self._projected = self._resized(self._projected, capacity, size)
+
+    def _resized(self, array, capacity, size):
+        resized = np.empty(capacity, dtype=array.dtype)
+        resized[:size] = array[:size]
+        return resized
+
+    def _compact(self):
+        # Move the rows of the live slots to the beginning of the arrays
+        items = list()
+        starts = list()
+        counts = list()
+        rows = list()
+        slots = list()
+        size = 0
+        for slot, (item, start, count) in enumerate(izip(self._items, self._starts, self._counts)):
+            if item is None:
+                continue
+            slots.append(slot)
+            self._slots[item] = len(items)
+            items.append(item)
+            starts.append(size)
+            counts.append(count)
+            rows.append(np.arange(start, start + count))
+            size += count
+
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.intp)
+        self._x[:size] = self._x[rows]
+        self._y[:size] = self._y[rows]
+        for array in (self._minZooms, self._maxZooms, self._shown, self._projected):
+            array[:len(slots)] = array[slots]
+
+        self._items = items
+        self._starts = starts
+        self._counts = counts
+        self._size = size
+        self._freeRows = 0
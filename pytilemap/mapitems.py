@@ -1,49 +1,113 @@
 from __future__ import print_function, absolute_import
 
+from collections import OrderedDict
+
 import numpy as np
 
 from qtpy.QtCore import Qt, QLineF, QPointF, QRectF
-from qtpy.QtGui import QPainterPath
+from qtpy.QtGui import QPainterPath, QPolygonF, QColor, QPen, QBrush, QPainter, QPixmap
 from qtpy.QtWidgets import QGraphicsEllipseItem, QGraphicsLineItem, \
-    QGraphicsPathItem, QGraphicsPixmapItem, QGraphicsItemGroup, \
+    QGraphicsPathItem, QGraphicsPixmapItem, \
     QGraphicsSimpleTextItem, QGraphicsItem, QGraphicsRectItem
 
-from .functions import iterRange, makePen, izip
+from .functions import iterRange, makeBrush, makeColor, makeImage, makePen, makePixmapFragments, \
+    makePolygonF, makeRgbaArray, izip
 from .qtsupport import getQVariantValue
+from .tileutils import mercatorFromLonLat, lonLatFromPos
+from .lineutils import simplificationTolerances, visibleRuns, decimatePolyline, interpolatePolyline, \
+    SegmentGrid
+from .clusterutils import PointClusters
+from .heatmaputils import PointDensity, colormapLut, gaussianKernel
+from .atlasutils import packShelves
 
 SolidLine = Qt.SolidLine
 
 
+def _styleGroups(sizes, rgba):
+    # Sort the elements by size and color. Returns the order of the elements, the
+    # bounds of the groups with the same style and the size and color of each group
+    count = len(sizes)
+    uniqueSizes, sizeIndex = np.unique(sizes, return_inverse=True)
+    uniqueColors, colorIndex = np.unique(rgba, return_inverse=True)
+    group = sizeIndex * len(uniqueColors) + colorIndex
+    order = np.argsort(group, kind='mergesort')
+    group = group[order]
+    offsets = np.flatnonzero(np.diff(group)) + 1
+    starts = np.concatenate([[0], offsets]) if count > 0 else offsets
+
+    styles = [(float(uniqueSizes[g // len(uniqueColors)]), QColor.fromRgba(int(uniqueColors[g % len(uniqueColors)])))
+              for g in group[starts].tolist()]
+    return order, np.concatenate([starts, [count]]), styles
+
+
+def _arrayBounds(x, y):
+    # Bounds of the coordinates arrays, None if there are no coordinates
+    if len(x) == 0:
+        return None
+    return float(x.min()), float(y.min()), float(x.max()), float(y.max())
+
+
 class MapItem(object):
     """Base class for each item in the MapGraphicScene
 
-    The default implementation connects the MapGraphicScene.sigZoomChanged() signal
-    to the MapItem.setZoom() slot. This slot call the MapItem.updatePosition() method
-    for updating the position of the item in reaction to a change in the zoom level.
+    The default implementation registers the item in the registry of the
+    MapGraphicScene when the item is added to the scene. When the zoom level
+    changes, the scene updates the position of all the registered items at once.
+
+    Items cache the coordinates of their geometry in normalized Mercator space
+    (see :func:`~pytilemap.tileutils.mercatorFromLonLat`), so that a change of the
+    zoom level only requires a scaling of the cached coordinates.
+
+    Items whose geometry is defined by a few points reimplement
+    :meth:`_mercatorAnchors` and :meth:`_placeAnchors`: their anchors are
+    reprojected by the scene with a single vectorized operation. The other items
+    are notified with :meth:`setZoom`, that calls :meth:`updatePosition`.
+
+    The anchors set with :meth:`_setMercatorAnchors` are stored only in the
+    contiguous arrays of the scene while the item belongs to a scene, and by the
+    item itself otherwise.
+
+    Each item can be shown only in a range of zoom levels (see
+    :meth:`setZoomRange`). The items hidden at the current zoom level are not
+    updated by the scene.
+
+    The drawing of an item can be cached by the scene (see :meth:`setCacheManaged`).
     """
 
     QtParentClass = None
 
+    _cacheManaged = False
+
     def __init__(self):
         if not isinstance(self, QGraphicsItem):
             raise RuntimeError('MapItem must be an instance of QGraphicsItem')
+        self._minZoom = None
+        self._maxZoom = None
+        self._anchors = None  # Anchors of the item, or the registry storing them
 
     def itemChange(self, change, value):
         if change == self.ItemSceneChange:
-            # Disconnect the old scene, if any
+            # Unregister from the old scene, if any
             oldScene = self.scene()
             if oldScene is not None:
-                oldScene.sigZoomChanged.disconnect(self.setZoom)
-            # Connect the new scene, if any
+                oldScene._mapItems.remove(self)
+            # Register in the new scene, if any
             newScene = getQVariantValue(value)
             if newScene is not None:
-                newScene.sigZoomChanged.connect(self.setZoom)
+                newScene._mapItems.add(self)
+
+            if self._cacheManaged:
+                if oldScene is not None:
+                    oldScene._cacheItemRemoved(self)
+                if newScene is not None:
+                    newScene._cacheItemAdded(self)
 
             # Notify the item that the scene is changed
             self._sceneChanged(oldScene, newScene)
 
-            # Setup the new position of the item
-            if newScene is not None:
+            # Setup the new position of the item, the items inserted in bulk are
+            # placed by the registry
+            if newScene is not None and not newScene._mapItems.isInserting():
                 self.updatePosition(newScene)
 
         return self.QtParentClass.itemChange(self, change, value)
@@ -67,6 +131,176 @@ class MapItem(object):
         """
         pass
 
+    def isCacheManaged(self):
+        return self._cacheManaged
+
+    def setCacheManaged(self, managed=True):
+        """Draw the item from a pixmap cached by the scene.
+
+        The item is cached in device coordinates (see
+        `QGraphicsItem.DeviceCoordinateCache`): while panning, the cached pixmap is
+        drawn and only a change of the zoom level or of the item invalidates it.
+        The scene enables the cache of the managed items as long as their memory
+        fits in its budget (see :meth:`MapGraphicsScene.setCacheBudget`).
+
+        Args:
+            managed(bool): `True` for caching the drawing of the item.
+        """
+        if managed == self._cacheManaged:
+            return
+        scene = self.scene()
+        if scene is not None:
+            if managed:
+                scene._cacheItemAdded(self)
+            else:
+                scene._cacheItemRemoved(self)
+        self._cacheManaged = managed
+        if scene is not None:
+            self.updatePosition(scene)
+
+    def zoomRange(self):
+        """Range of zoom levels where the item is shown.
+
+        Returns:
+            tuple: (minZoom, maxZoom), `None` for no limit.
+        """
+        return self._minZoom, self._maxZoom
+
+    def setZoomRange(self, minZoom=None, maxZoom=None):
+        """Set the range of zoom levels where the item is shown.
+
+        The item is hidden, with :meth:`setVisible`, when the zoom level of the
+        scene leaves the range and it is shown again when the zoom level enters the
+        range. Hidden items are not updated when the zoom level changes.
+
+        Args:
+            minZoom(int): Minimum zoom level, default `None` for no limit.
+            maxZoom(int): Maximum zoom level, default `None` for no limit.
+        """
+        self._minZoom = minZoom
+        self._maxZoom = maxZoom
+        scene = self.scene()
+        if scene is not None:
+            scene._mapItems.updateZoomRange(self)
+
+    def _zoomLimits(self):
+        minZoom = -np.inf if self._minZoom is None else self._minZoom
+        maxZoom = np.inf if self._maxZoom is None else self._maxZoom
+        return minZoom, maxZoom
+
+    def _mercatorAnchors(self):
+        """Normalized Mercator coordinates of the anchors of the item.
+
+        Reimplement this function, together with :meth:`_placeAnchors`, for items
+        whose geometry is defined by a fixed number of points.
+
+        Returns:
+            tuple: (xs, ys) sequences with the coordinates of the anchors, or ``None``
+            if the item must be updated with :meth:`setZoom`.
+        """
+        return None
+
+    def _setMercatorAnchors(self, xs, ys):
+        """Set the normalized Mercator coordinates of the anchors of the item.
+
+        Args:
+            xs (sequence[float]): X coordinates of the anchors.
+            ys (sequence[float]): Y coordinates of the anchors.
+        """
+        registry = self._anchors
+        if registry is None or isinstance(registry, tuple):
+            self._anchors = (tuple(xs), tuple(ys))
+        else:
+            registry.setAnchors(self, xs, ys)
+            self.updatePosition(self.scene())
+
+    def _storedAnchors(self):
+        """Anchors set with :meth:`_setMercatorAnchors`.
+
+        Returns:
+            tuple: (xs, ys) sequences with the coordinates of the anchors.
+        """
+        anchors = self._anchors
+        if isinstance(anchors, tuple):
+            return anchors
+        return anchors.anchors(self)
+
+    @classmethod
+    def _fromMercatorAnchors(cls, xs, ys, *args):
+        """Create an item from the normalized Mercator coordinates of its anchors.
+
+        The item is initialized with :meth:`_initItem`, so that the coordinates
+        projected in bulk are not projected again for each item.
+
+        Args:
+            xs (tuple[float]): X coordinates of the anchors.
+            ys (tuple[float]): Y coordinates of the anchors.
+            args: Arguments of :meth:`_initItem`.
+
+        Returns:
+            MapItem: The new item.
+        """
+        item = cls.__new__(cls)
+        item._initItem(*args)
+        item._anchors = (xs, ys)
+        return item
+
+    def _anchorsAttached(self, registry):
+        """Called when the registry of a scene stores the anchors of the item.
+
+        Args:
+            registry (MapItemRegistry): The registry storing the anchors.
+        """
+        self._anchors = registry
+
+    def _anchorsDetached(self, xs, ys):
+        """Called when the scene releases the anchors of the item.
+
+        Args:
+            xs (list[float]): X coordinates of the anchors.
+            ys (list[float]): Y coordinates of the anchors.
+        """
+        self._anchors = (tuple(xs), tuple(ys))
+
+    def _mercatorBounds(self):
+        """Bounds of the item in normalized Mercator coordinates.
+
+        Reimplement this function for items updated with :meth:`setZoom` that must
+        be found by the spatial queries of the scene. The bounds of the items with
+        anchors are evaluated by the scene. The extent in pixels of the drawing of
+        the item (pen width, radius of markers, ...) is not included.
+
+        Returns:
+            tuple: (minX, minY, maxX, maxY) bounds, or ``None`` if the item is not
+            indexed.
+        """
+        return None
+
+    def _initItem(self, *args):
+        """Initialize the item, without its coordinates.
+
+        Reimplement this function for items that can be created in bulk with
+        :meth:`_fromMercatorAnchors`.
+        """
+        raise NotImplementedError()
+
+    def _placeAnchors(self, xs, ys, index):
+        """Place the item using the scene positions of its anchors.
+
+        Args:
+            xs (list[float]): X positions of the anchors.
+            ys (list[float]): Y positions of the anchors.
+            index (int): Position of the first anchor of the item in ``xs`` and ``ys``.
+        """
+        raise NotImplementedError()
+
+    def _coordinatesChanged(self):
+        """Update the item after a change of its coordinates."""
+        scene = self.scene()
+        if scene is not None:
+            scene._mapItems.update(self)
+            self.updatePosition(scene)
+
     def setZoom(self, zoom):
         '''Set a new zoom level.
 
@@ -77,7 +311,18 @@ class MapItem(object):
         self.updatePosition(scene)
 
     def updatePosition(self, scene):
-        raise NotImplementedError()
+        """Update the position of the item.
+
+        The default implementation projects the anchors of the item.
+
+        Args:
+            scene(MapGraphicsScene): Scene the item belongs to.
+        """
+        anchors = self._mercatorAnchors()
+        if anchors is None:
+            raise NotImplementedError()
+        xs, ys = scene.posFromMercator(np.asarray(anchors[0]), np.asarray(anchors[1]))
+        self._placeAnchors(xs.tolist(), ys.tolist(), 0)
 
 
 class MapGraphicsCircleItem(QGraphicsEllipseItem, MapItem):
@@ -99,24 +344,29 @@ class MapGraphicsCircleItem(QGraphicsEllipseItem, MapItem):
         Note:
             The management of the parent item is work in progress.
         """
+        self._initItem(radius, parent)
+        self.setLonLat(longitude, latitude)
+
+    def _initItem(self, radius, parent=None):
         QGraphicsEllipseItem.__init__(self, parent=parent)
         MapItem.__init__(self)
 
-        self._lon = longitude
-        self._lat = latitude
         self._radius = radius
 
-    def updatePosition(self, scene):
+    def _mercatorAnchors(self):
+        return self._storedAnchors()
+
+    def _placeAnchors(self, xs, ys, index):
         """Update the position of the circle.
 
         Args:
-            scene(MapGraphicsScene): Scene to which the circle belongs.
+            xs (list[float]): X positions of the anchors.
+            ys (list[float]): Y positions of the anchors.
+            index (int): Position of the center of the circle in ``xs`` and ``ys``.
         """
-        pos = scene.posFromLonLat(self._lon, self._lat)
         r = self._radius
         d = r * 2
-        self.prepareGeometryChange()
-        self.setRect(pos[0] - r, pos[1] - r, d, d)
+        self.setRect(xs[index] - r, ys[index] - r, d, d)
 
     def setLonLat(self, longitude, latitude):
         """Set the center coordinates of the circle.
@@ -125,11 +375,8 @@ class MapGraphicsCircleItem(QGraphicsEllipseItem, MapItem):
             longitude(float): Longitude of the center of the circle.
             latitude(float): Latitude of the center of the circle.
         """
-        self._lon = longitude
-        self._lat = latitude
-        scene = self.scene()
-        if scene is not None:
-            self.updatePosition(scene)
+        mx, my = mercatorFromLonLat(longitude, latitude)
+        self._setMercatorAnchors((mx,), (my,))
 
     def setRadius(self, radius):
         self._radius = radius
@@ -160,33 +407,27 @@ class MapGraphicsRectItem(QGraphicsRectItem, MapItem):
         QGraphicsRectItem.__init__(self, parent=parent)
         MapItem.__init__(self)
 
-        self._lon0 = lon0
-        self._lat0 = lat0
-        self._lon1 = lon1
-        self._lat1 = lat1
+        self.setLonLat(lon0, lat0, lon1, lat1)
 
-    def updatePosition(self, scene):
-        """Update the position of the circle.
+    def _mercatorAnchors(self):
+        return self._storedAnchors()
+
+    def _placeAnchors(self, xs, ys, index):
+        """Update the position of the rect.
 
         Args:
-            scene(MapGraphicsScene): Scene to which the circle belongs.
+            xs (list[float]): X positions of the anchors.
+            ys (list[float]): Y positions of the anchors.
+            index (int): Position of the top left point in ``xs`` and ``ys``.
         """
-        pos0 = scene.posFromLonLat(self._lon0, self._lat0)
-        pos1 = scene.posFromLonLat(self._lon1, self._lat1)
-
-        self.prepareGeometryChange()
-        rect = QRectF(pos0, pos1).normalized()
+        rect = QRectF(QPointF(xs[index], ys[index]), QPointF(xs[index + 1], ys[index + 1])).normalized()
         self.setRect(rect)
         self.setPos(QPointF(0.0, 0.0))
 
     def setLonLat(self, lon0, lat0, lon1, lat1):
-        self._lon0 = lon0
-        self._lat0 = lat0
-        self._lon1 = lon1
-        self._lat1 = lat1
-        scene = self.scene()
-        if scene is not None:
-            self.updatePosition(self.scene())
+        x0, y0 = mercatorFromLonLat(lon0, lat0)
+        x1, y1 = mercatorFromLonLat(lon1, lat1)
+        self._setMercatorAnchors((x0, x1), (y0, y1))
 
 
 class MapGraphicsLineItem(QGraphicsLineItem, MapItem):
@@ -197,65 +438,229 @@ class MapGraphicsLineItem(QGraphicsLineItem, MapItem):
         QGraphicsLineItem.__init__(self, parent=parent)
         MapItem.__init__(self)
 
-        self._lon0 = lon0
-        self._lat0 = lat0
-        self._lon1 = lon1
-        self._lat1 = lat1
+        self.setLonLat(lon0, lat0, lon1, lat1)
 
-    def updatePosition(self, scene):
-        pos0 = scene.posFromLonLat(self._lon0, self._lat0)
-        pos1 = scene.posFromLonLat(self._lon1, self._lat1)
-        deltaPos = QPointF(pos1[0] - pos0[0], pos1[1] - pos0[1])
+    def _mercatorAnchors(self):
+        return self._storedAnchors()
+
+    def _placeAnchors(self, xs, ys, index):
+        x0 = xs[index]
+        y0 = ys[index]
+        deltaPos = QPointF(xs[index + 1] - x0, ys[index + 1] - y0)
 
-        self.prepareGeometryChange()
         self.setLine(QLineF(QPointF(0.0, 0.0), deltaPos))
-        self.setPos(pos0[0], pos0[1])
+        self.setPos(x0, y0)
 
     def setLonLat(self, lon0, lat0, lon1, lat1):
-        self._lon0 = lon0
-        self._lat0 = lat0
-        self._lon1 = lon1
-        self._lat1 = lat1
-        scene = self.scene()
-        if scene is not None:
-            self.updatePosition(self.scene())
+        x0, y0 = mercatorFromLonLat(lon0, lat0)
+        x1, y1 = mercatorFromLonLat(lon1, lat1)
+        self._setMercatorAnchors((x0, x1), (y0, y1))
 
 
 class MapGraphicsPolylineItem(QGraphicsPathItem, MapItem):
+    """Polyline item for the MapGraphicsScene.
+
+    The polyline is simplified for each zoom level with the Douglas-Peucker
+    algorithm, so that the number of drawn points does not grow with the number
+    of points falling in the same pixel. The points kept for each zoom level are
+    evaluated lazily and cached.
+
+    The geometry of the item is clipped to the visible area of the scene, enlarged
+    by a margin, and it is clipped again only when the visible area moves past
+    the margin. The geometry of an item with managed cache (see
+    :meth:`MapItem.setCacheManaged`) is not clipped, so that panning does not
+    invalidate the cache.
+
+    The hit-tests (:meth:`contains` and :meth:`vertexAt`) look for the nearest
+    segment in a grid of the drawn segments (see
+    :class:`~pytilemap.lineutils.SegmentGrid`), built lazily for the current zoom
+    level and released when the drawn points change, instead of testing the
+    stroked path.
+    """
 
     QtParentClass = QGraphicsPathItem
 
+    ClipMargin = 0.5
+    """float: Margin around the visible area, relative to its largest side."""
+
+    HitTolerance = 2.0
+    """float: Minimum distance in pixels from the polyline of a point hitting it."""
+
     def __init__(self, longitudes, latitudes, parent=None):
         QGraphicsPathItem.__init__(self, parent=parent)
         MapItem.__init__(self)
 
         assert len(longitudes) == len(latitudes)
 
-        self._longitudes = np.array(longitudes, dtype=np.float64)
-        self._latitudes = np.array(latitudes, dtype=np.float64)
+        self._polygons = list()
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        self._clipRect = QRectF()
+        self._shape = None
+        self._zoomScale = None
+        self._indices = None  # Indices of the drawn points, None for all the points
+        self._segmentGrid = None  # Grid of the drawn segments, None if not built
+        self._simplificationTolerance = 0.5
+        self._setCoordinates(longitudes, latitudes)
+
+    def _setCoordinates(self, longitudes, latitudes):
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        self._mercator = mercatorFromLonLat(longitudes, latitudes)
+        self._tolerances = None
+        self._lodCache = dict()
+        self._segmentGrid = None
+
+    def simplificationTolerance(self):
+        """Tolerance of the simplification of the polyline.
+
+        Returns:
+            float: Tolerance in pixels, or ``None`` if the simplification is disabled.
+        """
+        return self._simplificationTolerance
 
-    def updatePosition(self, scene):
-        path = QPainterPath()
+    def setSimplificationTolerance(self, tolerance):
+        """Set the tolerance of the simplification of the polyline.
 
-        self.prepareGeometryChange()
+        Args:
+            tolerance(float): Maximum distance in pixels between the drawn polyline and
+                the original one, ``None`` for disabling the simplification. Default 0.5.
+        """
+        self._simplificationTolerance = tolerance
+        self._lodCache = dict()
+        self._segmentGrid = None
+        scene = self.scene()
+        if scene is not None:
+            self.updatePosition(scene)
+
+    def _levelOfDetail(self, zoom, tileSize):
+        # Indices of the points kept at the zoom level, None for all the points
+        tolerance = self._simplificationTolerance
+        if not tolerance or len(self._mercator[0]) <= 2:
+            return None
+
+        indices = self._lodCache.get(zoom)
+        if indices is None:
+            if self._tolerances is None:
+                self._tolerances = simplificationTolerances(*self._mercator)
+            mercatorTolerance = tolerance / ((1 << zoom) * float(tileSize))
+            indices = np.flatnonzero(self._tolerances > mercatorTolerance)
+            self._lodCache[zoom] = indices
+        return indices
+
+    def _mercatorBounds(self):
+        return _arrayBounds(*self._mercator)
+
+    def _sceneChanged(self, oldScene, newScene):
+        if oldScene is not None:
+            oldScene.sceneRectChanged.disconnect(self._setSceneRect)
+        if newScene is not None:
+            newScene.sceneRectChanged.connect(self._setSceneRect)
+
+    def _setSceneRect(self, rect):
+        if not self._clipRect.contains(rect):
+            self._updateClip(rect)
+
+    def _updateClip(self, rect):
+        # The polygons are filled in bulk from the projected arrays and they are
+        # used for drawing, the path is used for the geometry of the item.
+        if self._cacheManaged:
+            # Large enough for containing the scene at any zoom level
+            margin = 1e30
+        else:
+            margin = max(rect.width(), rect.height()) * self.ClipMargin
+        clipRect = rect.adjusted(-margin, -margin, margin, margin)
 
-        count = len(self._longitudes)
-        if count > 0:
-            x, y = scene.posFromLonLat(self._longitudes, self._latitudes)
-            path.moveTo(x[0], y[0])
-            for i in iterRange(1, count):
-                path.lineTo(x[i], y[i])
+        x = self._x
+        y = self._y
+        starts, ends = visibleRuns(x, y, clipRect.left(), clipRect.top(), clipRect.right(), clipRect.bottom())
+        polygons = [makePolygonF(x[s:e + 1], y[s:e + 1]) for s, e in izip(starts, ends)]
+        path = QPainterPath()
+        for polygon in polygons:
+            path.addPolygon(polygon)
 
+        self._polygons = polygons
+        self._clipRect = clipRect
+        self._shape = None
         self.setPath(path)
 
+    def updatePosition(self, scene):
+        mx, my = self._mercator
+        indices = self._levelOfDetail(scene.zoom(), scene.tileSize())
+        if indices is not None:
+            mx = mx[indices]
+            my = my[indices]
+        self._zoomScale = (1 << scene.zoom()) * float(scene.tileSize())
+        self._indices = indices
+        self._x, self._y = scene.posFromMercator(mx, my)
+        self._segmentGrid = None
+        self._updateClip(scene.sceneRect())
+
+    def setPen(self, pen):
+        self._shape = None
+        QGraphicsPathItem.setPen(self, pen)
+
+    def shape(self):
+        # The stroked path is expensive for long polylines
+        if self._shape is None:
+            self._shape = QGraphicsPathItem.shape(self)
+        return self._shape
+
+    def _hitGrid(self):
+        # Grid of the drawn segments, built on the first hit-test after a change
+        if self._segmentGrid is None:
+            self._segmentGrid = SegmentGrid(self._x, self._y)
+        return self._segmentGrid
+
+    def vertexAt(self, pos, tolerance=None):
+        """Point of the polyline nearest to a position.
+
+        Args:
+            pos(QPointF): The position, in item coordinates.
+            tolerance(float): Maximum distance in pixels of the polyline from the
+                position, default `None` for half the width of the pen, at least
+                :attr:`HitTolerance`.
+
+        Returns:
+            int: Index of the point of the polyline nearest to the position, among
+            the points of the nearest drawn segment, or `None` if the position does
+            not hit the polyline.
+        """
+        if self._zoomScale is None or len(self._x) == 0:
+            return None
+        if tolerance is None:
+            tolerance = max(self.pen().widthF() / 2.0, self.HitTolerance)
+        px = pos.x()
+        py = pos.y()
+        grid = self._hitGrid()
+        if self._indices is None:
+            return grid.nearestVertex(px, py, tolerance)
+
+        # Look for the nearest point among the points simplified by the segment
+        nearest = grid.nearestSegment(px, py, tolerance)
+        if nearest is None:
+            return None
+        indices = self._indices
+        first = int(indices[nearest[0]])
+        last = int(indices[min(nearest[0] + 1, len(indices) - 1)])
+        zn = self._zoomScale
+        mx, my = self._mercator
+        dist = np.hypot(mx[first:last + 1] * zn - px, my[first:last + 1] * zn - py)
+        return first + int(np.argmin(dist))
+
+    def contains(self, pos):
+        return self.vertexAt(pos) is not None
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(self.pen())
+        for polygon in self._polygons:
+            painter.drawPolyline(polygon)
+
     def setLonLat(self, longitudes, latitudes):
         assert len(longitudes) == len(latitudes)
 
-        self._longitudes = np.array(longitudes, dtype=np.float64)
-        self._latitudes = np.array(latitudes, dtype=np.float64)
-        scene = self.scene()
-        if scene is not None:
-            self.updatePosition(scene)
+        self._setCoordinates(longitudes, latitudes)
+        self._coordinatesChanged()
 
 
 class MapGraphicsPixmapItem(QGraphicsPixmapItem, MapItem):
@@ -274,24 +679,29 @@ class MapGraphicsPixmapItem(QGraphicsPixmapItem, MapItem):
             scene(MapGraphicsScene): Scene the item belongs to.
             parent(QGraphicsItem): Parent item.
         """
+        self._initItem(pixmap, parent)
+        self.setLonLat(longitude, latitude)
+
+    def _initItem(self, pixmap, parent=None):
         QGraphicsPixmapItem.__init__(self, parent=parent)
         MapItem.__init__(self)
 
-        self._lon = longitude
-        self._lat = latitude
         self.setPixmap(pixmap)
 
-    def updatePosition(self, scene):
+    def _mercatorAnchors(self):
+        return self._storedAnchors()
+
+    def _placeAnchors(self, xs, ys, index):
         """Update the origin position of the item.
 
         Origin coordinates are unchanged.
 
         Args:
-            scene(MapGraphicsScene): Scene the item belongs to.
+            xs (list[float]): X positions of the anchors.
+            ys (list[float]): Y positions of the anchors.
+            index (int): Position of the origin of the item in ``xs`` and ``ys``.
         """
-        pos = scene.posFromLonLat(self._lon, self._lat)
-        self.prepareGeometryChange()
-        self.setPos(pos[0], pos[1])
+        self.setPos(xs[index], ys[index])
 
     def setLonLat(self, longitude, latitude):
         """Update the origin coordinates of the item.
@@ -302,108 +712,1571 @@ class MapGraphicsPixmapItem(QGraphicsPixmapItem, MapItem):
             longitude(float): Longitude of the origin of the pixmap.
             latitude(float): Latitude of the center of the pixmap.
         """
-        self._lon = longitude
-        self._lat = latitude
-        scene = self.scene()
-        if scene is not None:
-            self.updatePosition(scene)
+        mx, my = mercatorFromLonLat(longitude, latitude)
+        self._setMercatorAnchors((mx,), (my,))
 
 
 class MapGraphicsTextItem(QGraphicsSimpleTextItem, MapItem):
     """Text item for the MapGraphicsScene
+
+    When the collisions of the labels are enabled in the scene (see
+    :meth:`~pytilemap.MapGraphicsScene.setLabelCollisions`), the text can be moved
+    around its origin or hidden for avoiding the overlap with other texts. The
+    texts with higher priority are placed first.
     """
 
     QtParentClass = QGraphicsSimpleTextItem
 
     def __init__(self, longitude, latitude, text, parent=None, min_zoom_visibility=None):
+        self._initItem(text, parent)
+        self.setZoomRange(min_zoom_visibility)
+        self.setLonLat(longitude, latitude)
+
+    def _initItem(self, text, parent=None):
         QGraphicsSimpleTextItem.__init__(self, text, parent=parent)
         MapItem.__init__(self)
-        self._min_zoom = min_zoom_visibility
-        self._lon, self._lat = longitude, latitude
+        self._priority = 0
+        self._labelOffset = (0.0, 0.0)
+        self._labelHidden = False
+
+    def setLonLat(self, longitude, latitude):
+        """Update the origin coordinates of the text.
+
+        Args:
+            longitude(float): Longitude of the origin of the text.
+            latitude(float): Latitude of the origin of the text.
+        """
+        mx, my = mercatorFromLonLat(longitude, latitude)
+        self._setMercatorAnchors((mx,), (my,))
+        self._labelChanged()
 
     def resetMinZoomVisibility(self):
         """Delete level of zoom under which the text disappears. """
-        self._min_zoom = None
+        self.setZoomRange(None, self._maxZoom)
 
     def setMinZoomVisibility(self, zoom_level):
         """Update level of zoom under which the text disappears. """
-        self._min_zoom = zoom_level
+        self.setZoomRange(zoom_level, self._maxZoom)
 
-    def updatePosition(self, scene):
+    def setZoomRange(self, minZoom=None, maxZoom=None):
+        MapItem.setZoomRange(self, minZoom, maxZoom)
+        self._labelChanged()
+
+    def setText(self, text):
+        QGraphicsSimpleTextItem.setText(self, text)
+        self._labelChanged()
+
+    def setFont(self, font):
+        QGraphicsSimpleTextItem.setFont(self, font)
+        self._labelChanged()
+
+    def priority(self):
+        return self._priority
+
+    def setPriority(self, priority):
+        """Set the priority of the text in the placement of the labels.
+
+        Args:
+            priority(float): The priority, texts with higher priority are placed first.
+                Default 0.
+        """
+        self._priority = priority
+        self._labelChanged()
+
+    def _labelChanged(self):
+        scene = self.scene()
+        if scene is not None:
+            scene._labelChanged(self)
+
+    def _labelRect(self):
+        # Size of the text in pixels
+        rect = QGraphicsSimpleTextItem.boundingRect(self)
+        return rect.width(), rect.height()
+
+    def _setLabelPlacement(self, offset):
+        """Move the text from its origin, or hide it.
+
+        Args:
+            offset(tuple): (dx, dy) offset of the text from its origin in pixels, or
+                `None` for hiding the text.
+        """
+        hidden = offset is None
+        if hidden != self._labelHidden:
+            self.prepareGeometryChange()
+            self._labelHidden = hidden
+        if not hidden and offset != self._labelOffset:
+            pos = self.pos()
+            dx, dy = self._labelOffset
+            self._labelOffset = offset
+            self.setPos(pos.x() - dx + offset[0], pos.y() - dy + offset[1])
+
+    def boundingRect(self):
+        if self._labelHidden:
+            return QRectF()
+        return QGraphicsSimpleTextItem.boundingRect(self)
+
+    def shape(self):
+        if self._labelHidden:
+            return QPainterPath()
+        return QGraphicsSimpleTextItem.shape(self)
+
+    def paint(self, painter, option, widget=None):
+        if not self._labelHidden:
+            QGraphicsSimpleTextItem.paint(self, painter, option, widget)
+
+    def _sceneChanged(self, oldScene, newScene):
+        if oldScene is not None:
+            oldScene._labelRemoved(self)
+        if newScene is not None:
+            newScene._labelChanged(self)
+
+    def _mercatorAnchors(self):
+        return self._storedAnchors()
+
+    def _placeAnchors(self, xs, ys, index):
         """Update the origin position of the item."""
 
-        pos = scene.posFromLonLat(self._lon, self._lat)
-        self.setPos(pos)
-        if self._min_zoom is not None:
-            self.setVisible(scene._zoom >= self._min_zoom)
+        dx, dy = self._labelOffset
+        self.setPos(xs[index] + dx, ys[index] + dy)
+
+
+class MapGraphicsItemGroup(QGraphicsItem):
+    """Group of map items added at once to the MapGraphicsScene.
+
+    The items are children of the group, which has no contents and stays at the
+    origin of the scene, so the positions of the items in the scene do not
+    change. Showing, hiding or changing the opacity of the group applies to all
+    its items with a single call, and the style of the items can be changed in
+    bulk.
+    """
+
+    def __init__(self, parent=None):
+        QGraphicsItem.__init__(self, parent=parent)
+        self.setFlag(QGraphicsItem.ItemHasNoContents, True)
+        self._items = list()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def items(self):
+        """Items of the group.
+
+        Returns:
+            list[MapItem]: The items, in order of insertion.
+        """
+        return list(self._items)
+
+    def _addItem(self, item):
+        if item.parentItem() is not self:
+            item.setParentItem(self)
+        self._items.append(item)
+
+    def boundingRect(self):
+        return QRectF()
+
+    def paint(self, painter, option, widget=None):
+        pass
+
+    def setPen(self, *args, **kwargs):
+        """Set the pen of the items.
+
+        The arguments are the same of the :func:`makePen` function. With a list of
+        colors, each item gets the pen of its own color.
+        """
+        self._setEach('setPen', makePen(*args, **kwargs))
+
+    def setBrush(self, *args, **kwargs):
+        """Set the brush of the items.
+
+        The arguments are the same of the :func:`makeBrush` function. With a list of
+        colors, each item gets the brush of its own color.
+        """
+        self._setEach('setBrush', makeBrush(*args, **kwargs))
+
+    def setFont(self, font):
+        """Set the font of the text items.
+
+        Args:
+            font(QFont): The font.
+        """
+        self._setEach('setFont', font)
+
+    def setZoomRange(self, minZoom=None, maxZoom=None):
+        """Set the range of zoom levels where the items are shown.
+
+        Args:
+            minZoom(int): Minimum zoom level, default `None` for no limit.
+            maxZoom(int): Maximum zoom level, default `None` for no limit.
+        """
+        for item in self._items:
+            item.setZoomRange(minZoom, maxZoom)
+
+    def _setEach(self, method, values):
+        if isinstance(values, list):
+            if len(values) != len(self._items):
+                raise ValueError('The number of values must be equal to the number of items')
+            for item, value in izip(self._items, values):
+                getattr(item, method)(value)
+        else:
+            for item in self._items:
+                getattr(item, method)(values)
 
 
 class MapGraphicsLinesGroupItem(QGraphicsItem, MapItem):
+    """Item drawing the segments of a polyline, each one with its own color and width.
+
+    All the segments are drawn by a single item. The coordinates of the segments,
+    their colors and their widths are stored in arrays, and the segments with the
+    same pen are drawn together with a single call of `QPainter.drawLines()`.
+
+    The points can be split in several polylines, so that a single item can draw
+    a whole layer of lines.
+
+    The segments are not child items: indexing the item returns the `QLineF` of a
+    segment, where older versions returned a child `QGraphicsLineItem`. The pens
+    of the segments are changed with :meth:`setLineStyle`.
+    """
 
     QtParentClass = QGraphicsItem
 
-    def __init__(self, longitudes, latitudes, parent=None):
+    def __init__(self, longitudes, latitudes, parent=None, parts=None):
+        """Constructor.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            parent(QGraphicsItem): Parent item, default None.
+            parts(iterable): Index of the first point of each polyline, default `None`
+                for a single polyline. There is no line between the last point of a
+                polyline and the first point of the next one.
+        """
         QGraphicsItem.__init__(self, parent=parent)
         MapItem.__init__(self)
 
         assert len(longitudes) == len(latitudes)
         assert len(longitudes) >= 2
 
-        self._longitudes = np.array(longitudes, dtype=np.float64)
-        self._latitudes = np.array(latitudes, dtype=np.float64)
+        self._colors = None
+        self._widths = 1.0
+        self._style = SolidLine
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        self._polygons = list()
+        self._boundingRect = QRectF()
+        self._setCoordinates(longitudes, latitudes, parts)
+        self._setPens(self._colors, self._widths, self._style)
+
+    def _setCoordinates(self, longitudes, latitudes, parts):
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        self._mercator = mercatorFromLonLat(longitudes, latitudes)
+
+        # First point of each line
+        lineStarts = np.arange(len(longitudes) - 1)
+        if parts is not None:
+            # Offsets past the last point are parts without points
+            parts = np.asarray(parts, dtype=np.intp)
+            breaks = np.zeros(len(longitudes), dtype=bool)
+            breaks[parts[parts < len(longitudes)]] = True
+            lineStarts = lineStarts[~breaks[1:]]
+        self._lineStarts = lineStarts
+
+    def _setPens(self, colors, width, style):
+        count = len(self._lineStarts)
+        widths = np.array(width, dtype=np.float64)
+        if widths.ndim == 0:
+            widths = np.full(count, widths, dtype=np.float64)
+        elif len(widths) != count:
+            raise ValueError('The number of widths must be equal to the number of lines')
+
+        if colors is None:
+            rgba = np.full(count, QPen().color().rgba(), dtype=np.uint32)
+        else:
+            try:
+                rgba = makeRgbaArray(colors, count)
+            except ValueError:
+                raise ValueError('The number of colors must be equal to the number of lines')
+        order, groupBounds, styles = _styleGroups(widths, rgba)
+        pens = [QPen(QBrush(color), w, style) for w, color in styles]
 
-        # Setup internal lines
-        linesGroup = QGraphicsItemGroup(parent=self)
-        self._linesGroup = linesGroup
-        self._lines = [QGraphicsLineItem(parent=linesGroup) for i in iterRange(len(longitudes)-1)]
+        self._colors = colors
+        self._widths = width
+        self._style = style
+        self._maxWidth = float(widths.max()) if count > 0 else 0.0
+        self._order = order
+        self._groupBounds = groupBounds
+        self._pens = pens
+
+    def _mercatorBounds(self):
+        return _arrayBounds(*self._mercator)
 
     def paint(self, painter, option, widget=None):
-        pass
+        for pen, polygon in izip(self._pens, self._polygons):
+            painter.setPen(pen)
+            painter.drawLines(polygon)
 
     def boundingRect(self):
-        return self._linesGroup.boundingRect()
+        return self._boundingRect
 
     def setLineStyle(self, colors, width=1., style=SolidLine):
-        pen = makePen(colors, width=width, style=style)
+        """Set the style of the lines.
 
-        if isinstance(pen, list):
-            if len(pen) != len(self._lines):
-                raise ValueError('The number of colors must be equal to the number of lines')
-            for line, p in izip(self._lines, pen):
-                line.setPen(p)
+        Args:
+            colors: Color of the lines, for all the lines or for each line, with any
+                argument accepted by :func:`~pytilemap.functions.makeRgbaArray`, or
+                `None` for the default color of `QPen`.
+            width(float or iterable): Width of the lines, for all the lines or for each
+                line. Default 1.
+            style(Qt.PenStyle): Style of the lines. Default Qt.SolidLine.
+
+        Raises:
+            ValueError: If the number of colors or widths is not equal to the number
+                of lines.
+        """
+        self._setPens(colors, width, style)
+        scene = self.scene()
+        if scene is not None:
+            self.updatePosition(scene)
         else:
-            for line in self._lines:
-                line.setPen(pen)
+            self.update()
 
     def updatePosition(self, scene):
+        x, y = scene.posFromMercator(*self._mercator)
+
+        # End points of the segments, sorted by pen and interleaved
+        order = self._lineStarts[self._order]
+        lineX = np.empty(2 * len(order), dtype=np.float64)
+        lineY = np.empty(2 * len(order), dtype=np.float64)
+        lineX[0::2] = x[order]
+        lineX[1::2] = x[order + 1]
+        lineY[0::2] = y[order]
+        lineY[1::2] = y[order + 1]
+        bounds = (2 * self._groupBounds).tolist()
+        polygons = [makePolygonF(lineX[s:e], lineY[s:e]) for s, e in izip(bounds[:-1], bounds[1:])]
+
+        margin = self._maxWidth / 2.0 + 1.0
+        boundingRect = QRectF(QPointF(x.min(), y.min()), QPointF(x.max(), y.max()))
+        boundingRect.adjust(-margin, -margin, margin, margin)
+
         self.prepareGeometryChange()
+        self._x = x
+        self._y = y
+        self._polygons = polygons
+        self._boundingRect = boundingRect
+
+    def setLonLat(self, longitudes, latitudes, parts=None):
+        assert len(longitudes) == len(latitudes)
+        assert len(longitudes) >= 2
 
-        x, y = scene.posFromLonLat(self._longitudes, self._latitudes)
-        lines = self._lines
-        for i in iterRange(0, len(lines)-1):
-            lines[i].setLine(x[i], y[i], x[i+1], y[i+1])
+        self._setCoordinates(longitudes, latitudes, parts)
+        try:
+            self._setPens(self._colors, self._widths, self._style)
+        except ValueError:
+            # The colors or the widths of each line can not be used for a different
+            # number of lines
+            self._setPens(None, 1.0, self._style)
+        self._coordinatesChanged()
+
+    def __len__(self):
+        return len(self._lineStarts)
+
+    def __getitem__(self, index):
+        """Line of a segment in scene coordinates.
+
+        The line is a copy: changing it does not move the segment. Older versions
+        returned the child `QGraphicsLineItem` drawing the segment.
+
+        Args:
+            index(int): Index of the segment.
+
+        Returns:
+            QLineF: The segment, a null line if the item is not in a scene.
+
+        Raises:
+            IndexError: If the index is out of range.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Line index out of range')
+        if len(self._x) == 0:
+            return QLineF()
+        point = self._lineStarts[index]
+        return QLineF(self._x[point], self._y[point], self._x[point + 1], self._y[point + 1])
+
+
+class MapGraphicsTrackItem(QGraphicsItem, MapItem):
+    """Polyline item growing with new points, for live tracks.
+
+    The normalized Mercator coordinates of the points are stored in arrays with
+    spare capacity, so that appending a point costs amortized O(1). The track is
+    drawn as a sequence of polygons of at most :attr:`ChunkSize` points: a new
+    point is appended to the last polygon and only the area of the new segment
+    is repainted.
+
+    If a maximum length is set, the oldest points are dropped when new points are
+    appended. The polygons of the dropped points are released and the first one
+    is trimmed before the next painting.
+
+    The bounds of the points are grown with the new points, and evaluated again
+    only when a dropped point was on them. In the scene, the track refreshes only
+    its own bounds in the spatial index (see :meth:`MapItemRegistry.updateBounds`).
+    """
+
+    QtParentClass = QGraphicsItem
+
+    ChunkSize = 256
+    """int: Maximum number of points of each polygon."""
+
+    def __init__(self, longitudes=(), latitudes=(), maxLength=None, parent=None):
+        """Constructor.
+
+        Args:
+            longitudes(iterable): Longitudes of the initial points, default empty.
+            latitudes(iterable): Latitudes of the initial points, default empty.
+            maxLength(int): Maximum number of points of the track, default `None`
+                for keeping all the points.
+            parent(QGraphicsItem): Parent item, default None.
+        """
+        QGraphicsItem.__init__(self, parent=parent)
+        MapItem.__init__(self)
+
+        assert len(longitudes) == len(latitudes)
+
+        self._pen = QPen()
+        self._maxLength = maxLength
+        self._x = np.empty(64, dtype=np.float64)
+        self._y = np.empty(64, dtype=np.float64)
+        self._start = 0  # First row of the points in the arrays
+        self._end = 0  # Last row of the points in the arrays, excluded
+        self._zoomScale = None
+        self._chunks = list()  # [first row, polygon] of each polygon
+        self._trimmed = True  # False if the first polygon contains dropped points
+        self._bounds = None  # Normalized Mercator bounds of the points, None if empty
+        self._boundingRect = QRectF()
+        if len(longitudes) > 0:
+            self.extend(longitudes, latitudes)
+
+    def __len__(self):
+        return self._end - self._start
+
+    def pen(self):
+        return QPen(self._pen)
+
+    def setPen(self, pen):
+        self.prepareGeometryChange()
+        self._pen = QPen(pen)
+        self._updateBoundingRect()
+
+    def maxLength(self):
+        """Maximum number of points of the track.
+
+        Returns:
+            int: The maximum number of points, or `None` if all the points are kept.
+        """
+        return self._maxLength
+
+    def setMaxLength(self, maxLength):
+        """Set the maximum number of points of the track.
+
+        Args:
+            maxLength(int): Maximum number of points, `None` for keeping all the points.
+        """
+        self._maxLength = maxLength
+        self._dropPoints()
+
+    def mercator(self):
+        """Normalized Mercator coordinates of the points of the track.
+
+        Returns:
+            tuple: (x, y) arrays with the coordinates, from the oldest point.
+        """
+        return self._x[self._start:self._end].copy(), self._y[self._start:self._end].copy()
+
+    def append(self, longitude, latitude):
+        """Append a point to the track.
+
+        Args:
+            longitude(float): Longitude of the point.
+            latitude(float): Latitude of the point.
+        """
+        mx, my = mercatorFromLonLat(longitude, latitude)
+        row = self._allocate(1)
+        self._x[row] = mx
+        self._y[row] = my
+        self._extendBounds(row)
+
+        zn = self._zoomScale
+        if zn is not None:
+            chunks = self._chunks
+            if chunks and chunks[-1][1].count() < self.ChunkSize:
+                chunks[-1][1].append(QPointF(mx * zn, my * zn))
+            else:
+                self._buildChunks(max(row - 1, self._start))
+            self._pointsAdded(max(row - 1, self._start))
+
+        self._dropPoints()
+        self._registryChanged()
+
+    def extend(self, longitudes, latitudes):
+        """Append a sequence of points to the track.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+        """
+        assert len(longitudes) == len(latitudes)
+
+        count = len(longitudes)
+        if count == 0:
+            return
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        row = self._allocate(count)
+        mercatorFromLonLat(longitudes, latitudes, out=(self._x[row:row + count], self._y[row:row + count]))
+        self._extendBounds(row)
+
+        if self._zoomScale is not None:
+            # Fill the last polygon again, together with the new points
+            first = self._chunks.pop()[0] if self._chunks else self._start
+            if not self._chunks:
+                self._trimmed = True
+            self._buildChunks(max(first, self._start))
+            self._pointsAdded(max(row - 1, self._start))
+
+        self._dropPoints()
+        self._registryChanged()
+
+    def clear(self):
+        """Remove all the points of the track."""
+        self.prepareGeometryChange()
+        self._start = self._end = 0
+        self._chunks = list()
+        self._trimmed = True
+        self._bounds = None
+        self._boundingRect = QRectF()
+        self._registryChanged()
+
+    def _allocate(self, count):
+        # Make room for count points at the end of the arrays, returns the first row
+        start = self._start
+        end = self._end
+        capacity = len(self._x)
+        if end + count > capacity:
+            size = end - start
+            if size + count > capacity // 2:
+                capacity = max(2 * capacity, 2 * (size + count))
+            x = np.empty(capacity, dtype=np.float64)
+            y = np.empty(capacity, dtype=np.float64)
+            x[:size] = self._x[start:end]
+            y[:size] = self._y[start:end]
+            self._trimHead()
+            self._x = x
+            self._y = y
+            for chunk in self._chunks:
+                chunk[0] -= start
+            self._start = 0
+            self._end = size
+        row = self._end
+        self._end += count
+        return row
+
+    def _dropPoints(self):
+        maxLength = self._maxLength
+        if maxLength is None or self._end - self._start <= maxLength:
+            return
+
+        # The bounds shrink only if a dropped point was on them
+        start = self._end - maxLength
+        minX, minY, maxX, maxY = self._bounds
+        x = self._x[self._start:start]
+        y = self._y[self._start:start]
+        self._start = start
+        if x.min() <= minX or y.min() <= minY or x.max() >= maxX or y.max() >= maxY:
+            self._bounds = _arrayBounds(self._x[start:self._end], self._y[start:self._end])
+
+        chunks = self._chunks
+        if not chunks:
+            return
+
+        # Repaint the area of the dropped points
+        dropped = 0
+        while dropped < len(chunks) - 1 and chunks[dropped + 1][0] <= start:
+            dropped += 1
+        for first, polygon in chunks[:dropped + 1]:
+            self.update(self._adjusted(polygon.boundingRect()))
+        del chunks[:dropped]
+        self._trimmed = chunks[0][0] == start
+        self._updateBoundingRect()
+
+    def _buildChunks(self, first):
+        # Polygons of the points from the row first, consecutive polygons share a point
+        zn = self._zoomScale
+        x = self._x[first:self._end] * zn
+        y = self._y[first:self._end] * zn
+        size = self.ChunkSize
+        for s in range(0, max(len(x) - 1, 1), size - 1):
+            self._chunks.append([first + s, makePolygonF(x[s:s + size], y[s:s + size])])
+
+    def _trimHead(self):
+        # Remove the dropped points from the first polygon
+        if self._trimmed:
+            return
+        first, polygon = self._chunks[0]
+        zn = self._zoomScale
+        start = self._start
+        last = first + polygon.count()
+        self._chunks[0] = [start, makePolygonF(self._x[start:last] * zn, self._y[start:last] * zn)]
+        self._trimmed = True
+
+    def _pointsAdded(self, first):
+        # Repaint the area of the new segments, from the row first
+        zn = self._zoomScale
+        x = self._x[first:self._end]
+        y = self._y[first:self._end]
+        rect = self._adjusted(QRectF(QPointF(x.min() * zn, y.min() * zn), QPointF(x.max() * zn, y.max() * zn)))
+        self._updateBoundingRect()
+        self.update(rect)
+
+    def _adjusted(self, rect):
+        margin = self._pen.widthF() / 2.0 + 1.0
+        return rect.adjusted(-margin, -margin, margin, margin)
+
+    def _extendBounds(self, first):
+        # Grow the bounds with the points from the row first
+        bounds = _arrayBounds(self._x[first:self._end], self._y[first:self._end])
+        if self._bounds is not None:
+            minX, minY, maxX, maxY = self._bounds
+            bounds = (min(minX, bounds[0]), min(minY, bounds[1]), max(maxX, bounds[2]), max(maxY, bounds[3]))
+        self._bounds = bounds
+
+    def _updateBoundingRect(self):
+        rect = QRectF()
+        if self._zoomScale is not None and self._bounds is not None:
+            zn = self._zoomScale
+            minX, minY, maxX, maxY = self._bounds
+            rect = self._adjusted(QRectF(QPointF(minX * zn, minY * zn), QPointF(maxX * zn, maxY * zn)))
+        if rect != self._boundingRect:
+            self.prepareGeometryChange()
+            self._boundingRect = rect
+
+    def _registryChanged(self):
+        scene = self.scene()
+        if scene is not None:
+            scene._mapItems.updateBounds(self)
+
+    def _mercatorBounds(self):
+        return self._bounds
+
+    def updatePosition(self, scene):
+        self._zoomScale = (1 << scene.zoom()) * float(scene.tileSize())
+        self.prepareGeometryChange()
+        self._chunks = list()
+        self._trimmed = True
+        if self._end > self._start:
+            self._buildChunks(self._start)
+        self._updateBoundingRect()
+
+    def boundingRect(self):
+        return self._boundingRect
+
+    def paint(self, painter, option, widget=None):
+        self._trimHead()
+        painter.setPen(self._pen)
+        for _, polygon in self._chunks:
+            painter.drawPolyline(polygon)
+
+
+class MapGraphicsPlaybackItem(QGraphicsItem, MapItem):
+    """Item replaying a recorded track, with timestamps, in a time window.
+
+    The coordinates and the sorted timestamps of the points are given once. When
+    the time window changes, the points inside it are found with a binary search
+    on the timestamps and only those points are projected and drawn, decimated to
+    the resolution of the zoom level (see
+    :func:`~pytilemap.lineutils.decimatePolyline`). The track is drawn between the
+    positions interpolated at the start and at the end of the window, and the
+    position at the end of the window, the *head*, is drawn as a circle.
+    """
+
+    QtParentClass = QGraphicsItem
+
+    DecimationTolerance = 0.5
+    """float: Size in pixels of the cells used for decimating the drawn points."""
+
+    def __init__(self, longitudes, latitudes, times, parent=None):
+        """Constructor.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            times(iterable): Timestamps of the points, in increasing order.
+            parent(QGraphicsItem): Parent item, default None.
+        """
+        QGraphicsItem.__init__(self, parent=parent)
+        MapItem.__init__(self)
+
+        self._pen = QPen()
+        self._brush = QBrush(QColor('red'))
+        self._headRadius = 4.0
+        self._zoomScale = None
+        self._polygon = QPolygonF()
+        self._head = None  # Position of the head in the scene, if visible
+        self._boundingRect = QRectF()
+        self._setData(longitudes, latitudes, times)
+
+    def _setData(self, longitudes, latitudes, times):
+        assert len(longitudes) == len(latitudes)
+
+        times = np.asarray(times, dtype=np.float64)
+        if len(times) != len(longitudes):
+            raise ValueError('The number of times must be equal to the number of points')
+        if np.any(times[1:] < times[:-1]):
+            raise ValueError('The times must be in increasing order')
+
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        self._mercator = mercatorFromLonLat(longitudes, latitudes)
+        self._times = times
+        if len(times) > 0:
+            self._timeWindow = (times[0], times[-1])
+        else:
+            self._timeWindow = (None, None)
+
+    def __len__(self):
+        return len(self._times)
+
+    def pen(self):
+        return QPen(self._pen)
+
+    def setPen(self, pen):
+        self.prepareGeometryChange()
+        self._pen = QPen(pen)
+        self._updateBoundingRect()
+
+    def brush(self):
+        return QBrush(self._brush)
+
+    def setBrush(self, brush):
+        """Set the brush of the head.
+
+        Args:
+            brush(QBrush): The brush.
+        """
+        self._brush = QBrush(brush)
+        self.update()
+
+    def headRadius(self):
+        return self._headRadius
+
+    def setHeadRadius(self, radius):
+        """Set the radius of the head.
+
+        Args:
+            radius(float): Radius in pixels, 0 for hiding the head.
+        """
+        self.prepareGeometryChange()
+        self._headRadius = radius
+        self._updateBoundingRect()
+
+    def times(self):
+        return self._times
+
+    def timeWindow(self):
+        """Time window of the drawn part of the track.
+
+        Returns:
+            tuple: (start, end) times of the window.
+        """
+        return self._timeWindow
+
+    def setTimeWindow(self, start, end):
+        """Set the time window of the drawn part of the track.
+
+        Only the points inside the window are processed, so moving a short window
+        along a long track is cheap.
+
+        Args:
+            start(float): Start time of the window, `None` for the first timestamp.
+            end(float): End time of the window, where the head is drawn.
+        """
+        if start is None and len(self._times) > 0:
+            start = self._times[0]
+        self._timeWindow = (start, end)
+        if self._zoomScale is not None:
+            self._updateWindow()
+
+    def headPosition(self):
+        """Position of the head, interpolated at the end of the time window.
+
+        Returns:
+            tuple: (longitude, latitude) of the head, or `None` if the window does
+            not overlap the timestamps and nothing is drawn.
+        """
+        if not self._windowShown():
+            return None
+        mx, my = interpolatePolyline(self._times, self._mercator[0], self._mercator[1], self._timeWindow[1])
+        return lonLatFromPos(mx, my, 0, 1)
+
+    def _windowShown(self):
+        # True if the time window overlaps the timestamps
+        start, end = self._timeWindow
+        times = self._times
+        return len(times) > 0 and end >= times[0] and start <= end and start <= times[-1]
+
+    def setLonLat(self, longitudes, latitudes, times):
+        """Set the points of the track.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            times(iterable): Timestamps of the points, in increasing order.
+        """
+        self._setData(longitudes, latitudes, times)
+        self._coordinatesChanged()
+
+    def _mercatorBounds(self):
+        return _arrayBounds(*self._mercator)
+
+    def _updateWindow(self):
+        # Project and decimate the points of the time window
+        self.prepareGeometryChange()
+        start, end = self._timeWindow
+        times = self._times
+        polygon = QPolygonF()
+        head = None
+        if self._windowShown():
+            mx, my = self._mercator
+            first = int(np.searchsorted(times, start, side='right'))
+            last = int(np.searchsorted(times, end, side='left'))
+            x0, y0 = interpolatePolyline(times, mx, my, start)
+            x1, y1 = interpolatePolyline(times, mx, my, end)
+
+            zn = self._zoomScale
+            x = np.empty(last - first + 2, dtype=np.float64)
+            y = np.empty(last - first + 2, dtype=np.float64)
+            x[0] = x0
+            y[0] = y0
+            x[1:-1] = mx[first:last]
+            y[1:-1] = my[first:last]
+            x[-1] = x1
+            y[-1] = y1
+            x *= zn
+            y *= zn
+            kept = decimatePolyline(x, y, self.DecimationTolerance)
+            polygon = makePolygonF(x[kept], y[kept])
+            head = QPointF(x1 * zn, y1 * zn)
+
+        self._polygon = polygon
+        self._head = head
+        self._updateBoundingRect()
+
+    def _updateBoundingRect(self):
+        rect = QRectF()
+        margin = self._pen.widthF() / 2.0 + 1.0
+        if self._polygon.count() > 0:
+            rect = self._polygon.boundingRect().adjusted(-margin, -margin, margin, margin)
+        if self._head is not None:
+            r = self._headRadius + margin
+            rect = rect.united(QRectF(self._head.x() - r, self._head.y() - r, 2 * r, 2 * r))
+        self._boundingRect = rect
+
+    def updatePosition(self, scene):
+        self._zoomScale = (1 << scene.zoom()) * float(scene.tileSize())
+        self._updateWindow()
+
+    def boundingRect(self):
+        return self._boundingRect
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(self._pen)
+        painter.drawPolyline(self._polygon)
+        if self._head is not None and self._headRadius > 0:
+            painter.setBrush(self._brush)
+            painter.drawEllipse(self._head, self._headRadius, self._headRadius)
+
+
+class MapGraphicsScatterItem(QGraphicsItem, MapItem):
+    """Item for showing a large number of points in a MapGraphicsScene.
+
+    All the points are drawn by a single item. Each point can have its own size
+    and color: the points with the same size and color are drawn together with a
+    single call of `QPainter.drawPoints()`.
+    """
+
+    QtParentClass = QGraphicsItem
+
+    def __init__(self, longitudes, latitudes, sizes=5.0, colors='black', parent=None):
+        """Constructor.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            sizes(float or iterable): Diameter of the points in pixels, for all the
+                points or for each point. Default 5.0.
+            colors: Color of the points, with any argument accepted by
+                :func:`~pytilemap.functions.makeRgbaArray`. Default 'black'.
+            parent(QGraphicsItem): Parent item, default None.
+        """
+        QGraphicsItem.__init__(self, parent=parent)
+        MapItem.__init__(self)
+
+        self._pens = list()
+        self._polygons = list()
+        self._boundingRect = QRectF()
+        self._setData(longitudes, latitudes, sizes, colors)
+
+    def _setData(self, longitudes, latitudes, sizes, colors):
+        assert len(longitudes) == len(latitudes)
+
+        longitudes = np.array(longitudes, dtype=np.float64)
+        latitudes = np.array(latitudes, dtype=np.float64)
+        count = len(longitudes)
+
+        sizeValues = np.array(sizes, dtype=np.float64)
+        if sizeValues.ndim == 0:
+            sizeValues = np.full(count, sizeValues, dtype=np.float64)
+        elif len(sizeValues) != count:
+            raise ValueError('The number of sizes must be equal to the number of points')
+        colorValues = makeRgbaArray(colors, count)
+
+        # Group the points with the same size and color
+        order, groupBounds, styles = _styleGroups(sizeValues, colorValues)
+        pens = [QPen(QBrush(color), size, SolidLine, Qt.RoundCap) for size, color in styles]
+
+        self._sizes = sizes
+        self._colors = colors
+        self._maxSize = float(sizeValues.max()) if count > 0 else 0.0
+        self._mercator = mercatorFromLonLat(longitudes[order], latitudes[order])
+        self._order = order
+        self._groupBounds = groupBounds
+        self._pens = pens
+
+    def __len__(self):
+        return len(self._mercator[0])
+
+    def updateData(self, longitudes, latitudes, sizes=None, colors=None):
+        """Replace all the points.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            sizes(float or iterable): Diameter of the points in pixels, default
+                `None` for keeping the current sizes.
+            colors: Color of the points, default `None` for keeping the current colors.
+        """
+        if sizes is None:
+            sizes = self._sizes
+        if colors is None:
+            colors = self._colors
+        self._setData(longitudes, latitudes, sizes, colors)
+        self._coordinatesChanged()
+
+    def _mercatorBounds(self):
+        return _arrayBounds(*self._mercator)
+
+    def updatePosition(self, scene):
+        x, y = scene.posFromMercator(*self._mercator)
+        bounds = self._groupBounds.tolist()
+        polygons = [makePolygonF(x[s:e], y[s:e]) for s, e in izip(bounds[:-1], bounds[1:])]
+
+        boundingRect = QRectF()
+        if len(x) > 0:
+            margin = self._maxSize / 2.0 + 1.0
+            boundingRect = QRectF(QPointF(x.min(), y.min()), QPointF(x.max(), y.max()))
+            boundingRect.adjust(-margin, -margin, margin, margin)
+
+        self.prepareGeometryChange()
+        self._polygons = polygons
+        self._boundingRect = boundingRect
+
+    def boundingRect(self):
+        return self._boundingRect
+
+    def paint(self, painter, option, widget=None):
+        for pen, polygon in izip(self._pens, self._polygons):
+            painter.setPen(pen)
+            painter.drawPoints(polygon)
+
+
+class MapGraphicsClusterItem(QGraphicsItem, MapItem):
+    """Item showing a large number of points grouped in clusters.
+
+    The points are clustered once on a hierarchical grid (see
+    :class:`~pytilemap.clusterutils.PointClusters`). At each zoom level only the
+    clusters in the visible area of the scene, enlarged by a margin, are drawn as
+    circles with the number of their points.
+    """
+
+    QtParentClass = QGraphicsItem
+
+    ClipMargin = 0.5
+    """float: Margin around the visible area, relative to its largest side."""
+
+    def __init__(self, longitudes, latitudes, radius=12.0, color='orange', textColor='black',
+                 cellBits=2, maxZoom=18, parent=None):
+        """Constructor.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            radius(float): Radius in pixels of the clusters with a single point. The
+                radius of the other clusters grows with the logarithm of their size.
+            color: Color of the clusters, default 'orange'.
+            textColor: Color of the number of points, default 'black'.
+            cellBits(int): Each side of a tile is divided in ``2 ** cellBits`` cells.
+            maxZoom(int): Zoom level where the clusters stop being split.
+            parent(QGraphicsItem): Parent item, default None.
+        """
+        QGraphicsItem.__init__(self, parent=parent)
+        MapItem.__init__(self)
+
+        assert len(longitudes) == len(latitudes)
+
+        self._radius = float(radius)
+        self._brush = QBrush(makeColor(color))
+        self._textPen = makePen(textColor)
+        self._cellBits = cellBits
+        self._clusterMaxZoom = maxZoom
+        self._zoom = None
+        self._zoomScale = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._circles = list()
+        self._clipRect = QRectF()
+        self._boundingRect = QRectF()
+        self._setCoordinates(longitudes, latitudes)
+
+    def _setCoordinates(self, longitudes, latitudes):
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        self._mercator = mercatorFromLonLat(longitudes, latitudes)
+        self._clusters = PointClusters(*self._mercator, maxZoom=self._clusterMaxZoom, cellBits=self._cellBits)
+
+    def __len__(self):
+        return len(self._mercator[0])
 
     def setLonLat(self, longitudes, latitudes):
         assert len(longitudes) == len(latitudes)
-        assert len(longitudes) >= 2
 
-        self._longitudes = np.array(longitudes, dtype=np.float64)
-        self._latitudes = np.array(latitudes, dtype=np.float64)
+        self._setCoordinates(longitudes, latitudes)
+        self._coordinatesChanged()
+
+    def visibleClusters(self):
+        """Clusters currently drawn by the item.
 
-        old_lines = self._lines
-        for line in old_lines:
-            line.setParentItem(None)
+        Returns:
+            tuple: (ids, counts) arrays with the identifiers of the clusters at the
+            current zoom level and their number of points.
+        """
+        return self._ids, self._counts
+
+    def clusterPoints(self, clusterId):
+        """Points of a cluster of the current zoom level.
+
+        Args:
+            clusterId(int): Identifier of the cluster, see :meth:`visibleClusters`.
 
+        Returns:
+            numpy.ndarray: The indices of the points of the cluster.
+        """
+        return self._clusters.leaves(self._zoom, clusterId)
+
+    def _mercatorBounds(self):
+        return _arrayBounds(*self._mercator)
+
+    def _sceneChanged(self, oldScene, newScene):
+        if oldScene is not None:
+            oldScene.sceneRectChanged.disconnect(self._setSceneRect)
+        if newScene is not None:
+            newScene.sceneRectChanged.connect(self._setSceneRect)
+
+    def _setSceneRect(self, rect):
+        if self._zoom is not None and not self._clipRect.contains(rect):
+            self._updateClusters(rect)
+
+    def _updateClusters(self, rect):
+        margin = max(rect.width(), rect.height()) * self.ClipMargin
+        clipRect = rect.adjusted(-margin, -margin, margin, margin)
+
+        zn = self._zoomScale
+        mercatorRect = (clipRect.left() / zn, clipRect.top() / zn, clipRect.right() / zn, clipRect.bottom() / zn)
+        ids, x, y, counts = self._clusters.clusters(self._zoom, mercatorRect)
+        x *= zn
+        y *= zn
+        radii = self._radius * (1.0 + np.log10(counts))
+
+        circles = [QRectF(cx - r, cy - r, 2.0 * r, 2.0 * r)
+                   for cx, cy, r in izip(x.tolist(), y.tolist(), radii.tolist())]
+        boundingRect = QRectF()
+        if len(ids) > 0:
+            r = float(radii.max()) + 1.0
+            boundingRect = QRectF(QPointF(x.min() - r, y.min() - r), QPointF(x.max() + r, y.max() + r))
+
+        self.prepareGeometryChange()
+        self._ids = ids
+        self._counts = counts
+        self._circles = circles
+        self._clipRect = clipRect
+        self._boundingRect = boundingRect
+
+    def updatePosition(self, scene):
+        self._zoom = scene.zoom()
+        self._zoomScale = (1 << self._zoom) * float(scene.tileSize())
+        self._updateClusters(scene.sceneRect())
+
+    def boundingRect(self):
+        return self._boundingRect
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self._brush)
+        for rect in self._circles:
+            painter.drawEllipse(rect)
+
+        painter.setPen(self._textPen)
+        for rect, count in izip(self._circles, self._counts.tolist()):
+            if count > 1:
+                painter.drawText(rect, Qt.AlignCenter, str(count))
+
+
+class MapGraphicsHeatmapItem(QGraphicsItem, MapItem):
+    """Item showing the density of a large number of points as a heatmap.
+
+    The density is evaluated by map tiles, only for the tiles exposed when the
+    item is painted (see :class:`~pytilemap.heatmaputils.PointDensity`). The
+    images of the tiles are cached by ``(zoom, x, y)``, so that panning only
+    evaluates the new tiles.
+
+    The painted tiles are limited to the area of the paint device, since the
+    exposed area is the whole item when the scene is rendered outside of a view.
+    At most :attr:`MaxNewTiles` tiles are evaluated in each painting, from the
+    center of the painted area: the item is updated again for the other tiles.
+    The scale of the colormap is evaluated when the zoom level changes, outside of
+    the painting.
+    """
+
+    QtParentClass = QGraphicsItem
+
+    DefaultColors = [(0, 0, 255, 0), (0, 255, 255, 128), (0, 255, 0, 176), (255, 255, 0, 216), (255, 0, 0, 255)]
+    """list: RGBA colors of the default colormap, from the lowest to the highest density."""
+
+    CacheSize = 256
+    """int: Maximum number of cached images of the tiles, unless more tiles are painted."""
+
+    MaxNewTiles = 32
+    """int: Maximum number of tiles evaluated in each painting."""
+
+    def __init__(self, longitudes, latitudes, weights=None, radius=15, colors=None, maxValue=None, parent=None):
+        """Constructor.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            weights(iterable): Weight of each point, default 1 for each point.
+            radius(int): Radius in pixels of the area of influence of a point. Default 15.
+            colors(numpy.ndarray): (Nx4) RGBA colors of the colormap, from the lowest
+                to the highest density, default :attr:`DefaultColors`.
+            maxValue(float): Density shown with the last color of the colormap, default
+                `None` for an estimate of the maximum density of each zoom level.
+            parent(QGraphicsItem): Parent item, default None.
+        """
+        QGraphicsItem.__init__(self, parent=parent)
+        MapItem.__init__(self)
+
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+
+        self._radius = int(radius)
+        self._kernel = gaussianKernel(self._radius)
+        self._lut = colormapLut(self.DefaultColors if colors is None else colors)
+        self._maxValue = maxValue
+        self._zoom = None
+        self._tileSize = None
+        self._scaleValue = None  # Density shown with the last color at the zoom level
+        self._tiles = OrderedDict()
+        self._boundingRect = QRectF()
+        self._setData(longitudes, latitudes, weights)
+
+    def _setData(self, longitudes, latitudes, weights):
+        assert len(longitudes) == len(latitudes)
+
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        self._mercator = mercatorFromLonLat(longitudes, latitudes)
+        self._density = PointDensity(self._mercator[0], self._mercator[1], weights)
+        self._tiles.clear()
+
+    def __len__(self):
+        return len(self._mercator[0])
+
+    def setData(self, longitudes, latitudes, weights=None):
+        """Replace all the points.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            weights(iterable): Weight of each point, default 1 for each point.
+        """
+        self._setData(longitudes, latitudes, weights)
+        self._coordinatesChanged()
+
+    def setRadius(self, radius):
+        self._radius = int(radius)
+        self._kernel = gaussianKernel(self._radius)
+        self._tiles.clear()
+        self._settingsChanged()
+
+    def radius(self):
+        return self._radius
+
+    def setColormap(self, colors):
+        """Set the colors of the colormap.
+
+        Args:
+            colors(numpy.ndarray): (Nx4) RGBA colors, from the lowest to the highest density.
+        """
+        self._lut = colormapLut(colors)
+        self._tiles.clear()
+        self.update()
+
+    def setMaxValue(self, maxValue):
+        self._maxValue = maxValue
+        self._tiles.clear()
+        self._updateScale()
+        self.update()
+
+    def _updateScale(self):
+        # The estimate of the maximum density sorts all the points, it is evaluated
+        # once for each zoom level and not while painting
+        if self._maxValue is not None or self._zoom is None:
+            self._scaleValue = self._maxValue
+        else:
+            self._scaleValue = self._density.maxDensity(self._zoom, self._tileSize, self._radius)
+
+    def _settingsChanged(self):
         scene = self.scene()
         if scene is not None:
-            for line in old_lines:
-                scene.removeItem(line)
+            self.updatePosition(scene)
+        else:
+            self.update()
+
+    def _mercatorBounds(self):
+        return _arrayBounds(*self._mercator)
+
+    def updatePosition(self, scene):
+        self._zoom = scene.zoom()
+        self._tileSize = scene.tileSize()
+        self._updateScale()
+
+        boundingRect = QRectF()
+        bounds = self._mercatorBounds()
+        if bounds is not None:
+            zn = (1 << self._zoom) * float(self._tileSize)
+            margin = self._radius + 1.0
+            boundingRect = QRectF(QPointF(bounds[0] * zn, bounds[1] * zn), QPointF(bounds[2] * zn, bounds[3] * zn))
+            boundingRect.adjust(-margin, -margin, margin, margin)
+
+        self.prepareGeometryChange()
+        self._boundingRect = boundingRect
+
+    def boundingRect(self):
+        return self._boundingRect
+
+    def _tileImage(self, tx, ty):
+        # Image of a tile, from the cache if available; None for empty tiles
+        key = (self._zoom, tx, ty)
+        tiles = self._tiles
+        if key in tiles:
+            image = tiles.pop(key)
+        else:
+            tileSize = self._tileSize
+            grid = self._density.tile(tx, ty, self._zoom, tileSize, self._kernel)
+            image = None
+            if grid.any():
+                lut = self._lut
+                index = np.clip(grid * ((len(lut) - 1) / self._scaleValue), 0, len(lut) - 1).astype(np.intp)
+                image = makeImage(lut[index])
+        tiles[key] = image
+        return image
+
+    def _evictTiles(self, painted):
+        # Drop the least recently used tiles over the cache size, the painted tiles
+        # are the most recently used and they are never dropped
+        tiles = self._tiles
+        while len(tiles) > self.CacheSize:
+            key = next(iter(tiles))
+            if key in painted:
+                break
+            del tiles[key]
+
+    def _paintedRect(self, painter, option):
+        # Exposed area of the item, limited to the clipping and to the paint device
+        rect = option.exposedRect.intersected(self._boundingRect)
+        if painter.hasClipping():
+            rect = rect.intersected(painter.clipBoundingRect())
+        device = painter.device()
+        if device is not None:
+            inverse, invertible = painter.worldTransform().inverted()
+            if invertible:
+                rect = rect.intersected(inverse.mapRect(QRectF(0.0, 0.0, device.width(), device.height())))
+        return rect
+
+    def paint(self, painter, option, widget=None):
+        if self._zoom is None:
+            return
+
+        tileSize = self._tileSize
+        rect = self._paintedRect(painter, option)
+        if rect.isEmpty():
+            return
+        numTiles = 1 << self._zoom
+        tx0 = max(int(np.floor(rect.left() / tileSize)), 0)
+        ty0 = max(int(np.floor(rect.top() / tileSize)), 0)
+        tx1 = min(int(np.floor(rect.right() / tileSize)), numTiles - 1)
+        ty1 = min(int(np.floor(rect.bottom() / tileSize)), numTiles - 1)
+        if tx1 < tx0 or ty1 < ty0:
+            return
+
+        # Tiles from the center of the painted area
+        tx, ty = np.meshgrid(np.arange(tx0, tx1 + 1), np.arange(ty0, ty1 + 1))
+        tx = tx.ravel()
+        ty = ty.ravel()
+        center = rect.center()
+        order = np.argsort(np.hypot((tx + 0.5) * tileSize - center.x(), (ty + 0.5) * tileSize - center.y()),
+                           kind='mergesort')
+
+        newTiles = 0
+        pending = False
+        painted = set()
+        for tx, ty in izip(tx[order].tolist(), ty[order].tolist()):
+            if (self._zoom, tx, ty) not in self._tiles:
+                if newTiles >= self.MaxNewTiles:
+                    pending = True
+                    continue
+                newTiles += 1
+            painted.add((self._zoom, tx, ty))
+            image = self._tileImage(tx, ty)
+            if image is not None:
+                painter.drawImage(QPointF(tx * tileSize, ty * tileSize), image)
+        self._evictTiles(painted)
+
+        if pending:
+            # Evaluate the other tiles in the next painting
+            self.update(rect)
+
+
+class MapGraphicsMarkerItem(QGraphicsItem, MapItem):
+    """Item drawing many markers with icons, in a single call.
+
+    The distinct icons are packed in a single atlas pixmap (see
+    :func:`~pytilemap.atlasutils.packShelves`) and all the markers are drawn with
+    one call of `QPainter.drawPixmapFragments()`. The position, the icon and the
+    rotation of the markers are stored in arrays: the fragments of the markers are
+    filled with vectorized operations, only for the markers in the exposed area.
+
+    Each icon is drawn centered on the position of its marker.
+    """
+
+    QtParentClass = QGraphicsItem
+
+    def __init__(self, longitudes, latitudes, icons, iconIndices=0, rotations=None, parent=None):
+        """Constructor.
+
+        Args:
+            longitudes(iterable): Longitudes of the markers.
+            latitudes(iterable): Latitudes of the markers.
+            icons(list[QPixmap]): The distinct icons of the markers.
+            iconIndices(int or iterable): Index in ``icons`` of the icon of all the
+                markers, or of each marker. Default 0.
+            rotations(float or iterable): Rotation in degrees, clockwise, of all the
+                markers or of each marker. Default `None` for no rotation.
+            parent(QGraphicsItem): Parent item, default None.
+        """
+        QGraphicsItem.__init__(self, parent=parent)
+        MapItem.__init__(self)
+
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        self._fragments = None
+        self._boundingRect = QRectF()
+        self._setIcons(icons)
+        self._setData(longitudes, latitudes, iconIndices, rotations)
+
+    def _setIcons(self, icons):
+        icons = [QPixmap.fromImage(icon) if not isinstance(icon, QPixmap) else icon for icon in icons]
+        if len(icons) == 0:
+            raise ValueError('At least one icon is required')
+
+        widths = [icon.width() for icon in icons]
+        heights = [icon.height() for icon in icons]
+        x, y, width, height = packShelves(widths, heights)
+        atlas = QPixmap(width, height)
+        atlas.fill(Qt.transparent)
+        painter = QPainter(atlas)
+        for icon, left, top in izip(icons, x.tolist(), y.tolist()):
+            painter.drawPixmap(left, top, icon)
+        painter.end()
+
+        self._atlas = atlas
+        self._iconRects = np.column_stack([x, y, widths, heights]).astype(np.float64)
+        # Largest distance of the corners of the icons from the positions
+        self._iconRadius = float(np.hypot(self._iconRects[:, 2], self._iconRects[:, 3]).max()) / 2.0
+
+    def _setData(self, longitudes, latitudes, iconIndices, rotations):
+        assert len(longitudes) == len(latitudes)
+
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        count = len(longitudes)
+        self._mercator = mercatorFromLonLat(longitudes, latitudes)
+        self._setIconIndices(iconIndices, count)
+        self._setRotations(rotations, count)
+
+    def _setIconIndices(self, iconIndices, count):
+        indices = np.array(iconIndices, dtype=np.intp)
+        if indices.ndim == 0:
+            indices = np.full(count, indices, dtype=np.intp)
+        elif len(indices) != count:
+            raise ValueError('The number of icon indices must be equal to the number of markers')
+        if count > 0 and (indices.min() < 0 or indices.max() >= len(self._iconRects)):
+            raise ValueError('Invalid icon index')
+        self._iconIndices = indices
+        self._iconIndicesArg = iconIndices  # As given, for a new number of markers
+
+    def _setRotations(self, rotations, count):
+        self._rotationsArg = rotations  # As given, for a new number of markers
+        if rotations is not None:
+            rotations = np.array(rotations, dtype=np.float64)
+            if rotations.ndim == 0:
+                rotations = np.full(count, rotations, dtype=np.float64)
+            elif len(rotations) != count:
+                raise ValueError('The number of rotations must be equal to the number of markers')
+        self._rotations = rotations
+
+    def __len__(self):
+        return len(self._mercator[0])
+
+    def setLonLat(self, longitudes, latitudes, iconIndices=None, rotations=None):
+        """Replace all the markers.
+
+        Args:
+            longitudes(iterable): Longitudes of the markers.
+            latitudes(iterable): Latitudes of the markers.
+            iconIndices(int or iterable): Icon of the markers, default `None` for
+                keeping the current icons. The icons of each marker are kept only if
+                the number of markers does not change, otherwise the first icon is used.
+            rotations(float or iterable): Rotation of the markers, default `None` for
+                keeping the current rotations. The rotations of each marker are kept
+                only if the number of markers does not change, otherwise the markers
+                are not rotated.
+        """
+        count = len(longitudes)
+        if iconIndices is None:
+            iconIndices = self._iconIndicesArg
+            if np.ndim(iconIndices) > 0 and len(iconIndices) != count:
+                iconIndices = 0
+        if rotations is None:
+            rotations = self._rotationsArg
+            if np.ndim(rotations) > 0 and len(rotations) != count:
+                rotations = None
+        self._setData(longitudes, latitudes, iconIndices, rotations)
+        self._coordinatesChanged()
+
+    def setIcons(self, icons):
+        """Set the distinct icons of the markers.
 
-        linesGroup = self._linesGroup
-        self._lines = [QGraphicsLineItem(parent=linesGroup) for i in iterRange(len(longitudes)-1)]
+        Args:
+            icons(list[QPixmap]): The icons, including all the icon indices of the markers.
+        """
+        icons = list(icons)
+        if len(self) > 0 and self._iconIndices.max() >= len(icons):
+            raise ValueError('Invalid icon index')
+        self._setIcons(icons)
+        self._settingsChanged()
+
+    def setIconIndices(self, iconIndices):
+        """Set the icon of the markers.
+
+        Args:
+            iconIndices(int or iterable): Index of the icon of all the markers, or of
+                each marker.
+        """
+        self._setIconIndices(iconIndices, len(self))
+        self._fragments = None
+        self.update()
 
+    def setRotations(self, rotations):
+        """Set the rotation of the markers.
+
+        Args:
+            rotations(float or iterable): Rotation in degrees, clockwise, of all the
+                markers or of each marker, `None` for no rotation.
+        """
+        self._setRotations(rotations, len(self))
+        self._fragments = None
+        self.update()
+
+    def _settingsChanged(self):
+        self._fragments = None
+        scene = self.scene()
         if scene is not None:
             self.updatePosition(scene)
+        else:
+            self.update()
 
-    def __getitem__(self, index):
-        return self._lines[index]
+    def _mercatorBounds(self):
+        return _arrayBounds(*self._mercator)
+
+    def updatePosition(self, scene):
+        self._x, self._y = scene.posFromMercator(*self._mercator)
+        self._fragments = None
+
+        boundingRect = QRectF()
+        if len(self._x) > 0:
+            margin = self._iconRadius + 1.0
+            boundingRect = QRectF(QPointF(self._x.min(), self._y.min()), QPointF(self._x.max(), self._y.max()))
+            boundingRect.adjust(-margin, -margin, margin, margin)
+
+        self.prepareGeometryChange()
+        self._boundingRect = boundingRect
+
+    def boundingRect(self):
+        return self._boundingRect
+
+    def _makeFragments(self, index=None):
+        x, y = self._x, self._y
+        iconIndices = self._iconIndices
+        rotations = self._rotations
+        if index is not None:
+            x, y, iconIndices = x[index], y[index], iconIndices[index]
+            if rotations is not None:
+                rotations = rotations[index]
+        return makePixmapFragments(x, y, self._iconRects[iconIndices], rotations)
+
+    def paint(self, painter, option, widget=None):
+        if len(self._x) == 0:
+            return
+
+        rect = option.exposedRect
+        if rect.contains(self._boundingRect):
+            # All the markers are exposed, the fragments are cached until the next change
+            if self._fragments is None:
+                self._fragments = self._makeFragments()
+            fragments = self._fragments
+        else:
+            margin = self._iconRadius
+            x, y = self._x, self._y
+            index = np.flatnonzero((x >= rect.left() - margin) & (x <= rect.right() + margin) &
+                                   (y >= rect.top() - margin) & (y <= rect.bottom() + margin))
+            if len(index) == 0:
+                return
+            fragments = self._makeFragments(index)
+        painter.drawPixmapFragments(fragments, self._atlas)
@@ -1,18 +1,26 @@
 from __future__ import print_function, absolute_import, division
 
+from collections import OrderedDict
+
+import numpy as np
 from numpy import floor
 
-from qtpy.QtCore import Qt, Slot, Signal, QRect, QRectF, QPointF, QSizeF
-from qtpy.QtGui import QPixmap
-from qtpy.QtWidgets import QGraphicsScene
+from qtpy.QtCore import Qt, Slot, Signal, QRect, QRectF, QPointF, QSizeF, QTimer
+from qtpy.QtGui import QPixmap, QPixmapCache
+from qtpy.QtWidgets import QGraphicsScene, QGraphicsItem
 
 from .mapitems import MapGraphicsCircleItem, MapGraphicsLineItem, \
     MapGraphicsPolylineItem, MapGraphicsPixmapItem, MapGraphicsTextItem, \
-    MapGraphicsRectItem, MapGraphicsLinesGroupItem
+    MapGraphicsRectItem, MapGraphicsLinesGroupItem, MapGraphicsScatterItem, MapGraphicsClusterItem, \
+    MapGraphicsTrackItem, MapGraphicsHeatmapItem, MapGraphicsItemGroup, MapGraphicsMarkerItem, \
+    MapGraphicsPlaybackItem
 from .maplegenditem import MapLegendItem
 from .mapescaleitem import MapScaleItem
-from .functions import iterRange
-from .tileutils import posFromLonLat, lonLatFromPos
+from .mapitemregistry import MapItemRegistry
+from .geojsonutils import readGeoJson
+from .labelutils import LabelPlacement
+from .functions import iterRange, izip
+from .tileutils import posFromLonLat, lonLatFromPos, posFromMercator, mercatorFromLonLat
 
 
 class MapGraphicsScene(QGraphicsScene):
@@ -21,6 +29,9 @@ class MapGraphicsScene(QGraphicsScene):
 
     sigZoomChanged = Signal(int)
 
+    DefaultCacheBudget = 32 * 1024 * 1024
+    """int: Default memory budget, in bytes, of the caches of the map items."""
+
     def __init__(self, tileSource, parent=None):
         """Constructor.
 
@@ -45,6 +56,18 @@ class MapGraphicsScene(QGraphicsScene):
 
         self._tileInDownload = list()
 
+        self._mapItems = MapItemRegistry()
+        self._mapItems.reproject(self._zoom, tdim)
+
+        self._labels = LabelPlacement()
+        self._labelCollisions = False
+        self._labelsPending = False
+
+        self._cachedItems = OrderedDict()  # Items with managed cache, with their cost in bytes
+        self._cacheBudget = 0
+        self._cachesPending = False
+        self.setCacheBudget(self.DefaultCacheBudget)
+
         self.setSceneRect(0.0, 0.0, 400, 300)
         self.sceneRectChanged.connect(self.onSceneRectChanged)
 
@@ -77,6 +100,9 @@ class MapGraphicsScene(QGraphicsScene):
         Args:
             rect(QRectF): Current visible area.
         """
+        if self._mapItems.zoom() == self._zoom:
+            self._mapItems.reprojectArea(self._mercatorRect(rect))
+
         tdim = self._tileSource.tileSize()
         center = rect.center()
         ct = self.tileFromPos(center.x(), center.y())
@@ -98,7 +124,7 @@ class MapGraphicsScene(QGraphicsScene):
         ye = (height - yp - 1) / tdim - ys + 1 + ty
 
         # define the rect of visible tiles
-        self._tilesRect = QRect(xs, ys, xe, ye)
+        self._tilesRect = QRect(int(xs), int(ys), int(xe), int(ye))
 
         # Request the loading of new tiles (if needed)
         self.requestTiles()
@@ -166,6 +192,11 @@ class MapGraphicsScene(QGraphicsScene):
         center = self.sceneRect().center()
         self.translate(center.x() - pos_corr.x(), center.y() - pos_corr.y())
 
+        # Update the position of all the map items at once
+        self._mapItems.reproject(zoomlevel, tileSource.tileSize(), self._mercatorRect(self.sceneRect()))
+        self._placeLabels()
+        self._updateItemCaches()
+
         self.sigZoomChanged.emit(zoomlevel)
 
     def zoomIn(self, pos=None):
@@ -193,6 +224,14 @@ class MapGraphicsScene(QGraphicsScene):
     def zoom(self):
         return self._zoom
 
+    def tileSize(self):
+        """Size of the tiles in pixels.
+
+        Returns:
+            int: The size of the tiles of the current tile source.
+        """
+        return self._tileSource.tileSize()
+
     @Slot(int, int, int, QPixmap)
     def setTilePixmap(self, x, y, zoom, pixmap):
         """Set the image of the tile.
@@ -259,6 +298,7 @@ class MapGraphicsScene(QGraphicsScene):
         """
         rect = QRectF(self.sceneRect().topLeft(), QSizeF(width, height))
         self.setSceneRect(rect)
+        self._updateItemCaches()
 
     def setCenter(self, lon, lat):
         """Move the center of the visible area to new coordinates.
@@ -270,8 +310,7 @@ class MapGraphicsScene(QGraphicsScene):
             lat(float): New latitude of the center.
         """
         rect = QRectF(self.sceneRect())
-        pos = self.posFromLonLat(lon, lat)
-        rect.moveCenter(QPointF(pos[0], pos[1]))
+        rect.moveCenter(self.pointFromLonLat(lon, lat))
         self.setSceneRect(rect)
 
     def center(self):
@@ -304,6 +343,233 @@ class MapGraphicsScene(QGraphicsScene):
         """
         return posFromLonLat(lon, lat, self._zoom, self._tileSource.tileSize())
 
+    def posFromMercator(self, x, y):
+        """Position in scene coordinate of the normalized Mercator coordinates.
+
+        Args:
+            x(float or numpy.ndarray): Normalized X value or values.
+            y(float or numpy.ndarray): Normalized Y value or values.
+
+        Returns:
+            tuple: (x, y) with the positions of the input coordinates.
+
+        See:
+            :func:`~pytilemap.tileutils.mercatorFromLonLat`
+        """
+        return posFromMercator(x, y, self._zoom, self._tileSource.tileSize())
+
+    def pointFromLonLat(self, lon, lat):
+        """Position in scene coordinate of a WGS84 coordinate, as a point.
+
+        Same as :meth:`posFromLonLat` for a single coordinate.
+
+        Args:
+            lon(float): Longitude value.
+            lat(float): Latitude value.
+
+        Returns:
+            QPointF: The position of the input coordinate.
+        """
+        x, y = posFromLonLat(lon, lat, self._zoom, self._tileSource.tileSize())
+        return QPointF(x, y)
+
+    def lazyReprojection(self):
+        return self._mapItems.isLazy()
+
+    def setLazyReprojection(self, lazy):
+        """Enable or disable the lazy reprojection of the map items.
+
+        With lazy reprojection, a change of the zoom level updates only the map
+        items near the visible area, and the other items are updated when the
+        visible area reaches them. The time of a change of the zoom level then
+        depends on the visible items, and not on all the items of the scene.
+
+        Note:
+            Items not updated keep the position of their last zoom level, so
+            ``items()`` queries of the scene far from the visible area can return
+            outdated results.
+
+        Args:
+            lazy(bool): `True` for enabling the lazy reprojection.
+        """
+        if lazy == self._mapItems.isLazy():
+            return
+        self._mapItems.setLazy(lazy)
+        if not lazy:
+            # Update the items left behind
+            self._mapItems.reproject(self._zoom, self._tileSource.tileSize())
+
+    def labelCollisions(self):
+        return self._labelCollisions
+
+    def setLabelCollisions(self, enabled):
+        """Enable or disable the collisions of the text items.
+
+        With collisions enabled, the text items are placed by decreasing priority
+        (see :meth:`MapGraphicsTextItem.setPriority`) in screen space: each text is
+        moved to a corner of its origin where it does not overlap the texts
+        already placed, or it is hidden. The placement is evaluated once for each
+        zoom level and it is updated incrementally when texts are added or removed.
+
+        Args:
+            enabled(bool): `True` for enabling the collisions of the texts.
+        """
+        if enabled == self._labelCollisions:
+            return
+        self._labelCollisions = enabled
+        if enabled:
+            self._placeLabels()
+        else:
+            for item in self._labels.placement(self._zoom, self._tileSource.tileSize()):
+                item._setLabelPlacement((0.0, 0.0))
+
+    def _labelChanged(self, item):
+        # Add or update a text item in the placement of the labels
+        xs, ys = item._mercatorAnchors()
+        x, y = xs[0], ys[0]
+        width, height = item._labelRect()
+        minZoom, maxZoom = item.zoomRange()
+        self._labels.add(item, x, y, width, height, item.priority(), minZoom, maxZoom)
+        self._schedulePlaceLabels()
+
+    def _labelRemoved(self, item):
+        self._labels.remove(item)
+        self._schedulePlaceLabels()
+
+    def _schedulePlaceLabels(self):
+        # Place the labels once after a sequence of changes
+        if self._labelCollisions and not self._labelsPending:
+            self._labelsPending = True
+            QTimer.singleShot(0, self._placeLabels)
+
+    def _placeLabels(self):
+        self._labelsPending = False
+        if not self._labelCollisions:
+            return
+        placement = self._labels.placement(self._zoom, self._tileSource.tileSize())
+        for item, offset in placement.items():
+            item._setLabelPlacement(offset)
+
+    def cacheBudget(self):
+        """Memory budget of the caches of the map items.
+
+        Returns:
+            int: The budget in bytes, :attr:`DefaultCacheBudget` by default.
+        """
+        return self._cacheBudget
+
+    def setCacheBudget(self, budget):
+        """Set the memory budget of the caches of the map items.
+
+        The map items with managed cache (see :meth:`MapItem.setCacheManaged`) are
+        cached in order of insertion, as long as the estimate of the memory of their
+        caches fits in the budget. The memory of the cache of an item is estimated
+        from its size, limited to the size of the visible area, at the current zoom
+        level.
+
+        The caches are stored in `QPixmapCache`, whose limit is raised to the budget
+        if it is lower.
+
+        Args:
+            budget(int): The budget in bytes.
+        """
+        self._cacheBudget = budget
+        limit = (budget + 1023) // 1024
+        if QPixmapCache.cacheLimit() < limit:
+            QPixmapCache.setCacheLimit(limit)
+        self._updateItemCaches()
+
+    def cacheUsage(self):
+        """Estimate of the memory of the caches of the map items.
+
+        Returns:
+            int: The memory in bytes.
+        """
+        return sum(cost for cost in self._cachedItems.values() if cost is not None)
+
+    def _cacheItemAdded(self, item):
+        self._cachedItems[item] = None
+        self._scheduleUpdateItemCaches()
+
+    def _cacheItemRemoved(self, item):
+        if self._cachedItems.pop(item, None) is not None:
+            item.setCacheMode(QGraphicsItem.NoCache)
+        self._scheduleUpdateItemCaches()
+
+    def _scheduleUpdateItemCaches(self):
+        # Update the caches once after a sequence of changes
+        if not self._cachesPending:
+            self._cachesPending = True
+            QTimer.singleShot(0, self._updateItemCaches)
+
+    def _updateItemCaches(self):
+        # Enable the cache of the managed items fitting in the budget; the cost of
+        # the items not cached is None
+        self._cachesPending = False
+        view = self.sceneRect()
+        used = 0
+        for item in self._cachedItems:
+            rect = item.sceneBoundingRect()
+            width = min(rect.width(), view.width()) + 2.0
+            height = min(rect.height(), view.height()) + 2.0
+            cost = int(width * height) * 4
+            if used + cost <= self._cacheBudget:
+                used += cost
+                mode = QGraphicsItem.DeviceCoordinateCache
+            else:
+                cost = None
+                mode = QGraphicsItem.NoCache
+            self._cachedItems[item] = cost
+            if item.cacheMode() != mode:
+                item.setCacheMode(mode)
+
+    def _mercatorRect(self, rect):
+        zn = (1 << self._zoom) * float(self._tileSource.tileSize())
+        return rect.left() / zn, rect.top() / zn, rect.right() / zn, rect.bottom() / zn
+
+    def itemsInLonLatBox(self, lon0, lat0, lon1, lat1):
+        """Map items intersecting a box in WGS84 coordinates.
+
+        The query uses a spatial index of the items that does not depend on the
+        zoom level. Items are represented by the bounds of their coordinates, the
+        extent in pixels of their drawing is not considered.
+
+        Args:
+            lon0(float): Longitude of a corner of the box.
+            lat0(float): Latitude of a corner of the box.
+            lon1(float): Longitude of the opposite corner of the box.
+            lat1(float): Latitude of the opposite corner of the box.
+
+        Returns:
+            list[MapItem]: The items intersecting the box.
+        """
+        x0, y0 = mercatorFromLonLat(lon0, lat0)
+        x1, y1 = mercatorFromLonLat(lon1, lat1)
+        return self._mapItems.itemsInBox(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+    def nearestItems(self, lon, lat, k=1, maxDistance=None):
+        """Map items nearest to a WGS84 coordinate.
+
+        Useful for hover, tooltips and selection. The distances are measured on
+        the map, so the result does not depend on the zoom level.
+
+        Args:
+            lon(float): Longitude of the point.
+            lat(float): Latitude of the point.
+            k(int): Maximum number of items. Default 1.
+            maxDistance(float): Maximum distance in pixels at the current zoom level,
+                default `None` for no limit.
+
+        Returns:
+            list[MapItem]: The items, sorted by distance from the point.
+        """
+        x, y = mercatorFromLonLat(lon, lat)
+        if maxDistance is None:
+            maxDistance = float('inf')
+        else:
+            maxDistance = maxDistance / ((1 << self._zoom) * float(self.tileSize()))
+        return self._mapItems.nearestItems(x, y, k, maxDistance)
+
     def lonLatFromPos(self, x, y):
         """Position in WGS84 coordinate of the scene coordinates.
 
@@ -425,6 +691,106 @@ class MapGraphicsScene(QGraphicsScene):
         self.addItem(item)
         return item
 
+    def addCircles(self, longitudes, latitudes, radii=5.0):
+        """Add many circles to the graphics scene at once.
+
+        The circles are registered and placed together, so adding many circles is
+        much faster than calling :meth:`addCircle` for each one.
+
+        Args:
+            longitudes(iterable): Longitudes of the centers of the circles.
+            latitudes(iterable): Latitudes of the centers of the circles.
+            radii(float or iterable): Radius in pixels of all the circles, or of each
+                circle. Default 5.0.
+
+        Returns:
+            MapGraphicsItemGroup: The group of the MapGraphicsCircleItem added to the scene.
+        """
+        x, y = self._bulkMercator(longitudes, latitudes)
+        radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), x.shape)
+        group = MapGraphicsItemGroup()
+        for mx, my, radius in izip(x.tolist(), y.tolist(), radii.tolist()):
+            group._addItem(MapGraphicsCircleItem._fromMercatorAnchors((mx,), (my,), radius, group))
+        self._addAnchoredGroup(group, x, y)
+        return group
+
+    def addTexts(self, longitudes, latitudes, texts):
+        """Add many texts to the graphics scene at once.
+
+        Args:
+            longitudes(iterable): Longitudes of the origins of the texts.
+            latitudes(iterable): Latitudes of the origins of the texts.
+            texts(iterable): The texts.
+
+        Returns:
+            MapGraphicsItemGroup: The group of the MapGraphicsTextItem added to the scene.
+        """
+        x, y = self._bulkMercator(longitudes, latitudes)
+        texts = list(texts)
+        if len(texts) != len(x):
+            raise ValueError('The number of texts must be equal to the number of coordinates')
+        group = MapGraphicsItemGroup()
+        for mx, my, text in izip(x.tolist(), y.tolist(), texts):
+            group._addItem(MapGraphicsTextItem._fromMercatorAnchors((mx,), (my,), text, group))
+        self._addAnchoredGroup(group, x, y)
+        return group
+
+    def addPixmaps(self, longitudes, latitudes, pixmaps):
+        """Add many pixmaps to the graphics scene at once.
+
+        Args:
+            longitudes(iterable): Longitudes of the origins of the pixmaps.
+            latitudes(iterable): Latitudes of the origins of the pixmaps.
+            pixmaps(QPixmap or iterable): The pixmap of all the items, or of each item.
+
+        Returns:
+            MapGraphicsItemGroup: The group of the MapGraphicsPixmapItem added to the scene.
+        """
+        x, y = self._bulkMercator(longitudes, latitudes)
+        if isinstance(pixmaps, QPixmap):
+            pixmaps = [pixmaps] * len(x)
+        else:
+            pixmaps = list(pixmaps)
+            if len(pixmaps) != len(x):
+                raise ValueError('The number of pixmaps must be equal to the number of coordinates')
+        group = MapGraphicsItemGroup()
+        for mx, my, pixmap in izip(x.tolist(), y.tolist(), pixmaps):
+            group._addItem(MapGraphicsPixmapItem._fromMercatorAnchors((mx,), (my,), pixmap, group))
+        self._addAnchoredGroup(group, x, y)
+        return group
+
+    def addItemGroup(self, group):
+        """Add a group of map items to the graphics scene.
+
+        The items are registered and projected at once, and the index of the scene
+        is built once after the insertion of all the items.
+
+        Args:
+            group(MapGraphicsItemGroup): The group of items.
+        """
+        self._addAnchoredGroup(group)
+
+    def _addAnchoredGroup(self, group, x=None, y=None):
+        # Add a group whose items have the normalized Mercator anchors (x, y), if given
+        indexMethod = self.itemIndexMethod()
+        self.setItemIndexMethod(QGraphicsScene.NoIndex)
+        self._mapItems.beginInsert()
+        try:
+            if x is not None:
+                self._mapItems.setInsertedAnchors(group.items(), x, y)
+            self.addItem(group)
+        finally:
+            self._mapItems.endInsert()
+            self.setItemIndexMethod(indexMethod)
+
+    def _bulkMercator(self, longitudes, latitudes):
+        # Normalized Mercator coordinates of the items added in bulk
+        longitudes = np.asarray(longitudes, dtype=np.float64).ravel()
+        latitudes = np.asarray(latitudes, dtype=np.float64).ravel()
+        if longitudes.shape != latitudes.shape:
+            raise ValueError('The number of longitudes must be equal to the number of latitudes')
+        return mercatorFromLonLat(longitudes, latitudes)
+
     def addLegend(self, pos=QPointF(10.0, 10.0)):
         legend = MapLegendItem(pos=pos)
         self.addItem(legend)
@@ -450,7 +816,151 @@ class MapGraphicsScene(QGraphicsScene):
         self.addItem(scaleItem)
         return scaleItem
 
-    def addLinesGroup(self, longitudes, latitudes):
-        item = MapGraphicsLinesGroupItem(longitudes, latitudes)
+    def addLinesGroup(self, longitudes, latitudes, parts=None):
+        item = MapGraphicsLinesGroupItem(longitudes, latitudes, parts=parts)
+        self.addItem(item)
+        return item
+
+    def addGeoJson(self, source, pointSize=5.0, pointColor='black', lineColor='black',
+                   polygonColor='black', chunkSize=1 << 20):
+        """Add the geometries of a GeoJSON document to the graphics scene.
+
+        The document is read incrementally (see
+        :func:`~pytilemap.geojsonutils.readGeoJson`) and each kind of geometry is
+        added as a single item: the points as a MapGraphicsScatterItem, the lines
+        and the outlines of the polygons as MapGraphicsLinesGroupItem.
+
+        Args:
+            source(str or file): Path of the document, or file object.
+            pointSize(float): Diameter of the points in pixels. Default 5.0.
+            pointColor: Color of the points. Default 'black'.
+            lineColor: Color of the lines. Default 'black'.
+            polygonColor: Color of the outlines of the polygons. Default 'black'.
+            chunkSize(int): Number of characters or bytes read at once. Default 1 MiB.
+
+        Returns:
+            tuple: (points, lines, polygons) items added to the scene, `None` for
+            the kinds of geometry not found in the document.
+        """
+        layers = readGeoJson(source, chunkSize=chunkSize)
+
+        pointsItem = None
+        lons, lats = layers.points
+        if len(lons) > 0:
+            pointsItem = self.addScatter(lons, lats, sizes=pointSize, colors=pointColor)
+
+        groups = list()
+        for (lons, lats, parts), color in [(layers.lines, lineColor), (layers.polygons, polygonColor)]:
+            item = None
+            if len(lons) >= 2:
+                item = self.addLinesGroup(lons, lats, parts=parts)
+                item.setLineStyle(color)
+            groups.append(item)
+
+        return pointsItem, groups[0], groups[1]
+
+    def addTrack(self, longitudes=(), latitudes=(), maxLength=None):
+        """Add a track growing with new points to the graphics scene.
+
+        Args:
+            longitudes(iterable): Longitudes of the initial points, default empty.
+            latitudes(iterable): Latitudes of the initial points, default empty.
+            maxLength(int): Maximum number of points of the track, default `None`
+                for keeping all the points.
+
+        Returns:
+            MapGraphicsTrackItem added to the scene.
+        """
+        item = MapGraphicsTrackItem(longitudes, latitudes, maxLength=maxLength)
+        self.addItem(item)
+        return item
+
+    def addPlayback(self, longitudes, latitudes, times):
+        """Add a recorded track, replayed in a time window, to the graphics scene.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            times(iterable): Timestamps of the points, in increasing order.
+
+        Returns:
+            MapGraphicsPlaybackItem added to the scene.
+        """
+        item = MapGraphicsPlaybackItem(longitudes, latitudes, times)
+        self.addItem(item)
+        return item
+
+    def addHeatmap(self, longitudes, latitudes, weights=None, radius=15, colors=None, maxValue=None):
+        """Add the heatmap of the density of a set of points to the graphics scene.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            weights(iterable): Weight of each point, default 1 for each point.
+            radius(int): Radius in pixels of the area of influence of a point. Default 15.
+            colors(numpy.ndarray): (Nx4) RGBA colors of the colormap, default `None`
+                for the default colormap.
+            maxValue(float): Density shown with the last color of the colormap, default
+                `None` for an estimate of the maximum density of each zoom level.
+
+        Returns:
+            MapGraphicsHeatmapItem added to the scene.
+        """
+        item = MapGraphicsHeatmapItem(longitudes, latitudes, weights=weights, radius=radius,
+                                      colors=colors, maxValue=maxValue)
+        self.addItem(item)
+        return item
+
+    def addMarkers(self, longitudes, latitudes, icons, iconIndices=0, rotations=None):
+        """Add a layer of markers with icons, drawn by a single item, to the graphics scene.
+
+        Args:
+            longitudes(iterable): Longitudes of the markers.
+            latitudes(iterable): Latitudes of the markers.
+            icons(list[QPixmap]): The distinct icons of the markers.
+            iconIndices(int or iterable): Index in ``icons`` of the icon of all the
+                markers, or of each marker. Default 0.
+            rotations(float or iterable): Rotation in degrees, clockwise, of all the
+                markers or of each marker. Default `None` for no rotation.
+
+        Returns:
+            MapGraphicsMarkerItem added to the scene.
+        """
+        item = MapGraphicsMarkerItem(longitudes, latitudes, icons, iconIndices=iconIndices, rotations=rotations)
+        self.addItem(item)
+        return item
+
+    def addScatter(self, longitudes, latitudes, sizes=5.0, colors='black'):
+        """Add a set of points drawn by a single item to the graphics scene.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            sizes(float or iterable): Diameter of the points in pixels, for all the
+                points or for each point. Default 5.0.
+            colors: Color of the points, for all the points or for each point.
+                Default 'black'.
+
+        Returns:
+            MapGraphicsScatterItem added to the scene.
+        """
+        item = MapGraphicsScatterItem(longitudes, latitudes, sizes=sizes, colors=colors)
+        self.addItem(item)
+        return item
+
+    def addClusters(self, longitudes, latitudes, radius=12.0, color='orange', textColor='black'):
+        """Add a set of points grouped in clusters to the graphics scene.
+
+        Args:
+            longitudes(iterable): Longitudes of the points.
+            latitudes(iterable): Latitudes of the points.
+            radius(float): Radius in pixels of the clusters with a single point.
+            color: Color of the clusters, default 'orange'.
+            textColor: Color of the number of points, default 'black'.
+
+        Returns:
+            MapGraphicsClusterItem added to the scene.
+        """
+        item = MapGraphicsClusterItem(longitudes, latitudes, radius=radius, color=color, textColor=textColor)
         self.addItem(item)
         return item
@@ -0,0 +1,141 @@
+from __future__ import division
+
+import heapq
+
+import numpy as np
+
+from .tileutils import mortonCode
+
+
+class PackedRTree(object):
+    """Static R-tree of boxes in normalized Mercator space.
+
+    The boxes are sorted by the Morton code of their centers and packed in nodes
+    of ``nodeSize`` boxes. Each level of the tree stores the bounds of its nodes in
+    contiguous arrays and it is built from the previous one with a single
+    vectorized reduction, so the whole tree is built in O(n log n).
+
+    The tree can not be modified: it must be built again when the boxes change.
+    """
+
+    def __init__(self, minX, minY, maxX, maxY, nodeSize=16):
+        """Constructor.
+
+        Args:
+            minX(numpy.ndarray): Left side of the boxes.
+            minY(numpy.ndarray): Top side of the boxes.
+            maxX(numpy.ndarray): Right side of the boxes.
+            maxY(numpy.ndarray): Bottom side of the boxes.
+            nodeSize(int): Maximum number of children of each node. Default 16.
+        """
+        minX = np.asarray(minX, dtype=np.float64)
+        minY = np.asarray(minY, dtype=np.float64)
+        maxX = np.asarray(maxX, dtype=np.float64)
+        maxY = np.asarray(maxY, dtype=np.float64)
+        assert len(minX) == len(minY) == len(maxX) == len(maxY)
+
+        self._nodeSize = nodeSize
+        self._levels = list()
+
+        last = (1 << 16) - 1
+        cx = np.clip(np.floor((minX + maxX) * (last / 2.0)), 0, last).astype(np.int64)
+        cy = np.clip(np.floor((minY + maxY) * (last / 2.0)), 0, last).astype(np.int64)
+        order = np.argsort(mortonCode(cx, cy), kind='mergesort')
+        self._order = order
+        if len(order) == 0:
+            return
+
+        level = (minX[order], minY[order], maxX[order], maxY[order])
+        self._levels.append(level)
+        while len(level[0]) > 1:
+            level = self._parentLevel(level)
+            self._levels.append(level)
+
+    def _parentLevel(self, level):
+        # Bounds of the nodes grouping nodeSize boxes of the level
+        nodeSize = self._nodeSize
+        pad = -len(level[0]) % nodeSize
+        minX, minY, maxX, maxY = level
+        parent = list()
+        for values, fill, reduce in ((minX, np.inf, np.min), (minY, np.inf, np.min),
+                                     (maxX, -np.inf, np.max), (maxY, -np.inf, np.max)):
+            values = np.concatenate([values, np.full(pad, fill)])
+            parent.append(reduce(values.reshape(-1, nodeSize), axis=1))
+        return tuple(parent)
+
+    def __len__(self):
+        return len(self._order)
+
+    def search(self, minX, minY, maxX, maxY):
+        """Boxes intersecting a rectangle.
+
+        Args:
+            minX(float): Left side of the rectangle.
+            minY(float): Top side of the rectangle.
+            maxX(float): Right side of the rectangle.
+            maxY(float): Bottom side of the rectangle.
+
+        Returns:
+            numpy.ndarray: The indices of the boxes intersecting the rectangle.
+        """
+        if len(self._levels) == 0:
+            return np.empty(0, dtype=np.intp)
+
+        nodeSize = self._nodeSize
+        children = np.arange(nodeSize)
+        nodes = np.zeros(1, dtype=np.intp)
+        for depth in range(len(self._levels) - 1, -1, -1):
+            x0, y0, x1, y1 = self._levels[depth]
+            nodes = nodes[(x0[nodes] <= maxX) & (x1[nodes] >= minX) &
+                          (y0[nodes] <= maxY) & (y1[nodes] >= minY)]
+            if depth > 0:
+                nodes = (nodes[:, np.newaxis] * nodeSize + children).ravel()
+                nodes = nodes[nodes < len(self._levels[depth - 1][0])]
+
+        return self._order[nodes]
+
+    def nearest(self, x, y, k=1, maxDistance=np.inf):
+        """Boxes nearest to a point.
+
+        The tree is visited in order of distance from the point, so only the nodes
+        near the point are evaluated.
+
+        Args:
+            x(float): X coordinate of the point.
+            y(float): Y coordinate of the point.
+            k(int): Maximum number of boxes. Default 1.
+            maxDistance(float): Maximum distance of the boxes from the point.
+
+        Returns:
+            tuple: (indices, distances) arrays with the indices of the boxes and their
+            distances from the point, sorted by distance. The distance is 0 for boxes
+            containing the point.
+        """
+        indices = list()
+        distances = list()
+        if len(self._levels) == 0 or k <= 0:
+            return np.array(indices, dtype=np.intp), np.array(distances)
+
+        nodeSize = self._nodeSize
+        queue = list()
+        self._pushNodes(queue, x, y, maxDistance, len(self._levels) - 1, 0, 1)
+        while queue and len(indices) < k:
+            distance, depth, node = heapq.heappop(queue)
+            if depth == 0:
+                indices.append(self._order[node])
+                distances.append(distance)
+            else:
+                first = node * nodeSize
+                self._pushNodes(queue, x, y, maxDistance, depth - 1, first, first + nodeSize)
+
+        return np.array(indices, dtype=np.intp), np.array(distances)
+
+    def _pushNodes(self, queue, x, y, maxDistance, depth, first, last):
+        # Push in the queue the nodes of a level near enough to the point
+        x0, y0, x1, y1 = self._levels[depth]
+        last = min(last, len(x0))
+        dx = np.maximum(np.maximum(x0[first:last] - x, x - x1[first:last]), 0.0)
+        dy = np.maximum(np.maximum(y0[first:last] - y, y - y1[first:last]), 0.0)
+        for node, distance in enumerate(np.hypot(dx, dy).tolist(), first):
+            if distance <= maxDistance:
+                heapq.heappush(queue, (distance, depth, node))
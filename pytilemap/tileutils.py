@@ -1,47 +1,85 @@
 from __future__ import division
 
+import math
+import multiprocessing
+
 import numpy as np
 from numpy import log, tan, cos, arctan, exp
 from numpy import pi as PI
 
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # Python 2 without the futures backport
+    ThreadPoolExecutor = None
+
 
 Deg2Rad = PI / 180.0
 PI2 = PI * 2.0
 
+_INF = float('inf')
+_NAN = float('nan')
+_EXP_MAX = math.log(np.finfo(np.float64).max)
 
-def posFromLonLat(lon, lat, zoom, tileSize):
-    """Position in scene coordinate of the WGS84 coordinates.
+CHUNK_SIZE = 1 << 16
+"""int: Default number of points processed at once by the chunked projections."""
+
+
+def _outputArrays(a, b, out):
+    # Arrays for the results of the array implementations
+    if out is not None:
+        return out
+    shape = np.broadcast(a, b).shape
+    dtype = np.result_type(a, b, np.float32)
+    return np.empty(shape, dtype=dtype), np.empty(shape, dtype=dtype)
 
-    Convert from WGS84 reference system to scene reference system.
+
+def mercatorFromLonLat(lon, lat, out=None):
+    """Normalized Mercator coordinates of the WGS84 coordinates.
+
+    The normalized coordinates are in the range [0, 1] and do not depend on the
+    zoom level: the position in scene coordinates is obtained by multiplying them
+    by ``(1 << zoom) * tileSize`` (see :func:`posFromMercator`).
 
     Args:
         lon(float or numpy.ndarray): Longitude value or values.
         lat(float or numpy.ndarray): Latitude value or values.
-        zoom(int): The zoom level.
-        tileSize(int): The size of the tile.
+        out(tuple): Optional (x, y) arrays where the results are stored, they can
+            be the input arrays. Used only for numpy.ndarray inputs.
 
     Returns:
-        tuple: (x, y) with the positions of the input coordinates.
+        tuple: (x, y) with the normalized coordinates of the input coordinates.
     """
     if isinstance(lat, np.ndarray):
-        return _posFromLonLatArray(lon, lat, zoom, tileSize)
+        return _mercatorFromLonLatArray(lon, lat, out)
+    return _mercatorFromLonLatScalar(lon, lat)
 
-    tx = lon + 180.0
+
+def _mercatorFromLonLatScalar(lon, lat):
+    # Implementation of mercatorFromLonLat() function for scalars, based on the
+    # math module: it avoids the overhead of the numpy ufuncs and returns floats.
+    tx = float(lon) + 180.0
     tx /= 360.0
-    ty = (1.0 - log(tan(lat * Deg2Rad) + 1.0 / cos(lat * Deg2Rad)) / PI) / 2.0
-    zn = (1 << zoom) * float(tileSize)
-    tx *= zn
-    ty *= zn
+    rad = float(lat) * Deg2Rad
+    ty = math.tan(rad) + 1.0 / math.cos(rad)
+    # Same results of numpy.log() outside of the domain of math.log()
+    if ty > 0.0:
+        ty = math.log(ty)
+    else:
+        ty = -_INF if ty == 0.0 else _NAN
+    ty = (1.0 - ty / PI) / 2.0
     return tx, ty
 
 
-def _posFromLonLatArray(lon, lat, zoom, tileSize):
-    # Optimized implementation of posFromLonLat() function for numpy arrays
-    tx = lon + 180.0
-    tx /= 360.0
+def _mercatorFromLonLatArray(lon, lat, out=None):
+    # Optimized implementation of mercatorFromLonLat() function for numpy arrays.
+    # The X output is used as temporary buffer, so no other array is allocated,
+    # unless the longitudes are overwritten before being read.
+    tx, ty = _outputArrays(lon, lat, out)
+    if out is not None and (np.may_share_memory(tx, lon) or np.may_share_memory(ty, lon)):
+        lon = np.array(lon)
 
-    tmp = lat * Deg2Rad
-    ty = cos(tmp)
+    tmp = np.multiply(lat, Deg2Rad, out=tx)
+    cos(tmp, out=ty)
     np.divide(1.0, ty, out=ty)
     tan(tmp, out=tmp)
     ty += tmp
@@ -50,13 +88,65 @@ def _posFromLonLatArray(lon, lat, zoom, tileSize):
     np.subtract(1.0, ty, out=ty)
     ty /= 2.0
 
+    np.add(lon, 180.0, out=tx)
+    tx /= 360.0
+
+    return tx, ty
+
+
+def posFromMercator(x, y, zoom, tileSize):
+    """Position in scene coordinate of the normalized Mercator coordinates.
+
+    Args:
+        x(float or numpy.ndarray): Normalized X value or values.
+        y(float or numpy.ndarray): Normalized Y value or values.
+        zoom(int): The zoom level.
+        tileSize(int): The size of the tile.
+
+    Returns:
+        tuple: (x, y) with the positions of the input coordinates.
+    """
+    zn = (1 << zoom) * float(tileSize)
+    return x * zn, y * zn
+
+
+def posFromLonLat(lon, lat, zoom, tileSize, out=None):
+    """Position in scene coordinate of the WGS84 coordinates.
+
+    Convert from WGS84 reference system to scene reference system.
+
+    Args:
+        lon(float or numpy.ndarray): Longitude value or values.
+        lat(float or numpy.ndarray): Latitude value or values.
+        zoom(int): The zoom level.
+        tileSize(int): The size of the tile.
+        out(tuple): Optional (x, y) arrays where the results are stored, they can
+            be the input arrays. Used only for numpy.ndarray inputs.
+
+    Returns:
+        tuple: (x, y) with the positions of the input coordinates.
+    """
+    if isinstance(lat, np.ndarray):
+        return _posFromLonLatArray(lon, lat, zoom, tileSize, out)
+
+    tx, ty = _mercatorFromLonLatScalar(lon, lat)
     zn = (1 << zoom) * float(tileSize)
     tx *= zn
     ty *= zn
     return tx, ty
 
 
-def lonLatFromPos(x, y, zoom, tileSize):
+def _posFromLonLatArray(lon, lat, zoom, tileSize, out=None):
+    # Optimized implementation of posFromLonLat() function for numpy arrays
+    tx, ty = _mercatorFromLonLatArray(lon, lat, out)
+
+    zn = (1 << zoom) * float(tileSize)
+    tx *= zn
+    ty *= zn
+    return tx, ty
+
+
+def lonLatFromPos(x, y, zoom, tileSize, out=None):
     """Position in WGS84 coordinate of the scene coordinates.
 
     Convert from scene reference system to WGS84 reference system.
@@ -66,35 +156,48 @@ def lonLatFromPos(x, y, zoom, tileSize):
         y(float, int or numpy.ndarray): Y value or values.
         zoom(int): The zoom level.
         tileSize(int): The size of the tile.
+        out(tuple): Optional (lon, lat) arrays where the results are stored, they
+            can be the input arrays. Used only for numpy.ndarray inputs.
 
     Returns:
         tuple: (lon, lat) with the coordinates of the input positions.
     """
     if isinstance(y, np.ndarray):
-        return _lonLatFromPosArray(x, y, zoom, tileSize)
+        return _lonLatFromPosArray(x, y, zoom, tileSize, out)
+    return _lonLatFromPosScalar(x, y, zoom, tileSize)
+
 
-    tx = x / tileSize
-    ty = y / tileSize
+def _lonLatFromPosScalar(x, y, zoom, tileSize):
+    # Implementation of lonLatFromPos() function for scalars, based on the
+    # math module: it avoids the overhead of the numpy ufuncs and returns floats.
+    tx = float(x) / tileSize
+    ty = float(y) / tileSize
     zn = 1 << zoom
     lon = tx / zn * 360.0 - 180.0
     n = PI - PI2 * ty / zn
-    lat = arctan(0.5 * (exp(n) - exp(-n))) / Deg2Rad
+    # Same results of numpy.exp() outside of the domain of math.exp()
+    if abs(n) < _EXP_MAX:
+        lat = math.atan(0.5 * (math.exp(n) - math.exp(-n))) / Deg2Rad
+    elif n == n:
+        lat = math.copysign(90.0, n)
+    else:
+        lat = _NAN
     return lon, lat
 
 
-def _lonLatFromPosArray(x, y, zoom, tileSize):
-    # Optimized implementation of posFromLonLat() function for numpy arrays
+def _lonLatFromPosArray(x, y, zoom, tileSize, out=None):
+    # Optimized implementation of posFromLonLat() function for numpy arrays.
+    # The longitude output is used as temporary buffer, so no other array is allocated,
+    # unless the X values are overwritten before being read.
+    lon, lat = _outputArrays(x, y, out)
+    if out is not None and (np.may_share_memory(lon, x) or np.may_share_memory(lat, x)):
+        x = np.array(x)
     zn = 1 << zoom
 
-    lon = x / tileSize
-    lon /= zn
-    lon *= 360
-    lon -= 180
-
-    lat = y / tileSize
+    np.divide(y, tileSize, out=lat)
     lat *= -PI2 / zn
     lat += PI
-    tmp = lat * -1.0
+    tmp = np.multiply(lat, -1.0, out=lon)
     exp(lat, out=lat)
     exp(tmp, out=tmp)
     lat -= tmp
@@ -102,4 +205,285 @@ def _lonLatFromPosArray(x, y, zoom, tileSize):
     arctan(lat, out=lat)
     lat /= Deg2Rad
 
+    np.divide(x, tileSize, out=lon)
+    lon /= zn
+    lon *= 360
+    lon -= 180
+
     return lon, lat
+
+
+def _projectChunked(kernel, a, b, zoom, tileSize, out, chunkSize, numThreads):
+    # Apply the kernel to the chunks of the input arrays, in a pool of threads.
+    # NumPy ufuncs release the GIL, so the chunks are projected in parallel.
+    a = np.asarray(a)
+    b = np.asarray(b)
+    if a.shape != b.shape:
+        raise ValueError('The input arrays must have the same shape')
+
+    out = _outputArrays(a, b, out)
+    if not (out[0].flags.c_contiguous and out[1].flags.c_contiguous):
+        raise ValueError('The output arrays must be contiguous')
+
+    flatA = a.reshape(-1)
+    flatB = b.reshape(-1)
+    flatOutA = out[0].reshape(-1)
+    flatOutB = out[1].reshape(-1)
+
+    def project(start):
+        end = start + chunkSize
+        kernel(flatA[start:end], flatB[start:end], zoom, tileSize, (flatOutA[start:end], flatOutB[start:end]))
+
+    starts = range(0, flatA.size, chunkSize)
+    if numThreads is None:
+        numThreads = multiprocessing.cpu_count()
+    numThreads = min(numThreads, len(starts))
+
+    if numThreads <= 1 or ThreadPoolExecutor is None:
+        for start in starts:
+            project(start)
+    else:
+        with ThreadPoolExecutor(max_workers=numThreads) as executor:
+            for _ in executor.map(project, starts):
+                pass
+
+    return out
+
+
+def posFromLonLatChunked(lon, lat, zoom, tileSize, out=None, chunkSize=CHUNK_SIZE, numThreads=None):
+    """Position in scene coordinate of large arrays of WGS84 coordinates.
+
+    Same as :func:`posFromLonLat`, but the arrays are processed in chunks of
+    ``chunkSize`` points distributed over a pool of threads. The projection does
+    not allocate temporary arrays, so the memory used is bounded by the output arrays.
+
+    Args:
+        lon(numpy.ndarray): Longitude values.
+        lat(numpy.ndarray): Latitude values.
+        zoom(int): The zoom level.
+        tileSize(int): The size of the tile.
+        out(tuple): Optional contiguous (x, y) arrays where the results are stored.
+        chunkSize(int): Number of points of each chunk.
+        numThreads(int): Number of threads, default `None` for the number of CPUs.
+
+    Returns:
+        tuple: (x, y) with the positions of the input coordinates.
+    """
+    return _projectChunked(_posFromLonLatArray, lon, lat, zoom, tileSize, out, chunkSize, numThreads)
+
+
+def lonLatFromPosChunked(x, y, zoom, tileSize, out=None, chunkSize=CHUNK_SIZE, numThreads=None):
+    """Position in WGS84 coordinate of large arrays of scene coordinates.
+
+    Same as :func:`lonLatFromPos`, but the arrays are processed in chunks of
+    ``chunkSize`` points distributed over a pool of threads.
+
+    Args:
+        x(numpy.ndarray): X values.
+        y(numpy.ndarray): Y values.
+        zoom(int): The zoom level.
+        tileSize(int): The size of the tile.
+        out(tuple): Optional contiguous (lon, lat) arrays where the results are stored.
+        chunkSize(int): Number of points of each chunk.
+        numThreads(int): Number of threads, default `None` for the number of CPUs.
+
+    Returns:
+        tuple: (lon, lat) with the coordinates of the input positions.
+    """
+    return _projectChunked(_lonLatFromPosArray, x, y, zoom, tileSize, out, chunkSize, numThreads)
+
+
+def _tileCoordinates(lon, lat, zoom):
+    # Fractional tile coordinates, clipped to the valid range of the zoom level
+    n = 1 << zoom
+    shape = np.shape(lat)
+    mx, my = mercatorFromLonLat(np.atleast_1d(np.asarray(lon, dtype=np.float64)),
+                                np.atleast_1d(np.asarray(lat, dtype=np.float64)))
+    mx = mx.reshape(shape)
+    my = my.reshape(shape)
+    last = np.nextafter(n, 0)
+    return np.clip(mx * n, 0.0, last), np.clip(my * n, 0.0, last)
+
+
+def _asZooms(zooms):
+    if np.isscalar(zooms):
+        return [int(zooms)]
+    return [int(z) for z in zooms]
+
+
+def _uniqueTiles(tx, ty, zoom):
+    # Remove the duplicated tiles of a zoom level, sorting them by row
+    n = 1 << zoom
+    keys = np.unique(ty * n + tx)
+    return keys % n, keys // n
+
+
+def _stackTiles(tiles):
+    # Concatenate the (tx, ty, zoom) tuples of several zoom levels
+    if len(tiles) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    tx = np.concatenate([t[0] for t in tiles])
+    ty = np.concatenate([t[1] for t in tiles])
+    tz = np.concatenate([np.full(len(t[0]), t[2], dtype=np.int64) for t in tiles])
+    return tx, ty, tz
+
+
+def tileFromLonLat(lon, lat, zoom):
+    """Tile containing the WGS84 coordinates.
+
+    Coordinates outside of the map are assigned to the nearest tile.
+
+    Args:
+        lon(float or numpy.ndarray): Longitude value or values.
+        lat(float or numpy.ndarray): Latitude value or values.
+        zoom(int): The zoom level.
+
+    Returns:
+        tuple: (tx, ty) with the integer indices of the tiles.
+    """
+    mx, my = _tileCoordinates(lon, lat, zoom)
+    return np.floor(mx).astype(np.int64), np.floor(my).astype(np.int64)
+
+
+def tileBounds(tx, ty, zoom):
+    """WGS84 bounds of the tiles.
+
+    Args:
+        tx(int or numpy.ndarray): X index or indices of the tiles.
+        ty(int or numpy.ndarray): Y index or indices of the tiles.
+        zoom(int): The zoom level.
+
+    Returns:
+        tuple: (lon0, lat0, lon1, lat1) with the coordinates of the top left
+        and of the bottom right corners of the tiles.
+    """
+    tx = np.asarray(tx, dtype=np.float64)
+    ty = np.asarray(ty, dtype=np.float64)
+    lon0, lat0 = _lonLatFromPosArray(tx, ty, zoom, 1)
+    lon1, lat1 = _lonLatFromPosArray(tx + 1.0, ty + 1.0, zoom, 1)
+    return lon0, lat0, lon1, lat1
+
+
+def tilesInBox(lon0, lat0, lon1, lat1, zooms):
+    """Tiles intersecting a WGS84 bounding box.
+
+    Args:
+        lon0(float): Longitude of the top left corner.
+        lat0(float): Latitude of the top left corner.
+        lon1(float): Longitude of the bottom right corner.
+        lat1(float): Latitude of the bottom right corner.
+        zooms(int or iterable): The zoom level or levels.
+
+    Returns:
+        tuple: (tx, ty, zoom) arrays with the indices and the zoom level of the tiles.
+    """
+    tiles = list()
+    for zoom in _asZooms(zooms):
+        tx, ty = tileFromLonLat(np.array([lon0, lon1]), np.array([lat0, lat1]), zoom)
+        xs = np.arange(tx.min(), tx.max() + 1, dtype=np.int64)
+        ys = np.arange(ty.min(), ty.max() + 1, dtype=np.int64)
+        tiles.append((np.tile(xs, len(ys)), np.repeat(ys, len(xs)), zoom))
+    return _stackTiles(tiles)
+
+
+def _gridCrossings(u0, u1, v0, v1, iu0, iu1):
+    # Cells touched where the segments cross the grid lines orthogonal to the u axis
+    count = np.abs(iu1 - iu0)
+    total = int(count.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    seg = np.repeat(np.arange(len(count)), count)
+    step = np.arange(total) - np.repeat(np.cumsum(count) - count, count)
+    forward = iu1[seg] > iu0[seg]
+    line = np.where(forward, iu0[seg] + 1 + step, iu0[seg] - step)
+
+    t = (line - u0[seg]) / (u1[seg] - u0[seg])
+    v = v0[seg] + t * (v1[seg] - v0[seg])
+    iv = np.floor(v).astype(np.int64)
+    return np.concatenate([line - 1, line]), np.concatenate([iv, iv])
+
+
+def tilesAlongPolyline(lons, lats, zooms):
+    """Tiles touched by a polyline.
+
+    The tiles crossed by each segment of the polyline are evaluated exactly
+    from the intersections of the segment with the borders of the tiles.
+
+    Args:
+        lons(numpy.ndarray): Longitudes of the points of the polyline.
+        lats(numpy.ndarray): Latitudes of the points of the polyline.
+        zooms(int or iterable): The zoom level or levels.
+
+    Returns:
+        tuple: (tx, ty, zoom) arrays with the unique tiles touched by the polyline.
+    """
+    tiles = list()
+    for zoom in _asZooms(zooms):
+        fx, fy = _tileCoordinates(lons, lats, zoom)
+        ix = np.floor(fx).astype(np.int64)
+        iy = np.floor(fy).astype(np.int64)
+
+        cx, cy = _gridCrossings(fx[:-1], fx[1:], fy[:-1], fy[1:], ix[:-1], ix[1:])
+        ry, rx = _gridCrossings(fy[:-1], fy[1:], fx[:-1], fx[1:], iy[:-1], iy[1:])
+
+        n = 1 << zoom
+        tx = np.clip(np.concatenate([ix, cx, rx]), 0, n - 1)
+        ty = np.clip(np.concatenate([iy, cy, ry]), 0, n - 1)
+        tx, ty = _uniqueTiles(tx, ty, zoom)
+        tiles.append((tx, ty, zoom))
+    return _stackTiles(tiles)
+
+
+def quadKeyFromTile(tx, ty, zoom):
+    """Quadkeys of the tiles.
+
+    Args:
+        tx(int or numpy.ndarray): X index or indices of the tiles.
+        ty(int or numpy.ndarray): Y index or indices of the tiles.
+        zoom(int): The zoom level.
+
+    Returns:
+        numpy.ndarray: Array of strings with the quadkeys of the tiles.
+    """
+    tx = np.atleast_1d(np.asarray(tx, dtype=np.int64))
+    ty = np.atleast_1d(np.asarray(ty, dtype=np.int64))
+    if zoom == 0:
+        return np.full(len(tx), '', dtype='U1')
+
+    shifts = np.arange(zoom - 1, -1, -1, dtype=np.int64)
+    digits = ((tx[:, None] >> shifts) & 1) + 2 * ((ty[:, None] >> shifts) & 1)
+    chars = np.ascontiguousarray(digits + ord('0'), dtype=np.uint8)
+    return chars.view('S%d' % zoom).ravel().astype('U%d' % zoom)
+
+
+def _spreadBits(v):
+    # Insert a zero bit between the 32 lower bits of v
+    v = v & np.uint64(0x00000000FFFFFFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def mortonCode(tx, ty):
+    """Morton (Z-order) code of the tiles.
+
+    The code interleaves the bits of the tile indices, so it is the numeric value
+    of the quadkey of the tile (see :func:`quadKeyFromTile`): the tiles inside a
+    tile of a lower zoom level have contiguous codes.
+
+    Args:
+        tx(int or numpy.ndarray): X index or indices of the tiles, up to 32 bits.
+        ty(int or numpy.ndarray): Y index or indices of the tiles, up to 32 bits.
+
+    Returns:
+        numpy.ndarray: The codes of the tiles, as unsigned 64 bit integers.
+    """
+    tx = np.asarray(tx).astype(np.uint64)
+    ty = np.asarray(ty).astype(np.uint64)
+    return _spreadBits(tx) | (_spreadBits(ty) << np.uint64(1))
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from qtpy.QtWidgets import QApplication
+
+from pytilemap import MapGraphicsView, MapTileSource
+
+
+class NullTileSource(MapTileSource):
+    """Tile source without tiles, for the scenes of the tests."""
+
+    def __init__(self):
+        MapTileSource.__init__(self, minZoom=0, maxZoom=20)
+
+    def requestTile(self, x, y, zoom):
+        return None
+
+
+@pytest.fixture(scope='session')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def scene(app):
+    """Scene of a 800x600 view, centered on (10.07, 44.86)."""
+    view = MapGraphicsView(tileSource=NullTileSource())
+    view.resize(800, 600)
+    scene = view.scene()
+    scene.setSize(800, 600)
+    scene.setCenter(10.07, 44.86)
+    yield scene
+    view.close()
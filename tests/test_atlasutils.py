@@ -0,0 +1,40 @@
+import pytest
+import numpy as np
+
+from pytilemap.atlasutils import packShelves
+
+
+@pytest.mark.parametrize('count, maxWidth, padding', [
+    (1, 64, 1),
+    (30, 64, 1),
+    (30, 256, 0),
+    (200, 128, 2),
+])
+def test_pack_shelves(count, maxWidth, padding):
+    rng = np.random.RandomState(count)
+    widths = rng.randint(4, 48, count)
+    heights = rng.randint(4, 48, count)
+    x, y, width, height = packShelves(widths, heights, maxWidth, padding)
+
+    assert width <= maxWidth
+    assert np.all(x >= 0) and np.all(y >= 0)
+    assert np.all(x + widths <= width) and np.all(y + heights <= height)
+    for i in range(count):
+        for j in range(i + 1, count):
+            separated = x[i] + widths[i] + padding <= x[j] or x[j] + widths[j] + padding <= x[i] or \
+                y[i] + heights[i] + padding <= y[j] or y[j] + heights[j] + padding <= y[i]
+            assert separated
+
+
+def test_pack_shelves_wide_rect():
+    x, y, width, height = packShelves([10, 100, 10], [10, 5, 20], maxWidth=50, padding=0)
+    assert width == 100
+    assert height == 25
+    assert y.tolist() == [0, 20, 0]
+    assert x.tolist() == [10, 0, 0]
+
+
+def test_pack_shelves_empty():
+    x, y, width, height = packShelves([], [])
+    assert len(x) == len(y) == 0
+    assert (width, height) == (0, 0)
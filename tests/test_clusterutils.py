@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+
+from pytilemap.clusterutils import PointClusters
+
+
+def makePoints(count, seed=0):
+    rng = np.random.RandomState(seed)
+    x = np.concatenate([rng.uniform(0.0, 1.0, count // 2), rng.normal(0.53, 0.001, count - count // 2)])
+    y = np.concatenate([rng.uniform(0.0, 1.0, count // 2), rng.normal(0.37, 0.001, count - count // 2)])
+    return x, y
+
+
+@pytest.mark.parametrize('zoom', [0, 3, 9, 14, 18, 22])
+def test_clusters_partition_points(zoom):
+    x, y = makePoints(5000)
+    clusters = PointClusters(x, y, maxZoom=18, cellBits=2)
+    ids, cx, cy, counts = clusters.clusters(zoom)
+    assert counts.sum() == len(x)
+
+    cells = 1 << (min(zoom, 18) + 2)
+    for i in ids[::37]:
+        leaves = clusters.leaves(zoom, i)
+        assert len(leaves) == counts[i]
+        assert np.allclose(cx[i], x[leaves].mean()) and np.allclose(cy[i], y[leaves].mean())
+        # All the points of a cluster are in the same cell
+        assert len(set(np.floor(x[leaves] * cells).astype(int).tolist())) == 1
+        assert len(set(np.floor(y[leaves] * cells).astype(int).tolist())) == 1
+
+
+@pytest.mark.parametrize('zoom', [2, 8, 12, 16])
+def test_clusters_in_rect(zoom):
+    x, y = makePoints(5000, seed=1)
+    clusters = PointClusters(x, y)
+    allIds, cx, cy, _ = clusters.clusters(zoom)
+
+    size = 4.0 / (1 << zoom)
+    for left, top in [(0.53 - size / 2.0, 0.37 - size / 2.0), (0.1, 0.2), (1.0 - size / 3, 0.0)]:
+        rect = (left, top, left + size, top + size)
+        ids, rx, ry, counts = clusters.clusters(zoom, rect)
+        inside = (cx >= rect[0]) & (cx <= rect[2]) & (cy >= rect[1]) & (cy <= rect[3])
+        assert sorted(ids.tolist()) == allIds[inside].tolist()
+
+
+def test_clusters_children():
+    x, y = makePoints(2000, seed=2)
+    clusters = PointClusters(x, y, minZoom=2, maxZoom=12)
+    for zoom in range(2, 12):
+        ids, _, _, counts = clusters.clusters(zoom)
+        _, _, _, childCounts = clusters.clusters(zoom + 1)
+        for i in ids[::11]:
+            children = clusters.children(zoom, i)
+            assert childCounts[children].sum() == counts[i]
+            leaves = np.concatenate([clusters.leaves(zoom + 1, c) for c in children])
+            assert np.array_equal(np.sort(leaves), np.sort(clusters.leaves(zoom, i)))
+
+
+def test_clusters_empty():
+    clusters = PointClusters(np.empty(0), np.empty(0))
+    ids, cx, cy, counts = clusters.clusters(5, (0.0, 0.0, 1.0, 1.0))
+    assert len(ids) == len(cx) == len(cy) == len(counts) == 0
@@ -2,11 +2,13 @@ import pytest
 import numpy as np
 
 from qtpy.QtCore import Qt
-from qtpy.QtGui import QColor, QBrush, QPen
+from qtpy.QtCore import QPointF
+from qtpy.QtGui import QColor, QBrush, QPen, QPolygonF, QImage
 
 
 from pytilemap.functions import makeColorFromInts, makeColorFromFloats, makeColorFromStr, \
-    makeColorFromList, makeColorFromNdArray, makeColor, makeBrush, makePen, clip
+    makeColorFromList, makeColorFromNdArray, makeColor, makeBrush, makePen, clip, makePolygonF, \
+    makeRgbaArray, makeImage, makePixmapFragments
 
 SolidLine = Qt.SolidLine
 DashLine = Qt.DashLine
@@ -19,12 +21,16 @@ COLOR_ARG_LIST_INT = [(1, 2, 3), (1, 2, 3, 4), [1, 2, 3]]
 COLOR_ARG_LIST_INT_REF = [QColor(1, 2, 3), QColor(1, 2, 3, 4), QColor(1, 2, 3)]
 
 COLOR_ARG_LIST_FLOAT = [(0.1, 0.2, 0.3), (0.1, 0.2, 0.3, 0.4), [0.1, 0.2, 0.3]]
-COLOR_ARG_LIST_FLOAT_REF = [QColor(0.1 * 255, 0.2 * 255, 0.3 * 255),
-                            QColor(0.1 * 255, 0.2 * 255, 0.3 * 255, 0.4 * 255),
-                            QColor(0.1 * 255, 0.2 * 255, 0.3 * 255)]
+COLOR_ARG_LIST_FLOAT_REF = [QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255)),
+                            QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255), int(0.4 * 255)),
+                            QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255))]
 
 COLOR_ARG_LIST_STR = ['#FFAA11', 'green']
 COLOR_ARG_LIST_STR_REF = [QColor(255, 170, 17), QColor(0, 128, 0)]
+COLOR_ARG_LIST_QCOLOR = [QColor(255, 170, 17), QColor(0, 128, 0)]
+
+COLOR_ARG_STR = '#FFAA11'
+COLOR_ARG_STR_REF = [QColor(255, 170, 17), QColor(255, 170, 17), QColor(255, 170, 17)]
 
 COLOR_ARG_NDARRAY_INT3 = np.asarray([[1, 2, 3], [4, 5, 6]], dtype=np.int64)
 COLOR_ARG_NDARRAY_INT3_REF = [QColor(1, 2, 3), QColor(4, 5, 6)]
@@ -32,11 +38,11 @@ COLOR_ARG_NDARRAY_INT4 = np.asarray([[1, 2, 3, 4], [4, 5, 6, 7]], dtype=np.int64
 COLOR_ARG_NDARRAY_INT4_REF = [QColor(1, 2, 3, 4), QColor(4, 5, 6, 7)]
 
 COLOR_ARG_NDARRAY_FLOAT3 = np.asarray([[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]], dtype=np.float64)
-COLOR_ARG_NDARRAY_FLOAT3_REF = [QColor(0.1 * 255, 0.2 * 255, 0.3 * 255),
-                                QColor(0.4 * 255, 0.5 * 255, 0.6 * 255)]
+COLOR_ARG_NDARRAY_FLOAT3_REF = [QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255)),
+                                QColor(int(0.4 * 255), int(0.5 * 255), int(0.6 * 255))]
 COLOR_ARG_NDARRAY_FLOAT4 = np.asarray([[0.1, 0.2, 0.3, 0.4], [0.4, 0.5, 0.6, 0.7]], dtype=np.float64)
-COLOR_ARG_NDARRAY_FLOAT4_REF = [QColor(0.1 * 255, 0.2 * 255, 0.3 * 255, 0.4 * 255),
-                                QColor(0.4 * 255, 0.5 * 255, 0.6 * 255, 0.7 * 255)]
+COLOR_ARG_NDARRAY_FLOAT4_REF = [QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255), int(0.4 * 255)),
+                                QColor(int(0.4 * 255), int(0.5 * 255), int(0.6 * 255), int(0.7 * 255))]
 
 
 @pytest.mark.parametrize('colorArgs,qcolor', [
@@ -50,9 +56,9 @@ def test_color_from_ints(colorArgs, qcolor):
 
 
 @pytest.mark.parametrize('colorArgs,qcolor', [
-    ((0.1, 0.2, 0.3, 0.4), QColor(0.1 * 255, 0.2 * 255, 0.3 * 255, 0.4 * 255)),
-    ((0.1, 0.2, 0.3), QColor(0.1 * 255, 0.2 * 255, 0.3 * 255, 255)),
-    ((0.1, 0.2, 0.3), QColor(0.1 * 255, 0.2 * 255, 0.3 * 255)),
+    ((0.1, 0.2, 0.3, 0.4), QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255), int(0.4 * 255))),
+    ((0.1, 0.2, 0.3), QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255), 255)),
+    ((0.1, 0.2, 0.3), QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255))),
 ])
 def test_color_from_floats(colorArgs, qcolor):
     color = makeColorFromFloats(colorArgs)
@@ -103,8 +109,8 @@ def test_color_from_ndarray(colorArgs, qcolor):
 @pytest.mark.parametrize('colorArgs,qcolor', [
     ((1, 2, 3, 4), QColor(1, 2, 3, 4)),
     ((1, 2, 3), QColor(1, 2, 3, 255)),
-    ((0.1, 0.2, 0.3, 0.4), QColor(0.1 * 255, 0.2 * 255, 0.3 * 255, 0.4 * 255)),
-    ((0.1, 0.2, 0.3), QColor(0.1 * 255, 0.2 * 255, 0.3 * 255, 255)),
+    ((0.1, 0.2, 0.3, 0.4), QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255), int(0.4 * 255))),
+    ((0.1, 0.2, 0.3), QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255), 255)),
     ('#FFAA11', QColor(255, 170, 17)),
     ('green', QColor(0, 128, 0)),
     (COLOR_ARG_LIST_INT, COLOR_ARG_LIST_INT_REF),
@@ -126,8 +132,8 @@ def test_color_default(colorArgs, qcolor):
 @pytest.mark.parametrize('colorArgs,qcolor', [
     ((1, 2, 3, 4), QColor(1, 2, 3, 4)),
     ((1, 2, 3), QColor(1, 2, 3, 255)),
-    ((0.1, 0.2, 0.3, 0.4), QColor(0.1 * 255, 0.2 * 255, 0.3 * 255, 0.4 * 255)),
-    ((0.1, 0.2, 0.3), QColor(0.1 * 255, 0.2 * 255, 0.3 * 255, 255)),
+    ((0.1, 0.2, 0.3, 0.4), QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255), int(0.4 * 255))),
+    ((0.1, 0.2, 0.3), QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255), 255)),
     ('#FFAA11', QColor(255, 170, 17)),
     ('green', QColor(0, 128, 0)),
 ])
@@ -159,8 +165,8 @@ def test_make_brush_list_of_colors(colorArgs, qcolor, style):
 @pytest.mark.parametrize('colorArgs,qcolor', [
     ((1, 2, 3, 4), QColor(1, 2, 3, 4)),
     ((1, 2, 3), QColor(1, 2, 3, 255)),
-    ((0.1, 0.2, 0.3, 0.4), QColor(0.1 * 255, 0.2 * 255, 0.3 * 255, 0.4 * 255)),
-    ((0.1, 0.2, 0.3), QColor(0.1 * 255, 0.2 * 255, 0.3 * 255, 255)),
+    ((0.1, 0.2, 0.3, 0.4), QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255), int(0.4 * 255))),
+    ((0.1, 0.2, 0.3), QColor(int(0.1 * 255), int(0.2 * 255), int(0.3 * 255), 255)),
     ('#FFAA11', QColor(255, 170, 17)),
     ('green', QColor(0, 128, 0)),
 ])
@@ -220,3 +226,64 @@ def test_clip(value, minValue, maxValue, expectedResult):
 
     testResult = clip(value, minValue, maxValue)
     assert testResult == expectedResult
+
+
+@pytest.mark.parametrize('size', [0, 1, 1000])
+@pytest.mark.parametrize('dtype', [np.float32, np.float64, np.int32])
+def test_make_polygon(size, dtype):
+    x = np.arange(size).astype(dtype)
+    y = (np.arange(size) * 2 + 1).astype(dtype)
+
+    polygon = makePolygonF(x, y)
+    refPolygon = QPolygonF([QPointF(px, py) for px, py in zip(x.tolist(), y.tolist())])
+    assert polygon == refPolygon
+
+
+@pytest.mark.parametrize('colorArgs,qcolor', [
+    (COLOR_ARG_NDARRAY_INT3, COLOR_ARG_NDARRAY_INT3_REF),
+    (COLOR_ARG_NDARRAY_INT4.astype(np.int32), COLOR_ARG_NDARRAY_INT4_REF),
+    (COLOR_ARG_NDARRAY_FLOAT3, COLOR_ARG_NDARRAY_FLOAT3_REF),
+    (COLOR_ARG_NDARRAY_FLOAT4.astype(np.float32), COLOR_ARG_NDARRAY_FLOAT4_REF),
+    (COLOR_ARG_STR, COLOR_ARG_STR_REF),
+    (COLOR_ARG_LIST_STR, COLOR_ARG_LIST_STR_REF),
+    (COLOR_ARG_LIST_QCOLOR, COLOR_ARG_LIST_STR_REF),
+])
+def test_make_rgba_array(colorArgs, qcolor):
+    rgba = makeRgbaArray(colorArgs, len(qcolor))
+    assert rgba.dtype == np.uint32
+    assert rgba.tolist() == [c.rgba() for c in qcolor]
+
+
+def test_make_rgba_array_wrong_size():
+    with pytest.raises(ValueError):
+        makeRgbaArray(COLOR_ARG_NDARRAY_INT3, 3)
+
+
+@pytest.mark.parametrize('shape', [(0, 0), (1, 1), (3, 5), (16, 16)])
+def test_make_image(shape):
+    argb = np.arange(shape[0] * shape[1], dtype=np.uint32).reshape(shape) * 0x01020304
+    image = makeImage(argb)
+    if argb.size == 0:
+        assert image.isNull()
+        return
+    assert image.format() == QImage.Format_ARGB32
+    assert (image.height(), image.width()) == shape
+    for row in range(shape[0]):
+        for col in range(shape[1]):
+            assert image.pixel(col, row) == argb[row, col]
+
+
+@pytest.mark.parametrize('count', [0, 1, 10])
+def test_make_pixmap_fragments(count):
+    x = np.arange(count, dtype=np.float64)
+    y = x * 2.0
+    rects = np.arange(count * 4, dtype=np.float64).reshape(count, 4)
+    rotations = x * 10.0
+    fragments = makePixmapFragments(x, y, rects, rotations)
+    assert len(fragments) == count
+    for i in range(count):
+        fragment = fragments[i]
+        assert (fragment.x, fragment.y) == (x[i], y[i])
+        assert [fragment.sourceLeft, fragment.sourceTop, fragment.width, fragment.height] == rects[i].tolist()
+        assert (fragment.scaleX, fragment.scaleY, fragment.opacity) == (1.0, 1.0, 1.0)
+        assert fragment.rotation == rotations[i]
@@ -0,0 +1,107 @@
+import io
+import json
+
+import pytest
+import numpy as np
+
+from pytilemap.geojsonutils import iterGeoJsonFeatures, readGeoJson
+
+
+FEATURES = [
+    {'type': 'Feature', 'properties': {'name': u'café'},
+     'geometry': {'type': 'Point', 'coordinates': [10.0, 44.5]}},
+    {'type': 'Feature', 'properties': {'features': []},
+     'geometry': {'type': 'LineString', 'coordinates': [[10.0, 44.0], [10.5, 44.1], [11.0, 44.2, 100.0]]}},
+    {'type': 'Feature', 'properties': None,
+     'geometry': {'type': 'MultiPoint', 'coordinates': [[1.0, 2.0], [3.0, 4.0]]}},
+    {'type': 'Feature', 'properties': None, 'geometry': None},
+    {'type': 'Feature', 'properties': None,
+     'geometry': {'type': 'Polygon', 'coordinates': [[[0, 0], [1, 0], [1, 1], [0, 0]],
+                                                     [[0.2, 0.2], [0.4, 0.2], [0.2, 0.2]]]}},
+    {'type': 'Feature', 'properties': None,
+     'geometry': {'type': 'GeometryCollection', 'geometries': [
+         {'type': 'MultiLineString', 'coordinates': [[[5, 5], [6, 6]], [[7, 7], [8, 8], [9, 9]]]},
+         {'type': 'MultiPolygon', 'coordinates': [[[[2, 2], [3, 2], [3, 3], [2, 2]]]]}]}},
+]
+
+COLLECTION = {'type': 'FeatureCollection', 'crs': {'type': 'name'}, 'features': FEATURES}
+
+
+@pytest.mark.parametrize('chunkSize', [1, 7, 64, 1 << 20])
+@pytest.mark.parametrize('binary', [False, True])
+def test_iter_features(chunkSize, binary):
+    text = json.dumps(COLLECTION, indent=1, ensure_ascii=False)
+    stream = io.BytesIO(text.encode('utf-8')) if binary else io.StringIO(text)
+    assert list(iterGeoJsonFeatures(stream, chunkSize)) == FEATURES
+
+
+@pytest.mark.parametrize('chunkSize', [3, 1 << 20])
+def test_read_geojson(chunkSize):
+    stream = io.StringIO(json.dumps(COLLECTION))
+    layers = readGeoJson(stream, chunkSize)
+    assert layers.featureCount == len(FEATURES)
+
+    lons, lats = layers.points
+    assert lons.tolist() == [10.0, 1.0, 3.0]
+    assert lats.tolist() == [44.5, 2.0, 4.0]
+
+    lons, lats, parts = layers.lines
+    assert lons.tolist() == [10.0, 10.5, 11.0, 5, 6, 7, 8, 9]
+    assert lats.tolist() == [44.0, 44.1, 44.2, 5, 6, 7, 8, 9]
+    assert parts.tolist() == [0, 3, 5]
+
+    lons, lats, parts = layers.polygons
+    assert lons.tolist() == [0, 1, 1, 0, 0.2, 0.4, 0.2, 2, 3, 3, 2]
+    assert parts.tolist() == [0, 4, 7]
+
+
+def test_read_single_geometry():
+    layers = readGeoJson(io.StringIO(json.dumps(FEATURES[1]['geometry'])))
+    assert layers.featureCount == 1
+    assert len(layers.lines[0]) == 3
+    assert len(layers.points[0]) == 0
+
+
+@pytest.mark.parametrize('text', [
+    json.dumps(COLLECTION)[:-20],
+    '{"type": "FeatureCollection", "features": [{"type": "Feature", "geometry": {"type": "Circle"}}]}',
+])
+def test_read_invalid_geojson(text):
+    with pytest.raises(ValueError):
+        readGeoJson(io.StringIO(text), chunkSize=16)
+
+
+def test_read_geojson_path(tmpdir):
+    path = tmpdir.join('features.geojson')
+    path.write_binary(json.dumps(COLLECTION).encode('utf-8'))
+    for source in (str(path), u'%s' % path):
+        layers = readGeoJson(source)
+        assert layers.featureCount == len(FEATURES)
+        parts = layers.polygons[2]
+        assert parts.dtype == np.intp and parts.tolist() == [0, 4, 7]
+
+
+def test_read_empty_parts():
+    features = [
+        {'type': 'Feature', 'properties': None,
+         'geometry': {'type': 'LineString', 'coordinates': [[10.0, 44.0], [10.5, 44.1]]}},
+        {'type': 'Feature', 'properties': None,
+         'geometry': {'type': 'MultiLineString', 'coordinates': [[[1.0, 2.0]], []]}},
+        {'type': 'Feature', 'properties': None, 'geometry': {'type': 'LineString', 'coordinates': []}},
+    ]
+    layers = readGeoJson(io.StringIO(json.dumps({'type': 'FeatureCollection', 'features': features})))
+    lons, lats, parts = layers.lines
+    assert lons.tolist() == [10.0, 10.5]
+    assert parts.tolist() == [0]
+
+
+@pytest.mark.parametrize('chunkSize', [1, 5, 1 << 20])
+def test_iter_features_nested_key(chunkSize):
+    document = {'type': 'FeatureCollection', 'metadata': {'features': [1, 2], 'count': 12345},
+                'bbox': [0.5, 1.25], 'features': FEATURES}
+    stream = io.StringIO(json.dumps(document))
+    assert list(iterGeoJsonFeatures(stream, chunkSize)) == FEATURES
+
+    stream = io.StringIO(json.dumps({'type': 'FeatureCollection', 'features': [1, 2]}))
+    with pytest.raises(ValueError):
+        list(iterGeoJsonFeatures(stream, chunkSize))
@@ -0,0 +1,95 @@
+import pytest
+import numpy as np
+
+from pytilemap.heatmaputils import gaussianKernel, smoothGrid, colormapLut, PointDensity
+
+
+@pytest.mark.parametrize('radius', [0, 1, 5, 12])
+def test_gaussian_kernel(radius):
+    kernel = gaussianKernel(radius)
+    assert len(kernel) == 2 * radius + 1
+    assert kernel[radius] == 1.0
+    assert np.allclose(kernel, kernel[::-1])
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (7, 5), (32, 32)])
+def test_smooth_grid(shape):
+    rng = np.random.RandomState(0)
+    grid = rng.uniform(size=shape)
+    kernel = gaussianKernel(3)
+    kernel2d = np.outer(kernel, kernel)
+
+    expected = np.zeros(shape)
+    padded = np.zeros((shape[0] + 6, shape[1] + 6))
+    padded[3:-3, 3:-3] = grid
+    for i in range(shape[0]):
+        for j in range(shape[1]):
+            expected[i, j] = (padded[i:i + 7, j:j + 7] * kernel2d).sum()
+    assert np.allclose(smoothGrid(grid, kernel), expected)
+
+
+def test_colormap_lut():
+    lut = colormapLut([(0, 0, 255, 0), (255, 0, 0, 255)], size=3)
+    assert lut.tolist() == [0x000000ff, 0x80800080, 0xffff0000]
+
+
+def test_density_single_point():
+    tileSize = 16
+    zoom = 2
+    scale = (1 << zoom) * tileSize
+    # A point in the pixel (1, 9) of the tile (1, 2)
+    density = PointDensity([(tileSize + 1.5) / scale], [(2 * tileSize + 9.5) / scale], weights=[2.0])
+    kernel = gaussianKernel(3)
+    tile = density.tile(1, 2, zoom, tileSize, kernel)
+    assert tile.shape == (tileSize, tileSize)
+    assert tile[9, 1] == 2.0
+    assert np.allclose(tile[6:13, 0:5], 2.0 * np.outer(kernel, kernel[2:]))
+    assert np.isclose(tile.sum(), 2.0 * kernel.sum() * kernel[2:].sum())
+
+    # The point contributes to the border of the neighbour tile
+    assert np.allclose(density.tile(0, 2, zoom, tileSize, kernel)[9, -2:], 2.0 * kernel[:2])
+    assert not density.tile(1, 1, zoom, tileSize, kernel).any()
+
+
+def test_density_tiles_match_global_grid():
+    rng = np.random.RandomState(1)
+    x = rng.uniform(0.0, 1.0, 2000)
+    y = rng.uniform(0.0, 1.0, 2000)
+    density = PointDensity(x, y)
+    zoom, tileSize = 1, 16
+    kernel = gaussianKernel(4)
+
+    size = (1 << zoom) * tileSize
+    grid = np.zeros((size, size))
+    np.add.at(grid, (np.floor(y * size).astype(int), np.floor(x * size).astype(int)), 1.0)
+    expected = smoothGrid(grid, kernel)
+    for tx in range(2):
+        for ty in range(2):
+            tile = density.tile(tx, ty, zoom, tileSize, kernel)
+            assert np.allclose(tile, expected[ty * tileSize:(ty + 1) * tileSize, tx * tileSize:(tx + 1) * tileSize])
+
+    assert density.maxDensity(zoom, tileSize, 4) >= 1.0
+    with pytest.raises(ValueError):
+        PointDensity(x, y, weights=np.ones(3))
+
+
+@pytest.mark.parametrize('zoom, radius', [(2, 4), (20, 1), (30, 1)])
+def test_max_density(zoom, radius):
+    tileSize = 256
+    scale = (1 << zoom) * float(tileSize) / radius
+    # Points in three cells: the first and the last cells differ only in Y, the
+    # second differs only in X, by one cell
+    cell = 1.0 / scale
+    x = np.array([0.5, 0.5, 0.5, 1.5, 1.5, 0.5, 0.5, 0.5, 0.5]) * cell + 0.3
+    y = np.array([0.5, 0.5, 0.5, 0.5, 0.5, 1.5, 1.5, 1.5, 1.5]) * cell + 0.6
+    weights = np.array([1.0, 2.0, 3.0, 10.0, 1.0, 1.0, 1.0, 1.0, 1.0])
+    density = PointDensity(x, y, weights)
+    assert density.maxDensity(zoom, tileSize, radius) == 11.0
+    assert PointDensity(x, y).maxDensity(zoom, tileSize, radius) == 4.0
+    assert PointDensity([], []).maxDensity(zoom, tileSize, radius) == 0.0
+
+    # Cells far apart, whose indices differ by a large power of 2
+    x = np.array([0.1, 0.1 + (1 << 24) * cell, 0.1 + (1 << 32) * cell])
+    x = x[x < 1.0]
+    y = np.full(len(x), 0.6)
+    assert PointDensity(x, y).maxDensity(zoom, tileSize, radius) == 1.0
@@ -0,0 +1,101 @@
+import pytest
+import numpy as np
+
+from pytilemap.labelutils import LabelGrid, LabelPlacement
+
+
+def overlaps(a, b):
+    return a[0] < b[2] and a[2] > b[0] and a[1] < b[3] and a[3] > b[1]
+
+
+def labelRects(placement, labels, zoom, tileSize):
+    zn = (1 << zoom) * float(tileSize)
+    rects = dict()
+    for label, offset in placement.placement(zoom, tileSize).items():
+        if offset is not None:
+            x, y, w, h, _ = labels[label]
+            rects[label] = (x * zn + offset[0], y * zn + offset[1], x * zn + offset[0] + w, y * zn + offset[1] + h)
+    return rects
+
+
+def makeLabels(count, seed=0):
+    rng = np.random.RandomState(seed)
+    return dict((i, (rng.uniform(0.4, 0.6), rng.uniform(0.4, 0.6), rng.uniform(10, 80), rng.uniform(8, 16),
+                     rng.randint(0, 3))) for i in range(count))
+
+
+def test_label_grid():
+    grid = LabelGrid(cellSize=10)
+    grid.insert('a', (0, 0, 25, 5))
+    grid.insert('b', (-15, -15, -5, -5))
+    assert grid.overlapping((20, 2, 30, 30)) == {'a'}
+    assert grid.overlapping((-10, -10, 1, 1)) == {'a', 'b'}
+    assert grid.overlapping((25, 0, 30, 5)) == set()
+
+
+@pytest.mark.parametrize('zoom', [6, 9, 12])
+def test_label_placement_without_overlaps(zoom):
+    labels = makeLabels(500)
+    placement = LabelPlacement(cellSize=32)
+    for label, values in labels.items():
+        placement.add(label, *values)
+
+    offsets = placement.placement(zoom, 256)
+    assert len(offsets) == len(labels)
+    rects = labelRects(placement, labels, zoom, 256)
+    placed = sorted(rects)
+    for i, a in enumerate(placed):
+        for b in placed[i + 1:]:
+            assert not overlaps(rects[a], rects[b])
+
+    # Each dropped label overlaps a placed label with the same or higher priority
+    # in all the candidate positions
+    zn = (1 << zoom) * 256.0
+    for label, offset in offsets.items():
+        if offset is None:
+            x, y, w, h, priority = labels[label]
+            for ox, oy in [(0, 0), (-w, 0), (0, -h), (-w, -h)]:
+                rect = (x * zn + ox, y * zn + oy, x * zn + ox + w, y * zn + oy + h)
+                assert any(overlaps(rect, r) and labels[other][4] >= priority for other, r in rects.items())
+
+
+def test_label_placement_priority():
+    placement = LabelPlacement()
+    placement.add('low', 0.5, 0.5, 40, 10, priority=0)
+    placement.add('high', 0.5, 0.5, 40, 10, priority=5)
+    offsets = placement.placement(0, 256)
+    assert offsets['high'] == (0.0, 0.0)
+    assert offsets['low'] == (-40.0, 0.0)
+
+
+def test_label_placement_zoom_range():
+    placement = LabelPlacement()
+    placement.add('far', 0.5, 0.5, 40, 10, priority=5, minZoom=10)
+    placement.add('near', 0.5, 0.5, 40, 10, maxZoom=12)
+    assert placement.placement(8, 256) == {'far': None, 'near': (0.0, 0.0)}
+    assert placement.placement(11, 256) == {'far': (0.0, 0.0), 'near': (-40.0, 0.0)}
+    assert placement.placement(14, 256) == {'far': (0.0, 0.0), 'near': None}
+
+
+@pytest.mark.parametrize('zoom', [8, 10])
+def test_label_placement_incremental(zoom):
+    labels = makeLabels(400, seed=1)
+    placement = LabelPlacement(cellSize=32)
+    for label in range(300):
+        placement.add(label, *labels[label])
+    placement.placement(zoom, 256)
+
+    # Add and remove labels with the placement cached, the result must be equal
+    # to the placement evaluated from scratch
+    for label in range(300, 400):
+        placement.add(label, *labels[label])
+        placement.placement(zoom, 256)
+    for label in range(0, 400, 7):
+        placement.remove(label)
+        del labels[label]
+        placement.placement(zoom, 256)
+
+    reference = LabelPlacement(cellSize=32)
+    for label in sorted(labels):
+        reference.add(label, *labels[label])
+    assert placement.placement(zoom, 256) == reference.placement(zoom, 256)
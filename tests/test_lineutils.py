@@ -0,0 +1,158 @@
+import pytest
+import numpy as np
+
+from pytilemap.lineutils import simplificationTolerances, visibleRuns, decimatePolyline, interpolatePolyline, \
+    SegmentGrid
+
+
+def distanceFromPolyline(px, py, x, y):
+    # Distance of each point p from the polyline (x, y)
+    ax, ay, bx, by = x[:-1], y[:-1], x[1:], y[1:]
+    dx = bx - ax
+    dy = by - ay
+    len2 = np.maximum(dx * dx + dy * dy, 1e-300)
+    t = ((px[:, None] - ax) * dx + (py[:, None] - ay) * dy) / len2
+    t = np.clip(t, 0.0, 1.0)
+    dist = np.hypot(px[:, None] - ax - t * dx, py[:, None] - ay - t * dy)
+    return dist.min(axis=1)
+
+
+def test_simplification_special_cases():
+    assert len(simplificationTolerances([], [])) == 0
+    assert np.all(np.isinf(simplificationTolerances([1.0], [2.0])))
+    assert np.all(np.isinf(simplificationTolerances([1.0, 2.0], [2.0, 3.0])))
+
+    tolerances = simplificationTolerances(np.arange(10.0), np.zeros(10))
+    assert np.isinf(tolerances[0]) and np.isinf(tolerances[-1])
+    assert np.all(tolerances[1:-1] == 0.0)
+
+    tolerances = simplificationTolerances([0.0, 1.0, 2.0], [0.0, 3.0, 0.0])
+    assert tolerances[1] == 3.0
+
+
+@pytest.mark.parametrize('tolerance', [0.01, 0.1, 1.0, 5.0])
+def test_simplification_error_bounded(tolerance):
+    rng = np.random.RandomState(0)
+    x = np.cumsum(rng.uniform(-1.0, 1.0, 2000))
+    y = np.cumsum(rng.uniform(-1.0, 1.0, 2000))
+
+    tolerances = simplificationTolerances(x, y)
+    keep = tolerances > tolerance
+    assert keep[0] and keep[-1]
+    assert keep.sum() < len(x)
+
+    dist = distanceFromPolyline(x, y, x[keep], y[keep])
+    assert np.all(dist <= tolerance + 1e-9)
+
+    # Larger tolerances keep subsets of the points
+    assert np.all(keep[tolerances > 2.0 * tolerance])
+
+
+def test_visible_runs():
+    x = np.array([-10.0, -5.0, 5.0, 20.0, 30.0, 5.0, 5.0, 40.0])
+    y = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 100.0, 100.0])
+    starts, ends = visibleRuns(x, y, 0.0, -1.0, 10.0, 1.0)
+    assert starts.tolist() == [1, 4]
+    assert ends.tolist() == [3, 6]
+
+    starts, ends = visibleRuns(x, y, 100.0, 100.0, 200.0, 200.0)
+    assert len(starts) == 0 and len(ends) == 0
+
+    starts, ends = visibleRuns(x, y, -100.0, -100.0, 100.0, 200.0)
+    assert starts.tolist() == [0]
+    assert ends.tolist() == [len(x) - 1]
+
+    starts, ends = visibleRuns(x[:1], y[:1], -100.0, -100.0, 100.0, 200.0)
+    assert len(starts) == 0
+
+
+@pytest.mark.parametrize('tolerance', [0.5, 2.0, 10.0])
+def test_decimate_polyline(tolerance):
+    rng = np.random.RandomState(1)
+    x = np.cumsum(rng.uniform(-1.0, 1.0, 5000))
+    y = np.cumsum(rng.uniform(-1.0, 1.0, 5000))
+
+    kept = decimatePolyline(x, y, tolerance)
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0)
+
+    # Each dropped point is in the cell of the previous kept point
+    previous = kept[np.searchsorted(kept, np.arange(len(x)), side='right') - 1]
+    assert np.all(np.floor(x / tolerance) == np.floor(x[previous] / tolerance))
+    assert np.all(np.floor(y / tolerance) == np.floor(y[previous] / tolerance))
+
+    # A part of the polyline keeps the same internal points
+    part = decimatePolyline(x[1000:3000], y[1000:3000], tolerance) + 1000
+    inner = kept[(kept > 1000) & (kept < 2999)]
+    assert set(inner.tolist()) <= set(part.tolist())
+
+    assert decimatePolyline(x[:2], y[:2], tolerance).tolist() == [0, 1]
+
+
+def test_interpolate_polyline():
+    times = np.array([0.0, 10.0, 10.0, 20.0])
+    x = np.array([0.0, 10.0, 50.0, 70.0])
+    y = np.array([0.0, -10.0, 0.0, 0.0])
+    assert interpolatePolyline(times, x, y, -5.0) == (0.0, 0.0)
+    assert interpolatePolyline(times, x, y, 5.0) == (5.0, -5.0)
+    assert interpolatePolyline(times, x, y, 10.0) == (50.0, 0.0)
+    assert interpolatePolyline(times, x, y, 15.0) == (60.0, 0.0)
+    assert interpolatePolyline(times, x, y, 30.0) == (70.0, 0.0)
+
+
+def nearestSegmentBruteForce(px, py, x, y):
+    ax, ay, bx, by = x[:-1], y[:-1], x[1:], y[1:]
+    dx = bx - ax
+    dy = by - ay
+    len2 = np.maximum(dx * dx + dy * dy, 1e-300)
+    t = np.clip(((px - ax) * dx + (py - ay) * dy) / len2, 0.0, 1.0)
+    dist = np.hypot(px - ax - t * dx, py - ay - t * dy)
+    index = int(np.argmin(dist))
+    return index, dist[index]
+
+
+@pytest.mark.parametrize('cellSize, tolerance', [
+    (None, 2.0),
+    (None, 20.0),
+    (0.5, 5.0),
+    (50.0, 5.0),
+])
+def test_segment_grid(cellSize, tolerance):
+    rng = np.random.RandomState(2)
+    x = np.cumsum(rng.uniform(-3.0, 3.0, 3000))
+    y = np.cumsum(rng.uniform(-3.0, 3.0, 3000))
+    # A long segment, not stored in the cells
+    x[1500] += 500.0
+    grid = SegmentGrid(x, y, cellSize)
+    assert len(grid) == len(x) - 1
+
+    # Points near the polyline and points anywhere
+    points = rng.randint(0, len(x), 200)
+    px = np.concatenate([x[points] + rng.uniform(-10.0, 10.0, 200), rng.uniform(x.min(), x.max(), 200)])
+    py = np.concatenate([y[points] + rng.uniform(-10.0, 10.0, 200), rng.uniform(y.min(), y.max(), 200)])
+    for px, py in zip(px.tolist(), py.tolist()):
+        index, dist = nearestSegmentBruteForce(px, py, x, y)
+        nearest = grid.nearestSegment(px, py, tolerance)
+        if dist > tolerance:
+            assert nearest is None
+            assert grid.nearestVertex(px, py, tolerance) is None
+        else:
+            assert nearest is not None
+            assert nearest[1] == pytest.approx(dist)
+            vertex = grid.nearestVertex(px, py, tolerance)
+            assert vertex in (nearest[0], nearest[0] + 1)
+
+
+def test_segment_grid_special_cases():
+    grid = SegmentGrid([], [])
+    assert grid.nearestSegment(0.0, 0.0, 10.0) is None
+
+    grid = SegmentGrid([5.0], [5.0])
+    assert grid.nearestVertex(6.0, 5.0, 2.0) == 0
+    assert grid.nearestVertex(10.0, 5.0, 2.0) is None
+
+    grid = SegmentGrid([0.0, 10.0, 10.0], [0.0, 0.0, 10.0])
+    assert grid.nearestSegment(3.0, 1.0, 2.0) == (0, 1.0)
+    assert grid.nearestVertex(3.0, 1.0, 2.0) == 0
+    assert grid.nearestVertex(9.0, 4.0, 2.0) == 1
+    assert grid.nearestVertex(11.0, 8.0, 2.0) == 2
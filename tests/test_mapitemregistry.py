@@ -0,0 +1,315 @@
+import pytest
+import numpy as np
+
+from pytilemap.mapitemregistry import MapItemRegistry
+
+
+class FakeItem(object):
+
+    def __init__(self):
+        self.zoomLimits = (-np.inf, np.inf)
+        self.visible = True
+
+    def _zoomLimits(self):
+        return self.zoomLimits
+
+    def setVisible(self, visible):
+        self.visible = visible
+
+
+class AnchoredItem(FakeItem):
+
+    def __init__(self, xs, ys):
+        FakeItem.__init__(self)
+        self.xs = list(xs)
+        self.ys = list(ys)
+        self.placed = None
+
+    def _mercatorAnchors(self):
+        return self.xs, self.ys
+
+    def _placeAnchors(self, xs, ys, index):
+        count = len(self.xs)
+        self.placed = (xs[index:index + count], ys[index:index + count])
+
+    def _anchorsAttached(self, registry):
+        self.attached = True
+
+    def _anchorsDetached(self, xs, ys):
+        self.attached = False
+        self.xs = list(xs)
+        self.ys = list(ys)
+
+
+class OtherItem(FakeItem):
+
+    def __init__(self, bounds=None):
+        FakeItem.__init__(self)
+        self.zoom = None
+        self.bounds = bounds
+
+    def _mercatorAnchors(self):
+        return None
+
+    def _mercatorBounds(self):
+        return self.bounds
+
+    def setZoom(self, zoom):
+        self.zoom = zoom
+
+
+def test_registry_reproject():
+    registry = MapItemRegistry()
+    items = [AnchoredItem([0.1 * i], [0.2 * i]) for i in range(10)]
+    items.append(AnchoredItem([0.25, 0.75], [0.5, 0.125]))
+    other = OtherItem()
+    for item in items + [other]:
+        registry.add(item)
+    assert len(registry) == len(items) + 1
+
+    registry.reproject(3, 256)
+    zn = (1 << 3) * 256.0
+    for item in items:
+        assert item.placed == ([x * zn for x in item.xs], [y * zn for y in item.ys])
+    assert other.zoom == 3
+
+
+@pytest.mark.parametrize('numItems', [1, 10, 300])
+def test_registry_remove_and_update(numItems):
+    registry = MapItemRegistry()
+    items = [AnchoredItem([0.001 * i, 0.5], [0.002 * i, 0.5]) for i in range(numItems)]
+    for item in items:
+        registry.add(item)
+
+    # Remove most of the items to force the compaction of the arrays
+    removed = items[::3] + items[1::3]
+    for item in removed:
+        registry.remove(item)
+        assert item not in registry
+    kept = items[2::3]
+    assert len(registry) == len(kept)
+    assert registry.items() == kept
+
+    for item in kept:
+        item.xs = [0.5, 0.25, 0.125]
+        item.ys = [0.5, 0.75, 0.875]
+        registry.update(item)
+
+    registry.reproject(0, 1)
+    for item in kept:
+        assert np.allclose(item.placed, (item.xs, item.ys))
+    for item in removed:
+        assert item.placed is None
+
+
+def test_registry_spatial_queries():
+    registry = MapItemRegistry()
+    items = [AnchoredItem([0.01 * i], [0.5]) for i in range(100)]
+    items.append(AnchoredItem([0.105, 0.9], [0.2, 0.3]))
+    others = [OtherItem((0.2, 0.4, 0.3, 0.45)), OtherItem()]
+    for item in items + others:
+        registry.add(item)
+
+    assert registry.itemsInBox(0.095, 0.0, 0.125, 1.0) == items[10:13] + [items[-1]]
+    assert registry.itemsInBox(0.25, 0.35, 0.35, 0.44) == [others[0]]
+    assert registry.nearestItems(0.502, 0.5, k=3) == [items[50], items[51], items[49]]
+    assert registry.nearestItems(0.25, 0.42) == [others[0]]
+    assert registry.nearestItems(0.5, 0.6, k=5, maxDistance=0.05) == []
+
+    # The index follows the changes of the items
+    registry.remove(items[50])
+    items[10].xs = [0.503]
+    registry.update(items[10])
+    assert registry.nearestItems(0.502, 0.5, k=2) == [items[10], items[51]]
+
+
+def test_registry_update_bounds():
+    registry = MapItemRegistry()
+    items = [AnchoredItem([0.01 * i], [0.5]) for i in range(10)]
+    others = [OtherItem((0.1 * i, 0.1, 0.1 * i + 0.05, 0.15)) for i in range(5)] + [OtherItem()]
+    for item in items + others:
+        registry.add(item)
+    index = registry._spatialIndex()
+
+    # The moved items are checked apart from the index
+    others[0].bounds = (0.8, 0.8, 0.9, 0.9)
+    others[-1].bounds = (0.0, 0.1, 0.02, 0.5)
+    registry.updateBounds(others[0])
+    registry.updateBounds(others[-1])
+    assert registry._spatialIndex() is index
+    assert registry.itemsInBox(0.0, 0.0, 0.5, 0.5) == items + others[1:]
+    assert registry.itemsInBox(0.85, 0.85, 1.0, 1.0) == [others[0]]
+    assert registry.nearestItems(0.95, 0.95) == [others[0]]
+    assert registry.nearestItems(0.03, 0.12, k=2) == [others[-1], others[1]]
+
+    # The index is rebuilt when too many items moved
+    registry.MaxMovedItems = 2
+    others[1].bounds = None
+    registry.updateBounds(others[1])
+    assert registry._spatialIndex() is not index
+    assert registry.itemsInBox(0.0, 0.0, 0.5, 0.5) == items + others[2:]
+
+
+def test_registry_zoom_range():
+    registry = MapItemRegistry()
+    registry.reproject(10, 256)
+    items = [AnchoredItem([0.5], [0.5]) for i in range(6)]
+    others = [OtherItem() for i in range(2)]
+    ranges = [(-np.inf, np.inf), (5, 12), (12, np.inf), (-np.inf, 8), (11, 11), (8, 8)]
+    for item, zoomRange in zip(items + others, ranges + ranges[1:3]):
+        item.zoomLimits = zoomRange
+        registry.add(item)
+    assert [item.visible for item in items + others] == [True, True, False, False, False, False, True, False]
+
+    for zoom in [3, 11, 12, 8, 20, 11]:
+        for item in items:
+            item.placed = None
+        registry.reproject(zoom, 1)
+        for item, zoomRange in zip(items, ranges):
+            shown = zoomRange[0] <= zoom <= zoomRange[1]
+            assert item.visible == shown
+            assert item.placed == (([0.5 * (1 << zoom)], [0.5 * (1 << zoom)]) if shown else None)
+        for item, zoomRange in zip(others, ranges[1:3]):
+            shown = zoomRange[0] <= zoom <= zoomRange[1]
+            assert item.visible == shown
+            assert (item.zoom == zoom) == shown
+
+    # Visibility forced by the user is kept while the zoom range is not crossed
+    items[0].visible = False
+    registry.reproject(12, 1)
+    assert not items[0].visible
+
+    # A change of the zoom range updates the item immediately
+    items[5].placed = None
+    items[5].zoomLimits = (10, 12)
+    registry.updateZoomRange(items[5])
+    assert items[5].visible and items[5].placed == ([0.5 * 4096], [0.5 * 4096])
+
+    # Zoom ranges follow the compaction of the registry
+    for item in items[:4]:
+        registry.remove(item)
+    registry.reproject(8, 1)
+    assert not items[4].visible and not items[5].visible
+
+
+def test_registry_lazy_reprojection():
+    registry = MapItemRegistry()
+    registry.reproject(0, 1)
+    items = [AnchoredItem([i / 1000.0], [0.5]) for i in range(1000)]
+    other = OtherItem((0.9, 0.4, 0.95, 0.6))
+    for item in items + [other]:
+        registry.add(item)
+    registry.setLazy(True)
+
+    def placedZoom(item):
+        return None if item.placed is None else int(round(np.log2(item.placed[0][0] / item.xs[0])))
+
+    # Only the items near the visible area are reprojected
+    registry.reproject(4, 1, area=(0.5, 0.45, 0.51, 0.55))
+    updated = [i for i, item in enumerate(items) if item.placed is not None and placedZoom(item) == 4]
+    assert 500 in updated and 510 in updated
+    assert len(updated) < 150 and other.zoom is None
+
+    # The visible area reaches other items
+    registry.reprojectArea((0.91, 0.45, 0.92, 0.55))
+    assert other.zoom == 4 and placedZoom(items[915]) == 4
+
+    # Items whose old position is in the visible area are reprojected as well
+    registry.reproject(5, 1, area=(0.25, 0.24, 0.26, 0.26))
+    assert placedZoom(items[500]) == 5 and placedZoom(items[510]) == 5
+    assert placedZoom(items[450]) == 4
+
+    # Disabling the lazy mode reprojects all the items
+    registry.setLazy(False)
+    registry.reproject(5, 1)
+    assert all(placedZoom(item) == 5 for item in items[1:])
+
+
+@pytest.mark.parametrize('numItems', [1, 20, 500])
+def test_registry_bulk_insert(numItems):
+    registry = MapItemRegistry()
+    registry.add(AnchoredItem([0.5], [0.5]))
+    registry.reproject(4, 256)
+
+    items = [AnchoredItem([0.001 * i, 0.3], [0.002 * i, 0.4]) for i in range(numItems)]
+    items[0].zoomLimits = (6, 8)
+    other = OtherItem()
+    removed = AnchoredItem([0.9], [0.9])
+    registry.beginInsert()
+    assert registry.isInserting()
+    for item in items + [other, removed]:
+        registry.add(item)
+    registry.remove(removed)
+    assert items[-1] not in registry
+    registry.endInsert()
+    assert not registry.isInserting()
+
+    assert len(registry) == numItems + 2
+    assert removed not in registry
+    assert other.zoom == 4
+    assert not items[0].visible
+    zn = (1 << 4) * 256.0
+    for item in items:
+        assert item.placed == ([x * zn for x in item.xs], [y * zn for y in item.ys])
+
+    # The items inserted in bulk are updated as the others
+    registry.reproject(6, 256)
+    assert items[0].visible
+    assert registry.itemsInBox(0.0, 0.0, 0.0015, 0.0015) == items[:1]
+
+
+def test_registry_bulk_insert_arrays():
+    registry = MapItemRegistry()
+    registry.reproject(4, 256)
+
+    x = np.linspace(0.1, 0.2, 50)
+    y = np.linspace(0.3, 0.4, 50)
+    items = [AnchoredItem([a], [b]) for a, b in zip(x.tolist(), y.tolist())]
+    single = AnchoredItem([0.7, 0.8], [0.7, 0.8])
+    registry.beginInsert()
+    registry.setInsertedAnchors(items, x, y)
+    # The anchors of the items are copied from the arrays
+    for item in items:
+        item.xs = [-1.0]
+        item.ys = [-1.0]
+    for item in items + [single]:
+        registry.add(item)
+    registry.endInsert()
+
+    assert len(registry) == 51
+    zn = (1 << 4) * 256.0
+    for item, a, b in zip(items, x.tolist(), y.tolist()):
+        assert item.attached and item.placed == ([a * zn], [b * zn])
+    assert single.placed == ([0.7 * zn, 0.8 * zn], [0.7 * zn, 0.8 * zn])
+
+    registry.remove(items[10])
+    assert items[10].xs == [x[10]] and items[10].ys == [y[10]]
+    assert registry.itemsInBox(0.0, 0.0, 0.15, 0.35) == items[:10] + items[11:25]
+
+
+def test_registry_anchors_storage():
+    registry = MapItemRegistry()
+    items = [AnchoredItem([0.1 * i, 0.5], [0.2, 0.05 * i]) for i in range(6)]
+    for item in items:
+        registry.add(item)
+        assert item.attached
+    assert registry.anchors(items[3]) == ([0.1 * 3, 0.5], [0.2, 0.05 * 3])
+
+    registry.setAnchors(items[1], [0.75, 0.25], [0.5, 0.5])
+    assert registry.anchors(items[1]) == ([0.75, 0.25], [0.5, 0.5])
+    registry.setAnchors(items[2], [0.125], [0.25])
+    assert registry.anchors(items[2]) == ([0.125], [0.25])
+    assert registry.itemsInBox(0.1, 0.21, 0.15, 0.3) == [items[2]]
+
+    # The anchors are handed back to the unregistered items
+    registry.remove(items[1])
+    assert not items[1].attached
+    assert items[1].xs == [0.75, 0.25]
+    registry.remove(items[4])
+
+    kept, starts, x, y = registry.anchorArrays()
+    assert kept == [items[0], items[3], items[5], items[2]]
+    for i, item in enumerate(kept):
+        assert (x[starts[i]:starts[i + 1]].tolist(), y[starts[i]:starts[i + 1]].tolist()) == \
+            registry.anchors(item)
+    assert starts[-1] == len(x) == 7
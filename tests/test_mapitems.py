@@ -0,0 +1,342 @@
+import io
+import json
+
+import pytest
+import numpy as np
+
+from qtpy.QtCore import Qt, QLineF, QPoint, QPointF, QRectF
+from qtpy.QtGui import QColor, QImage, QPainter, QPixmap
+from qtpy.QtWidgets import QGraphicsItem
+
+
+def zoomTo(scene, zoom):
+    scene.zoomTo(QPoint(400, 300), zoom)
+    assert scene.zoom() == zoom
+
+
+def renderScene(scene, width=800, height=600):
+    # The visible area of the scene, rendered outside of the view
+    image = QImage(width, height, QImage.Format_ARGB32)
+    image.fill(0)
+    painter = QPainter(image)
+    scene.render(painter, QRectF(0.0, 0.0, width, height), scene.sceneRect())
+    painter.end()
+    return image
+
+
+def pixelAt(image, scene, lon, lat, dx=0.0, dy=0.0):
+    # Color of the rendered scene at a position, moved by (dx, dy) pixels
+    x, y = scene.posFromLonLat(lon, lat)
+    origin = scene.sceneRect().topLeft()
+    return QColor.fromRgba(image.pixel(int(x - origin.x() + dx), int(y - origin.y() + dy)))
+
+
+def imagePixels(image):
+    bits = image.constBits()
+    bits.setsize(image.byteCount())
+    return np.frombuffer(bits, dtype=np.uint32).reshape(image.height(), image.width()).copy()
+
+
+def paintedTiles(scene, item, tileSize=256):
+    # Map tiles where the item changes the rendered scene
+    item.setVisible(False)
+    background = imagePixels(renderScene(scene))
+    item.setVisible(True)
+    y, x = np.nonzero(imagePixels(renderScene(scene)) != background)
+    origin = scene.sceneRect().topLeft()
+    tx = np.floor((x + origin.x()) / tileSize).astype(np.int64)
+    ty = np.floor((y + origin.y()) / tileSize).astype(np.int64)
+    return set(zip(tx.tolist(), ty.tolist()))
+
+
+def test_cluster_item_zoom_range(scene):
+    rng = np.random.RandomState(0)
+    item = scene.addClusters(rng.uniform(10.0698, 10.0702, 100), rng.uniform(44.8598, 44.8602, 100))
+    assert item.zoomRange() == (None, None)
+
+    for zoom in (18, 19, 20):
+        zoomTo(scene, zoom)
+        assert item.isVisible()
+        assert item.visibleClusters()[1].sum() == 100
+
+    item.setZoomRange(3, None)
+    item.setLonLat(rng.uniform(10.0698, 10.0702, 50), rng.uniform(44.8598, 44.8602, 50))
+    assert item.zoomRange() == (3, None)
+    assert item.isVisible()
+    assert item.visibleClusters()[1].sum() == 50
+
+    zoomTo(scene, 2)
+    assert not item.isVisible()
+
+
+def test_heatmap_render_limited_to_device(scene):
+    rng = np.random.RandomState(1)
+    item = scene.addHeatmap(rng.uniform(9.0, 11.0, 5000), rng.uniform(44.0, 45.5, 5000))
+    zoomTo(scene, 10)
+
+    # The whole item is exposed when the scene is rendered outside of a view, the
+    # evaluated tiles are only the ones of the 800x600 pixels of the scene
+    renderScene(scene, 400, 300)
+    assert 0 < len(item._tiles) <= 20
+    assert len(paintedTiles(scene, item)) > 2
+
+    # The tiles evaluated by each painting are limited
+    item.MaxNewTiles = 2
+    zoomTo(scene, 9)
+    assert len(paintedTiles(scene, item)) == 2
+
+
+def test_bulk_add_items(scene):
+    lons = np.linspace(10.0, 10.1, 200)
+    lats = np.linspace(44.8, 44.9, 200)
+    circles = scene.addCircles(lons, lats, 4.0)
+    texts = scene.addTexts(lons[:3], lats[:3], ['a', 'b', 'c'])
+    pixmaps = scene.addPixmaps(lons[:3], lats[:3], QPixmap(4, 4))
+
+    for zoom in (12, 14):
+        zoomTo(scene, zoom)
+        for i in (0, 57, 199):
+            x, y = scene.posFromLonLat(lons[i], lats[i])
+            center = circles[i].rect().center()
+            assert center.x() == pytest.approx(x) and center.y() == pytest.approx(y)
+        for i in range(3):
+            x, y = scene.posFromLonLat(lons[i], lats[i])
+            assert pixmaps[i].pos().x() == pytest.approx(x) and pixmaps[i].pos().y() == pytest.approx(y)
+            assert texts[i].text() == 'abc'[i]
+
+    # The items added in bulk can be moved and removed as the others
+    circles[5].setLonLat(10.05, 44.85)
+    x, y = scene.posFromLonLat(10.05, 44.85)
+    assert circles[5].rect().center().x() == pytest.approx(x)
+    scene.removeItem(circles)
+    assert circles[0].scene() is None
+    assert len(scene.itemsInLonLatBox(9.9, 44.7, 10.2, 45.0)) == 6
+
+
+def test_track_bounds(scene):
+    track = scene.addTrack(maxLength=10)
+    zoomTo(scene, 12)
+    assert scene.itemsInLonLatBox(9.9, 44.7, 10.25, 44.9) == []
+
+    # The track moves away from its first points
+    for i in range(20):
+        track.append(10.0 + 0.01 * i, 44.8)
+        assert scene.itemsInLonLatBox(9.9, 44.7, 10.25, 44.9) == [track]
+    x0, y0 = scene.posFromLonLat(10.1, 44.8)
+    x1, _ = scene.posFromLonLat(10.19, 44.8)
+    rect = track.boundingRect()
+    assert rect.left() < x0 < rect.left() + 5.0 and x1 < rect.right() < x1 + 5.0
+    assert rect.center().y() == pytest.approx(y0)
+
+    assert scene.itemsInLonLatBox(10.15, 44.7, 10.25, 44.9) == [track]
+    assert scene.itemsInLonLatBox(9.9, 44.7, 10.05, 44.9) == []
+
+    track.setMaxLength(2)
+    x0, _ = scene.posFromLonLat(10.18, 44.8)
+    assert x0 - 5.0 < track.boundingRect().left() < x0
+    track.clear()
+    assert track.boundingRect().isEmpty()
+    assert scene.itemsInLonLatBox(10.15, 44.7, 10.25, 44.9) == []
+
+
+def test_lines_group_default_color(scene):
+    # Horizontal segments, about 58 pixels long at zoom level 12
+    lons = [10.03, 10.05, 10.07, 10.09]
+    item = scene.addLinesGroup(lons, [44.86] * 4)
+    zoomTo(scene, 12)
+    black = QColor('black')
+
+    # Dashes of 28 pixels and gaps of 14 pixels
+    item.setLineStyle(None, width=7.0, style=Qt.DashLine)
+    image = renderScene(scene)
+    assert pixelAt(image, scene, lons[0], 44.86, 10.0, 2.0) == black
+    assert pixelAt(image, scene, lons[0], 44.86, 35.0) != black
+
+    item.setLineStyle(None, width=[1.0, 7.0, 1.0])
+    image = renderScene(scene)
+    assert pixelAt(image, scene, 10.06, 44.86, 0.0, 2.0) == black
+    assert pixelAt(image, scene, 10.04, 44.86, 0.0, 2.0) != black
+    assert pixelAt(image, scene, 10.04, 44.86) == black
+
+    x0, y0 = scene.posFromLonLat(lons[1], 44.86)
+    x1, y1 = scene.posFromLonLat(lons[2], 44.86)
+    line = item[1]
+    assert isinstance(line, QLineF) and len(item) == 3
+    assert (line.x1(), line.y1(), line.x2(), line.y2()) == pytest.approx((x0, y0, x1, y1))
+    with pytest.raises(IndexError):
+        item[3]
+
+
+def test_polyline_hit_grid(scene):
+    lons = np.linspace(10.0, 10.2, 1000)
+    lats = 44.8 + 0.05 * np.sin(np.linspace(0.0, 10.0, 1000))
+    item = scene.addPolyline(lons, lats)
+
+    for zoom in (10, 14, 10):
+        zoomTo(scene, zoom)
+        x, y = scene.posFromLonLat(lons[500], lats[500])
+        assert abs(item.vertexAt(QPointF(x, y)) - 500) <= 2
+        assert item.contains(QPointF(x, y))
+
+    # The hit-tests follow the changes of the drawn points
+    item.setSimplificationTolerance(None)
+    assert item.vertexAt(QPointF(x, y)) == 500
+    item.setLonLat(lons, lats + 0.1)
+    assert item.vertexAt(QPointF(x, y)) is None
+    x, y = scene.posFromLonLat(lons[500], lats[500] + 0.1)
+    assert item.vertexAt(QPointF(x, y)) == 500
+
+
+def test_marker_item_set_lon_lat(scene):
+    red = QPixmap(8, 8)
+    red.fill(QColor('red'))
+    blue = QPixmap(8, 8)
+    blue.fill(QColor('blue'))
+    zoomTo(scene, 12)
+
+    for iconIndices, rotations in [(0, None), (1, 30.0), ([1, 1, 1], [0.0, 10.0, 20.0])]:
+        item = scene.addMarkers([10.06, 10.07, 10.08], [44.86, 44.86, 44.86], [red, blue],
+                                iconIndices=iconIndices, rotations=rotations)
+        item.setLonLat([10.065, 10.075], [44.855, 44.865])
+        assert len(item) == 2
+
+        image = renderScene(scene)
+        # The per-marker icons are not kept for a different number of markers
+        expected = 'blue' if iconIndices == 1 else 'red'
+        assert pixelAt(image, scene, 10.065, 44.855) == QColor(expected)
+        assert pixelAt(image, scene, 10.07, 44.86) not in (QColor('red'), QColor('blue'))
+        scene.removeItem(item)
+
+
+def test_lines_group_parts_past_the_end(scene):
+    item = scene.addLinesGroup([10.0, 10.1, 10.2, 10.3], [44.8, 44.9, 44.8, 44.9], parts=[0, 2, 4])
+    assert len(item) == 2
+    assert scene.itemsInLonLatBox(10.05, 44.7, 10.25, 44.95) == [item]
+
+
+def test_add_geojson_empty_last_line(scene):
+    features = [{'type': 'Feature', 'properties': None, 'geometry': geometry} for geometry in [
+        {'type': 'LineString', 'coordinates': [[10.0, 44.8], [10.1, 44.9]]},
+        {'type': 'LineString', 'coordinates': []},
+    ]]
+    stream = io.StringIO(json.dumps({'type': 'FeatureCollection', 'features': features}))
+    points, lines, polygons = scene.addGeoJson(stream)
+    assert points is None and polygons is None
+    assert len(lines) == 1
+
+
+def cacheCost(scene, item):
+    # Estimate of the memory of the cache of an item, see MapGraphicsScene.setCacheBudget()
+    rect = item.sceneBoundingRect()
+    view = scene.sceneRect()
+    return int((min(rect.width(), view.width()) + 2.0) * (min(rect.height(), view.height()) + 2.0)) * 4
+
+
+def test_cache_budget(scene, app):
+    zoomTo(scene, 10)
+    large = scene.addPolyline([9.0, 11.0], [44.0, 45.5])
+    small = scene.addCircle(10.07, 44.86, 5.0)
+    other = scene.addCircle(10.08, 44.86, 5.0)
+    assert scene.cacheBudget() == scene.DefaultCacheBudget
+    scene.setCacheBudget(0)
+    large.setCacheManaged()
+    small.setCacheManaged()
+    app.processEvents()
+    assert scene.cacheUsage() == 0
+    assert large.cacheMode() == small.cacheMode() == QGraphicsItem.NoCache
+
+    # The items are cached in order of insertion, the large one is limited to the view
+    largeCost = cacheCost(scene, large)
+    assert largeCost == (800 + 2) * (600 + 2) * 4
+    scene.setCacheBudget(largeCost + cacheCost(scene, small))
+    assert scene.cacheUsage() == scene.cacheBudget()
+    assert large.cacheMode() == small.cacheMode() == QGraphicsItem.DeviceCoordinateCache
+    assert other.cacheMode() == QGraphicsItem.NoCache
+
+    scene.setCacheBudget(largeCost)
+    assert scene.cacheUsage() == largeCost
+    assert small.cacheMode() == QGraphicsItem.NoCache
+
+    # The costs are evaluated again when the zoom level or the size of the view change
+    zoomTo(scene, 5)
+    assert cacheCost(scene, large) < largeCost
+    assert scene.cacheUsage() == cacheCost(scene, large) + cacheCost(scene, small)
+    assert small.cacheMode() == QGraphicsItem.DeviceCoordinateCache
+    zoomTo(scene, 10)
+    assert small.cacheMode() == QGraphicsItem.NoCache
+    scene.setSize(400, 300)
+    assert scene.cacheUsage() == cacheCost(scene, large) + cacheCost(scene, small)
+    assert small.cacheMode() == QGraphicsItem.DeviceCoordinateCache
+    scene.setSize(800, 600)
+
+    # The budget is released by the items leaving the scene or not managed
+    scene.removeItem(large)
+    app.processEvents()
+    assert large.cacheMode() == QGraphicsItem.NoCache
+    assert scene.cacheUsage() == cacheCost(scene, small)
+    assert small.cacheMode() == QGraphicsItem.DeviceCoordinateCache
+
+    other.setCacheManaged()
+    small.setCacheManaged(False)
+    app.processEvents()
+    assert small.cacheMode() == QGraphicsItem.NoCache
+    assert other.cacheMode() == QGraphicsItem.DeviceCoordinateCache
+    assert scene.cacheUsage() == cacheCost(scene, other)
+
+
+def test_heatmap_cache_smaller_than_view(scene):
+    rng = np.random.RandomState(2)
+    lons = rng.uniform(9.0, 11.0, 2000)
+    lats = rng.uniform(44.0, 45.5, 2000)
+
+    # The painted tiles are kept even if they do not fit in the cache
+    item = scene.addHeatmap(lons, lats)
+    item.CacheSize = 2
+    item.MaxNewTiles = 3
+    zoomTo(scene, 9)
+    images = [renderScene(scene) for _ in range(8)]
+    scene.removeItem(item)
+
+    scene.addHeatmap(lons, lats)
+    expected = renderScene(scene)
+    assert images[-1] == expected
+    assert images[0] != expected
+
+
+def test_heatmap_scale_evaluated_on_zoom(scene, monkeypatch):
+    rng = np.random.RandomState(3)
+    item = scene.addHeatmap(rng.uniform(9.0, 11.0, 2000), rng.uniform(44.0, 45.5, 2000))
+    density = item._density
+    calls = list()
+    maxDensity = density.maxDensity
+    monkeypatch.setattr(density, 'maxDensity', lambda *args: calls.append(args) or maxDensity(*args))
+
+    zoomTo(scene, 9)
+    assert len(calls) == 1
+    renderScene(scene)
+    assert len(calls) == 1
+
+
+def test_playback_head(scene):
+    lons = np.linspace(10.0, 10.1, 11)
+    lats = np.full(11, 44.86)
+    item = scene.addPlayback(lons, lats, np.arange(11.0))
+    item.setHeadRadius(6.0)
+    zoomTo(scene, 12)
+
+    item.setTimeWindow(2.0, 5.5)
+    lon, lat = item.headPosition()
+    assert lon == pytest.approx(10.055) and lat == pytest.approx(44.86)
+    assert pixelAt(renderScene(scene), scene, lon, lat) == QColor('red')
+
+    # The head stays on the last point while the window overlaps the track
+    item.setTimeWindow(8.0, 20.0)
+    assert item.headPosition() == pytest.approx((10.1, 44.86))
+    assert pixelAt(renderScene(scene), scene, 10.1, 44.86) == QColor('red')
+
+    # Nothing is drawn for windows outside of the track
+    for start, end in [(11.0, 20.0), (-5.0, -1.0), (6.0, 4.0)]:
+        item.setTimeWindow(start, end)
+        assert item.headPosition() is None
+        assert item.boundingRect().isEmpty()
+    assert pixelAt(renderScene(scene), scene, 10.1, 44.86) != QColor('red')
@@ -0,0 +1,54 @@
+import pytest
+import numpy as np
+
+from pytilemap.spatialindex import PackedRTree
+
+
+def makeBoxes(count, seed=0):
+    rng = np.random.RandomState(seed)
+    x = rng.uniform(0.0, 1.0, count)
+    y = rng.uniform(0.0, 1.0, count)
+    w = rng.exponential(0.002, count) * (rng.uniform(size=count) < 0.5)
+    h = rng.exponential(0.002, count) * (rng.uniform(size=count) < 0.5)
+    return x, y, x + w, y + h
+
+
+def boxDistances(boxes, x, y):
+    x0, y0, x1, y1 = boxes
+    dx = np.maximum(np.maximum(x0 - x, x - x1), 0.0)
+    dy = np.maximum(np.maximum(y0 - y, y - y1), 0.0)
+    return np.hypot(dx, dy)
+
+
+@pytest.mark.parametrize('count', [0, 1, 15, 16, 17, 1000, 20000])
+def test_rtree_search(count):
+    boxes = makeBoxes(count)
+    tree = PackedRTree(*boxes)
+    assert len(tree) == count
+    x0, y0, x1, y1 = boxes
+    for rect in [(0.0, 0.0, 1.0, 1.0), (0.3, 0.4, 0.31, 0.43), (0.5, 0.5, 0.5, 0.5), (2.0, 2.0, 3.0, 3.0)]:
+        found = tree.search(*rect)
+        expected = np.flatnonzero((x0 <= rect[2]) & (x1 >= rect[0]) & (y0 <= rect[3]) & (y1 >= rect[1]))
+        assert sorted(found.tolist()) == expected.tolist()
+
+
+@pytest.mark.parametrize('count', [1, 17, 1000, 20000])
+@pytest.mark.parametrize('k', [1, 5, 50])
+def test_rtree_nearest(count, k):
+    boxes = makeBoxes(count, seed=1)
+    tree = PackedRTree(*boxes, nodeSize=8)
+    for x, y in [(0.5, 0.5), (0.01, 0.99), (1.5, -0.2)]:
+        indices, distances = tree.nearest(x, y, k)
+        expected = boxDistances(boxes, x, y)
+        assert len(indices) == min(k, count)
+        assert np.allclose(distances, np.sort(expected)[:len(indices)])
+        assert np.allclose(expected[indices], distances)
+
+
+def test_rtree_nearest_max_distance():
+    boxes = makeBoxes(5000, seed=2)
+    tree = PackedRTree(*boxes)
+    indices, distances = tree.nearest(0.5, 0.5, k=10000, maxDistance=0.05)
+    expected = boxDistances(boxes, 0.5, 0.5)
+    assert sorted(indices.tolist()) == np.flatnonzero(expected <= 0.05).tolist()
+    assert np.all(np.diff(distances) >= 0.0)
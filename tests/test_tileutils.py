@@ -1,7 +1,9 @@
 import pytest
 import numpy as np
 
-from pytilemap.tileutils import posFromLonLat, lonLatFromPos
+from pytilemap.tileutils import posFromLonLat, lonLatFromPos, mercatorFromLonLat, posFromMercator, \
+    tileFromLonLat, tileBounds, tilesInBox, tilesAlongPolyline, quadKeyFromTile, \
+    posFromLonLatChunked, lonLatFromPosChunked, mortonCode
 
 
 LATITUDES = np.arange(-90, 90).astype(np.float64)
@@ -58,3 +60,199 @@ def test_posFromLonLat_viceversa_array(lons, lats, zooms):
         ll = lonLatFromPos(tx, ty, zoom, 256)
         assert np.nanmax(np.abs(ll[0] - longitude)) < 1e-12
         assert np.nanmax(np.abs(ll[1] - latitude)) < 1e-12
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_scalar_projection_matches_array():
+    # The scalar conversions use the math module, the array ones NumPy
+    lats = np.array([-100.0, -90.0, -89.999999, -85.0511287798, -45.3, 0.0, 12.5, 85.0511287798,
+                     89.999999, 90.0, 100.0, np.nan])
+    lons = np.linspace(-180.0, 180.0, len(lats))
+    for zoom in (0, 7, 19):
+        x, y = posFromLonLat(lons, lats, zoom, 256)
+        for i in range(len(lats)):
+            pos = posFromLonLat(float(lons[i]), float(lats[i]), zoom, 256)
+            assert all(isinstance(value, float) for value in pos)
+            np.testing.assert_array_equal(pos, (x[i], y[i]))
+
+    # Positions far outside of the map are clamped at the poles
+    zn = (1 << 7) * 256.0
+    ys = np.array([-1e300, -1e6 * zn, -zn, 0.0, 0.3 * zn, zn, 2.0 * zn, 1e6 * zn, 1e300, np.inf, -np.inf, np.nan])
+    xs = np.linspace(-zn, 2.0 * zn, len(ys))
+    lon, lat = lonLatFromPos(xs, ys, 7, 256)
+    for i in range(len(ys)):
+        np.testing.assert_array_equal(lonLatFromPos(float(xs[i]), float(ys[i]), 7, 256), (lon[i], lat[i]))
+    assert lat[0] == 90.0 and lat[7] == -90.0
+
+
+@pytest.mark.parametrize('lons,lats,zooms', [(LONGITUDES[::4], LATITUDES[5:-4:4], ZOOMS[::4])])
+def test_posFromMercator(lons, lats, zooms):
+    for lon in lons:
+        for lat in lats:
+            mx, my = mercatorFromLonLat(lon, lat)
+            assert 0.0 <= mx <= 1.0
+            assert 0.0 <= my <= 1.0
+            for zoom in zooms:
+                assert posFromMercator(mx, my, zoom, 256) == posFromLonLat(lon, lat, zoom, 256)
+
+
+@pytest.mark.parametrize('lons,lats,zooms', [(LONGITUDES, LATITUDES[1:], ZOOMS)])
+def test_posFromMercator_array(lons, lats, zooms):
+
+    latitude = np.tile(lats, lons.size)
+    longitude = np.repeat(lons, lats.size)
+
+    mx, my = mercatorFromLonLat(longitude, latitude)
+    for zoom in zooms:
+        tx, ty = posFromMercator(mx, my, zoom, 256)
+        refTx, refTy = posFromLonLat(longitude, latitude, zoom, 256)
+        assert np.array_equal(tx, refTx)
+        assert np.array_equal(ty, refTy)
+
+
+@pytest.mark.parametrize('zoom', [0, 1, 5, 12, 18])
+def test_tileFromLonLat(zoom):
+    lons = np.linspace(-179.9, 179.9, 101)
+    lats = np.linspace(-85.0, 85.0, 101)
+    tx, ty = tileFromLonLat(lons, lats, zoom)
+    refX, refY = posFromLonLat(lons, lats, zoom, 256)
+    assert np.array_equal(tx, np.floor(refX / 256).astype(np.int64))
+    assert np.array_equal(ty, np.floor(refY / 256).astype(np.int64))
+
+    lon0, lat0, lon1, lat1 = tileBounds(tx, ty, zoom)
+    assert np.all((lon0 <= lons) & (lons <= lon1))
+    assert np.all((lat1 <= lats) & (lats <= lat0))
+
+
+def test_tileFromLonLat_out_of_range():
+    tx, ty = tileFromLonLat(np.array([-180.0, 180.0]), np.array([89.9, -89.9]), 3)
+    assert tx.tolist() == [0, 7]
+    assert ty.tolist() == [0, 7]
+
+
+def test_tilesInBox():
+    tx, ty, tz = tilesInBox(10.0, 45.0, 10.5, 44.5, range(8, 12))
+    for zoom in range(8, 12):
+        mask = tz == zoom
+        x0, y0 = tileFromLonLat(10.0, 45.0, zoom)
+        x1, y1 = tileFromLonLat(10.5, 44.5, zoom)
+        assert mask.sum() == (x1 - x0 + 1) * (y1 - y0 + 1)
+        assert tx[mask].min() == x0 and tx[mask].max() == x1
+        assert ty[mask].min() == y0 and ty[mask].max() == y1
+
+
+@pytest.mark.parametrize('zoom', [3, 8, 13])
+def test_tilesAlongPolyline(zoom):
+    rng = np.random.RandomState(0)
+    lons = 10.0 + np.cumsum(rng.uniform(-0.2, 0.2, 50))
+    lats = 44.0 + np.cumsum(rng.uniform(-0.2, 0.2, 50))
+    tx, ty, tz = tilesAlongPolyline(lons, lats, zoom)
+    assert np.all(tz == zoom)
+    tiles = set(zip(tx.tolist(), ty.tolist()))
+    assert len(tiles) == len(tx)
+
+    # All the tiles touched by a dense sampling of the polyline must be found
+    t = np.linspace(0.0, 1.0, 200)[:, None]
+    x, y = mercatorFromLonLat(lons, lats)
+    denseX = (x[:-1] + t * (x[1:] - x[:-1])).ravel()
+    denseY = (y[:-1] + t * (y[1:] - y[:-1])).ravel()
+    n = 1 << zoom
+    sampled = set(zip(np.floor(denseX * n).astype(int).tolist(), np.floor(denseY * n).astype(int).tolist()))
+    assert sampled <= tiles
+
+
+def test_quadKeyFromTile():
+    keys = quadKeyFromTile(np.array([3, 0, 1]), np.array([5, 0, 1]), 3)
+    assert keys.tolist() == ['213', '000', '003']
+    assert quadKeyFromTile(0, 0, 0).tolist() == ['']
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_projection_out_arrays(dtype):
+    rng = np.random.RandomState(0)
+    lon = rng.uniform(-180.0, 180.0, 1000).astype(dtype)
+    lat = rng.uniform(-85.0, 85.0, 1000).astype(dtype)
+
+    refX, refY = posFromLonLat(lon, lat, 10, 256)
+    assert refX.dtype == dtype and refY.dtype == dtype
+    out = (np.empty_like(lon), np.empty_like(lat))
+    x, y = posFromLonLat(lon, lat, 10, 256, out=out)
+    assert x is out[0] and y is out[1]
+    assert np.array_equal(x, refX) and np.array_equal(y, refY)
+
+    refLon, refLat = lonLatFromPos(refX, refY, 10, 256)
+    lonOut, latOut = lonLatFromPos(refX, refY, 10, 256, out=out)
+    assert lonOut is out[0] and latOut is out[1]
+    assert np.array_equal(lonOut, refLon) and np.array_equal(latOut, refLat)
+
+
+@pytest.mark.parametrize('swap', [False, True])
+def test_projection_aliased_out_arrays(swap):
+    rng = np.random.RandomState(0)
+    lon = rng.uniform(-180.0, 180.0, 1000)
+    lat = rng.uniform(-85.0, 85.0, 1000)
+    refX, refY = posFromLonLat(lon, lat, 10, 256)
+    refMx, refMy = mercatorFromLonLat(lon, lat)
+    refLon, refLat = lonLatFromPos(refX, refY, 10, 256)
+
+    def aliased(a, b):
+        # Outputs overwriting the inputs, in the same or in the swapped order
+        a = a.copy()
+        b = b.copy()
+        return (a, b), ((b, a) if swap else (a, b))
+
+    def check(result, out, refA, refB):
+        assert result[0] is out[0] and result[1] is out[1]
+        assert np.array_equal(result[0], refA) and np.array_equal(result[1], refB)
+
+    (a, b), out = aliased(lon, lat)
+    check(mercatorFromLonLat(a, b, out=out), out, refMx, refMy)
+    (a, b), out = aliased(lon, lat)
+    check(posFromLonLat(a, b, 10, 256, out=out), out, refX, refY)
+    (a, b), out = aliased(refX, refY)
+    check(lonLatFromPos(a, b, 10, 256, out=out), out, refLon, refLat)
+    (a, b), out = aliased(lon, lat)
+    check(posFromLonLatChunked(a, b, 10, 256, out=out, chunkSize=64, numThreads=2), out, refX, refY)
+    (a, b), out = aliased(refX, refY)
+    check(lonLatFromPosChunked(a, b, 10, 256, out=out, chunkSize=64, numThreads=2), out, refLon, refLat)
+
+
+@pytest.mark.parametrize('size,chunkSize,numThreads', [
+    (0, 16, 2), (1000, 1000, 4), (1000, 64, 1), (1001, 64, 3), (10000, 999, None),
+])
+def test_projection_chunked(size, chunkSize, numThreads):
+    rng = np.random.RandomState(0)
+    lon = rng.uniform(-180.0, 180.0, size)
+    lat = rng.uniform(-85.0, 85.0, size)
+
+    refX, refY = posFromLonLat(lon, lat, 12, 256)
+    x, y = posFromLonLatChunked(lon, lat, 12, 256, chunkSize=chunkSize, numThreads=numThreads)
+    assert np.array_equal(x, refX) and np.array_equal(y, refY)
+
+    refLon, refLat = lonLatFromPos(refX, refY, 12, 256)
+    out = (np.empty_like(lon), np.empty_like(lat))
+    lonOut, latOut = lonLatFromPosChunked(refX, refY, 12, 256, out=out, chunkSize=chunkSize,
+                                          numThreads=numThreads)
+    assert lonOut is out[0] and latOut is out[1]
+    assert np.array_equal(lonOut, refLon) and np.array_equal(latOut, refLat)
+
+
+def test_projection_chunked_invalid_arrays():
+    lon = np.zeros((10, 10))
+    with pytest.raises(ValueError):
+        posFromLonLatChunked(lon, np.zeros(10), 12, 256)
+    with pytest.raises(ValueError):
+        posFromLonLatChunked(lon, lon, 12, 256, out=(lon.T, lon.T))
+
+
+@pytest.mark.parametrize('zoom', [1, 3, 7, 16, 31])
+def test_mortonCode(zoom):
+    rng = np.random.RandomState(zoom)
+    tx = rng.randint(0, 1 << zoom, 100, dtype=np.int64)
+    ty = rng.randint(0, 1 << zoom, 100, dtype=np.int64)
+    codes = mortonCode(tx, ty)
+    assert codes.dtype == np.uint64
+    if zoom <= 16:
+        assert codes.tolist() == [int(k, 4) for k in quadKeyFromTile(tx, ty, zoom)]
+    # The parent tile is obtained removing the last two bits
+    assert np.array_equal(codes >> np.uint64(2), mortonCode(tx >> 1, ty >> 1))